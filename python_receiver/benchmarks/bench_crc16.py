@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import timeit
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from rtu_receiver.crc16 import Crc16, crc16_ccitt_false
+
+
+def crc16_bitwise(data: bytes, init: int = 0xFFFF) -> int:
+    # Previous bit-by-bit implementation, kept as the reference for comparison.
+    crc = init & 0xFFFF
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+
+def crc16_streaming(data: bytes) -> int:
+    crc = Crc16()
+    for i in range(0, len(data), 8):
+        crc.update(data[i : i + 8])
+    return crc.digest()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare CRC16 implementations")
+    parser.add_argument("--sizes", default="14,126,318", help="Comma-separated payload sizes in bytes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    candidates = {
+        "bitwise": crc16_bitwise,
+        "table": crc16_ccitt_false,
+        "streaming": crc16_streaming,
+    }
+
+    for size in (int(value) for value in args.sizes.split(",")):
+        data = os.urandom(size)
+        expected = crc16_bitwise(data)
+        timings = {}
+        for name, func in candidates.items():
+            if func(data) != expected:
+                raise AssertionError(f"{name} disagrees with reference for size {size}")
+            best = min(timeit.repeat(lambda: func(data), repeat=args.repeat, number=args.number))
+            timings[name] = best / args.number * 1e6
+
+        baseline = timings["bitwise"]
+        for name, usec in timings.items():
+            print(f"size={size:5d} {name:10s} {usec:9.2f} us/op  x{baseline / usec:5.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from rtu_receiver.config import load_config
+from rtu_receiver.keystore import open_key_store, write_binary_keys, write_sqlite_keys
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Startup and lookup cost of keys.by_imei against key stores")
+    parser.add_argument("--keys", type=int, default=200000, help="Fleet size")
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    keys = {str(860000000000000 + i): rng.randbytes(16) for i in range(args.keys)}
+    imeis = rng.choices(list(keys), k=args.lookups)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        configs = {}
+        configs["json by_imei"] = {"by_imei": {imei: key.hex() for imei, key in keys.items()}}
+        write_binary_keys(keys.items(), root / "keys.bin")
+        configs["binary store"] = {"store": {"path": str(root / "keys.bin"), "format": "binary"}}
+        write_sqlite_keys(keys.items(), root / "keys.sqlite3")
+        configs["sqlite store"] = {"store": {"path": str(root / "keys.sqlite3"), "format": "sqlite"}}
+
+        for name, section in configs.items():
+            path = root / f"{name.replace(' ', '_')}.json"
+            path.write_text(json.dumps({"log_dir": str(root / "logs"), "keys": section}), encoding="utf-8")
+            started = time.perf_counter()
+            config = load_config(path)
+            startup_ms = (time.perf_counter() - started) * 1000
+            resolve = config.keys.resolve_key
+            store = config.keys.store
+            if store is not None:
+                # Uncached lookups: a fresh store whose LRU holds one entry.
+                cold_store = open_key_store(store.path, "binary" if name.startswith("binary") else "sqlite", 1)
+                cold = min(timeit.repeat(lambda: [cold_store.get(imei) for imei in imeis], number=1, repeat=3))
+                uncached = f"{cold / args.lookups * 1e6:6.2f} us"
+            else:
+                uncached = "     -   "
+            [resolve(imei) for imei in imeis]
+            hot = min(timeit.repeat(lambda: [resolve(imei) for imei in imeis], number=1, repeat=3))
+            print(
+                f"{name:13s} startup {startup_ms:9.1f} ms  "
+                f"lookup uncached {uncached}  cached {hot / args.lookups * 1e6:6.2f} us"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from rtu_receiver.loadgen import build_fleet, build_packets, fleet_keys, format_report, run_load
+
+
+def _pick_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+def _wait_ready(port: int, log_dir: Path, timeout: float = 10.0) -> None:
+    # Any datagram gets logged once the receiver is up; an invalid one stays out of the report.
+    deadline = time.monotonic() + timeout
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        while time.monotonic() < deadline:
+            sock.sendto(b"probe", ("127.0.0.1", port))
+            time.sleep(0.1)
+            if any(log_dir.glob("raw-*.jsonl")):
+                return
+    raise RuntimeError("receiver did not start")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end loopback throughput of a receiver under a device fleet")
+    parser.add_argument("--engine", default="blocking", choices=("blocking", "batched", "pipeline", "asyncio"))
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--period-s", type=float, default=10.0, help="Wake-up period of every device")
+    parser.add_argument("--duration-s", type=float, default=20.0)
+    parser.add_argument("--herd", type=float, default=0.3)
+    parser.add_argument("--archive-ratio", type=float, default=0.1)
+    parser.add_argument("--flush-records", type=int, default=500)
+    parser.add_argument("--flush-interval-s", type=float, default=0.2)
+    parser.add_argument("--rcvbuf", type=int, default=None, help="socket.rcvbuf for the receiver")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    fleet = build_fleet(args.devices, herd_fraction=args.herd, period_s=args.period_s)
+    packets = build_packets(fleet, args.duration_s, args.period_s, archive_ratio=args.archive_ratio)
+    port = _pick_port()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp) / "logs"
+        config = {
+            "listen_host": "127.0.0.1",
+            "listen_port": port,
+            "log_dir": str(log_dir),
+            "keys": {"default_hex": None, "by_imei": fleet_keys(fleet)},
+            "writer": {"flush_records": args.flush_records, "flush_interval_s": args.flush_interval_s},
+            "socket": {"rcvbuf": args.rcvbuf},
+        }
+        config_path = Path(tmp) / "receiver.json"
+        config_path.write_text(json.dumps(config), encoding="utf-8")
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(SRC), os.environ.get("PYTHONPATH")]))}
+        receiver = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "rtu_receiver",
+                "--config",
+                str(config_path),
+                "--engine",
+                args.engine,
+                "--workers",
+                str(args.workers),
+            ],
+            env=env,
+        )
+        try:
+            _wait_ready(port, log_dir)
+            print(f"{len(packets)} datagrams from {len(fleet)} devices over {args.duration_s:g} s", file=sys.stderr)
+            report = run_load(packets, "127.0.0.1", port, log_dir, devices=len(fleet))
+        finally:
+            receiver.send_signal(signal.SIGINT)
+            try:
+                receiver.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                receiver.kill()
+
+    report = {"engine": args.engine, "workers": args.workers, **report}
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from rtu_receiver.config import KeyConfig, ReceiverConfig
+from rtu_receiver.jsonl import JsonlWriter
+from rtu_receiver.metrics import DECODE_BUCKETS, MetricsRegistry, ReceiverMetrics
+from rtu_receiver.protocol import build_frame, build_plain_for_encrypt
+from rtu_receiver.udp_server import UdpReceiverServer
+from rtu_receiver.xtea import xtea_encrypt_ecb_le
+
+IMEI = "863703030668235"
+KEY = bytes.fromhex("79757975797579756f706f706f706f70")
+
+
+def _per_op_ns(func: Any, repeat: int, number: int) -> float:
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e9
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Cost of metric updates, alone and per received datagram")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    registry = MetricsRegistry()
+    counter = registry.counter("c_total", "c")
+    labeled = registry.counter("l_total", "l", ("stage", "reason"))
+    histogram = registry.histogram("h_seconds", "h", DECODE_BUCKETS)
+    print(f"counter.inc              {_per_op_ns(counter.inc, args.repeat, args.number):8.0f} ns/op")
+    child = lambda: labeled.labels("crc", "crc_mismatch").inc()  # noqa: E731
+    print(f"labels(...).inc          {_per_op_ns(child, args.repeat, args.number):8.0f} ns/op")
+    observe = lambda: histogram.observe(0.00042)  # noqa: E731
+    print(f"histogram.observe        {_per_op_ns(observe, args.repeat, args.number):8.0f} ns/op")
+    print(f"render (3 families)      {_per_op_ns(registry.render, args.repeat, 200) / 1000:8.1f} us/op")
+
+    payload = bytes.fromhex("09020101aa0202bbcc")
+    datagram = build_frame(IMEI, xtea_encrypt_ecb_le(build_plain_for_encrypt(payload), KEY))
+    config = ReceiverConfig("127.0.0.1", 0, Path("."), True, KeyConfig(None, {IMEI: KEY}))
+    with tempfile.TemporaryDirectory() as tmp, JsonlWriter(Path(tmp)) as writer:
+        server = UdpReceiverServer(config, writer)
+        process = lambda: server.process_datagram(datagram, "127.0.0.1", 5000)  # noqa: E731
+        variants: Dict[str, Optional[ReceiverMetrics]] = {"without metrics": None, "with metrics": ReceiverMetrics()}
+        timings = {name: float("inf") for name in variants}
+        for _ in range(args.number // 10):
+            process()
+        # Alternate the variants so drift in machine load hits both alike.
+        for _ in range(args.repeat):
+            for name, metrics in variants.items():
+                server.metrics = metrics
+                timings[name] = min(timings[name], _per_op_ns(process, 1, args.number // 10) / 1000)
+        for name, usec in timings.items():
+            print(f"process_datagram {name:16s} {usec:7.2f} us/op")
+        overhead = timings["with metrics"] - timings["without metrics"]
+        print(f"metrics overhead         {overhead:8.2f} us/datagram ({overhead / timings['without metrics']:.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
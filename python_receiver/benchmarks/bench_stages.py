@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from rtu_receiver.crc16 import crc16_ccitt_false
+from rtu_receiver.jsonl import encode_record
+from rtu_receiver.protocol import ProtocolError, decode_datagram, parse_imei, parse_payload, unstuff_payload
+from rtu_receiver.synthetic import ESCAPE_IMEI, IMEI, KEY, benchmark_cases
+from rtu_receiver.xtea import XteaCipherCache
+
+KEYS = {IMEI: KEY, ESCAPE_IMEI: KEY}
+
+
+def _per_op_ns(func: Callable[[], Any], repeat: int, number: int) -> float:
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e9
+
+
+def _full_decode(datagram: bytes, cache: XteaCipherCache) -> Callable[[], Any]:
+    def run() -> Any:
+        try:
+            return decode_datagram(datagram, KEYS.get, cache)
+        except ProtocolError as exc:
+            return exc
+
+    return run
+
+
+def stage_funcs(datagram: bytes, cache: XteaCipherCache) -> Dict[str, Callable[[], Any]]:
+    """The stages of decode_datagram as separate calls; invalid datagrams only get `decode`."""
+    stages: Dict[str, Callable[[], Any]] = {}
+    try:
+        result = decode_datagram(datagram, KEYS.get, cache)
+    except ProtocolError:
+        stages["decode"] = _full_decode(datagram, cache)
+        return stages
+
+    body = unstuff_payload(datagram, 1, len(datagram) - 1)
+    imei = parse_imei(body[:8])
+    ciphertext = body[8:]
+    cipher = cache.get(imei, KEYS[imei])
+    plaintext = cipher.decrypt(ciphertext)
+    payload = plaintext[:-2]
+    meta = {"ts_utc": "2025-01-01T00:00:00+00:00", "src_ip": "127.0.0.1", "src_port": 5000}
+
+    stages["unstuff"] = lambda: unstuff_payload(datagram, 1, len(datagram) - 1)
+    stages["xtea"] = lambda: cipher.decrypt(ciphertext)
+    stages["crc"] = lambda: crc16_ccitt_false(payload)
+    stages["parse"] = lambda: parse_payload(payload)
+    # The decoded record as the receiver builds and writes it; result is already parsed.
+    stages["json"] = lambda: encode_record({**result.to_json_dict(), **meta})
+    stages["decode"] = _full_decode(datagram, cache)
+    return stages
+
+
+def run(repeat: int, number: int, archive_events: int) -> Dict[str, Any]:
+    cache = XteaCipherCache()
+    results: Dict[str, float] = {}
+    for case, datagram in benchmark_cases(archive_events=archive_events).items():
+        for stage, func in stage_funcs(datagram, cache).items():
+            results[f"{case}.{stage}"] = round(_per_op_ns(func, repeat, number), 1)
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "number": number,
+        "results_ns": results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Lines describing results slower than baseline by more than threshold (0.1 = 10 %)."""
+    regressions: List[str] = []
+    for name, current in report["results_ns"].items():
+        previous = baseline.get("results_ns", {}).get(name)
+        if previous and current > previous * (1 + threshold):
+            regressions.append(f"{name}: {previous:.0f} -> {current:.0f} ns/op (+{current / previous - 1:.0%})")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Time each decode stage on synthetic datagrams")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--archive-events", type=int, default=24, help="Events in the archive case")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON instead of a table")
+    parser.add_argument("--save", default=None, help="Also write the JSON report here, e.g. as a new baseline")
+    parser.add_argument("--compare", default=None, help="Baseline JSON report; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown against --compare")
+    args = parser.parse_args(argv)
+
+    report = run(args.repeat, args.number, args.archive_events)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, ns in report["results_ns"].items():
+            print(f"{name:36s} {ns / 1000:9.2f} us/op")
+    if args.save is not None:
+        Path(args.save).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    if args.compare is not None:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%} against {args.compare}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .config import ReceiverConfig
+from .jsonl import JsonlWriter
+from .metrics import MetricsRegistry
+from .udp_server import Outputs, UdpReceiverServer, iso_utc
+
+# Async consumers of every datagram's output records (after they are written).
+Sink = Callable[[Outputs], Awaitable[None]]
+
+
+class _ReceiverProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: AsyncUdpReceiverServer) -> None:
+        self.server = server
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        self.server._on_datagram(data, addr[0], addr[1])
+
+    def error_received(self, exc: Exception) -> None:
+        print(f"socket error: {exc}", file=sys.stderr)
+
+
+class AsyncUdpReceiverServer(UdpReceiverServer):
+    """asyncio receiver built on `loop.create_datagram_endpoint`.
+
+    Decoding runs on a thread pool and all writer I/O on one dedicated
+    thread, so the event loop stays free for sinks, ACKs or a metrics
+    endpoint. Records are written in arrival order, as in blocking mode.
+    ACKs built on the decode threads are sent by the loop, through the
+    transport, which queues them while the socket's send buffer is full.
+    """
+
+    def __init__(
+        self,
+        config: ReceiverConfig,
+        writer: JsonlWriter,
+        log_level: str = "info",
+        sinks: Optional[List[Sink]] = None,
+        reuse_port: bool = False,
+    ) -> None:
+        super().__init__(config, writer, log_level=log_level, reuse_port=reuse_port)
+        self.sinks: List[Sink] = list(sinks or [])
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.dropped = 0
+        # Datagrams lost to an unexpected exception, by the stage that raised it.
+        self.failures = {"decode": 0, "write": 0}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue[Optional[asyncio.Future[Outputs]]]] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._first_written: Optional[asyncio.Event] = None
+        self._decode_executor: Optional[ThreadPoolExecutor] = None
+        self._io_executor: Optional[ThreadPoolExecutor] = None
+
+    def run(self, once: bool = False) -> None:
+        asyncio.run(self.serve(once=once))
+
+    def stop(self) -> None:
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update(
+            {
+                "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+                "dropped": self.dropped,
+                "writer_pending": self.writer.pending_records,
+                "failures": dict(self.failures),
+            }
+        )
+        return stats
+
+    def register_metrics(self, registry: MetricsRegistry) -> None:
+        super().register_metrics(registry)
+        registry.value_of(
+            "rtu_queue_depth",
+            "Datagrams waiting for decode or write",
+            "gauge",
+            lambda: self._queue.qsize() if self._queue is not None else 0,
+        )
+        registry.value_of(
+            "rtu_queue_dropped_total", "Datagrams dropped by the full queue", "counter", lambda: self.dropped
+        )
+        registry.collect(
+            "rtu_worker_failures_total",
+            "Datagrams lost to an unexpected error in decoding or writing",
+            "counter",
+            lambda: [("rtu_worker_failures_total", {"stage": stage}, count) for stage, count in self.failures.items()],
+        )
+
+    async def serve(self, once: bool = False) -> None:
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.config.pipeline.queue_size)
+        self._stopped = asyncio.Event()
+        self._first_written = asyncio.Event()
+        self._decode_executor = ThreadPoolExecutor(
+            max_workers=self.config.pipeline.decode_workers,
+            thread_name_prefix="rtu-decode",
+        )
+        self._io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rtu-writer")
+
+        sock = self.open_socket()
+        transport, _ = await loop.create_datagram_endpoint(lambda: _ReceiverProtocol(self), sock=sock)
+        self.transport = transport
+        writer_task = asyncio.create_task(self._write_loop())
+        try:
+            if once:
+                try:
+                    await asyncio.wait_for(self._first_written.wait(), timeout=5.0)
+                except asyncio.TimeoutError:
+                    raise TimeoutError("timeout waiting for UDP datagram") from None
+            else:
+                await self._stopped.wait()
+        finally:
+            transport.close()
+            self.transport = None
+            await self._queue.put(None)
+            await writer_task
+            self._decode_executor.shutdown(wait=True)
+            await loop.run_in_executor(self._io_executor, self.writer.flush)
+            self._io_executor.shutdown(wait=True)
+            if self.log_level == "debug":
+                print(f"asyncio stats: {self.stats()}", file=sys.stderr)
+
+    def send_replies(self, frames: List[bytes], addr: Tuple[str, int], started: float) -> None:
+        assert self._loop is not None
+        self._loop.call_soon_threadsafe(self._send_replies, frames, addr, started)
+
+    def _send_replies(self, frames: List[bytes], addr: Tuple[str, int], started: float) -> None:
+        transport = self.transport
+        # Closed on shutdown, while the last datagrams are still being decoded.
+        if transport is not None and self.responder is not None:
+            self.responder.send(transport, frames, addr, started)
+
+    def _on_datagram(self, datagram: bytes, src_ip: str, src_port: int) -> None:
+        assert self._loop is not None and self._queue is not None
+        if self._queue.full():
+            self.dropped += 1
+            return
+        future = self._loop.run_in_executor(
+            self._decode_executor,
+            self.process_datagram,
+            datagram,
+            src_ip,
+            src_port,
+            iso_utc(time.time()),
+        )
+        self._queue.put_nowait(future)
+
+    async def _write_loop(self) -> None:
+        assert self._queue is not None and self._loop is not None
+        idle_timeout = self.writer.flush_interval_s
+        while True:
+            if idle_timeout is None:
+                future = await self._queue.get()
+            else:
+                try:
+                    future = await asyncio.wait_for(self._queue.get(), timeout=idle_timeout)
+                except asyncio.TimeoutError:
+                    await self._loop.run_in_executor(self._io_executor, self.writer.flush_if_due)
+                    continue
+            if future is None:
+                return
+            try:
+                outputs = await future
+            except Exception as exc:  # noqa: BLE001 - a bad datagram must not stop the loop
+                self.failures["decode"] += 1
+                print(f"decode error: {exc!r}", file=sys.stderr)
+                continue
+
+            try:
+                await self._loop.run_in_executor(self._io_executor, self.emit, outputs)
+            except Exception as exc:  # noqa: BLE001 - a failed write must not stop the loop
+                self.failures["write"] += 1
+                print(f"writer error: {exc!r}", file=sys.stderr)
+            for sink in self.sinks:
+                try:
+                    await sink(outputs)
+                except Exception as exc:  # noqa: BLE001 - sinks are best effort
+                    print(f"sink error: {exc!r}", file=sys.stderr)
+            if self._first_written is not None:
+                self._first_written.set()
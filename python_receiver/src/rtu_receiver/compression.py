@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import lzma
+import os
+from pathlib import Path
+from typing import BinaryIO, Tuple
+
+# compression method -> file suffix
+SUFFIXES = {"gzip": ".gz", "lzma": ".xz"}
+_CHUNK = 1 << 20
+
+
+def is_compressed(path: Path) -> bool:
+    return path.suffix in (".gz", ".xz")
+
+
+def plain_path(path: Path) -> Path:
+    """`decoded-20250101.jsonl.gz` -> `decoded-20250101.jsonl`."""
+    return path.with_suffix("") if is_compressed(path) else path
+
+
+def open_log(path: Path) -> BinaryIO:
+    """Open a log for reading, decompressing `.gz` and `.xz` files on the fly."""
+    for method, suffix in SUFFIXES.items():
+        if path.suffix == suffix:
+            return _open_compressed(path, method, "rb")
+    return path.open("rb")
+
+
+def _open_compressed(path: Path, method: str, mode: str) -> BinaryIO:
+    if method == "gzip":
+        return gzip.open(path, mode, compresslevel=6)  # type: ignore[return-value]
+    return lzma.open(path, mode, preset=6 if "w" in mode else None)  # type: ignore[return-value]
+
+
+def _digest(fp: BinaryIO) -> Tuple[bytes, int]:
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := fp.read(_CHUNK):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.digest(), size
+
+
+def compress_file(path: Path, method: str) -> Path:
+    """Compress path next to itself, verify the result and delete the original.
+
+    The output is written under a temporary name, read back and compared
+    (SHA-256 and length) with the original before it takes its final name,
+    so at no point is the only copy of the data unverified. Raises
+    ValueError if verification fails; the original is then kept.
+    """
+    if method not in SUFFIXES:
+        raise ValueError(f"unknown compression method {method!r}")
+    final = path.with_name(path.name + SUFFIXES[method])
+    tmp = final.with_name(final.name + ".tmp")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with path.open("rb") as src, _open_compressed(tmp, method, "wb") as dst:
+            while chunk := src.read(_CHUNK):
+                digest.update(chunk)
+                size += len(chunk)
+                dst.write(chunk)
+        with _open_compressed(tmp, method, "rb") as check:
+            if _digest(check) != (digest.digest(), size):
+                raise ValueError(f"{tmp}: compressed data does not match {path}")
+        with tmp.open("rb+") as fp:
+            os.fsync(fp.fileno())
+        # Keep the original mtime; retention judges idleness by it.
+        stat = path.stat()
+        os.utime(tmp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, final)
+    path.unlink()
+    return final
@@ -1,23 +1,118 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, FrozenSet, Optional
+
+from .keystore import FORMATS, KeyStore, open_key_store
 
 
 @dataclass
 class KeyConfig:
     default_key: Optional[bytes]
     by_imei: Dict[str, bytes]
+    # Keys of a large fleet, looked up on demand; by_imei entries take precedence.
+    store: Optional[KeyStore] = None
 
     def resolve_key(self, imei: str) -> Optional[bytes]:
         key = self.by_imei.get(imei)
         if key is not None:
             return key
+        if self.store is not None:
+            key = self.store.get(imei)
+            if key is not None:
+                return key
         return self.default_key
 
 
+@dataclass
+class WriterConfig:
+    flush_records: int = 1
+    flush_interval_s: Optional[float] = None
+    max_bytes: Optional[int] = None
+    fsync: bool = False
+    # "jsonl" (raw-*.jsonl with hex datagrams) or "binary" (raw-*.bin, see rawlog.py)
+    raw_format: str = "jsonl"
+    # Sidecar `.idx` per JSONL file for `python -m rtu_receiver.query`
+    index: bool = False
+
+
+@dataclass
+class PipelineConfig:
+    queue_size: int = 10000
+    overflow: str = "drop_oldest"
+    decode_workers: int = 2
+    writer_queue_size: int = 10000
+
+
+@dataclass
+class SocketConfig:
+    rcvbuf: Optional[int] = None
+    batch_size: int = 64
+
+
+@dataclass
+class DedupConfig:
+    enabled: bool = False
+    ttl_s: float = 120.0
+    max_entries: int = 65536
+
+
+@dataclass
+class AckConfig:
+    enabled: bool = False
+    end_session: bool = False
+    cache_entries: int = 65536
+
+
+@dataclass
+class DownlinkConfig:
+    enabled: bool = False
+    db_path: Path = Path("./downlink.sqlite3")
+    max_payload: int = 256
+    retry_after_s: float = 60.0
+    max_attempts: int = 3
+
+
+@dataclass
+class RetentionConfig:
+    enabled: bool = False
+    # "gzip", "lzma" or None to only apply retention
+    compress: Optional[str] = "gzip"
+    max_age_days: Optional[int] = None
+    max_total_bytes: Optional[int] = None
+    interval_s: float = 3600.0
+    # Files of a finished day are left alone until unmodified this long.
+    min_idle_s: float = 600.0
+
+
+@dataclass
+class MetricsConfig:
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    # With --workers N, worker i listens on port + i.
+    port: int = 9102
+
+
+@dataclass
+class ProfilingConfig:
+    enabled: bool = False
+    # Time the stages of one datagram in every sample_every.
+    sample_every: int = 100
+    # Percentiles are taken over the last `window` samples of each stage.
+    window: int = 1024
+    summary_interval_s: float = 60.0
+
+
+@dataclass
+class ReloadConfig:
+    # Reload keys and decode settings on SIGHUP or when the file changes.
+    enabled: bool = False
+    # How often the config file and key store are checked; None: SIGHUP only.
+    poll_s: Optional[float] = 5.0
+
+
 @dataclass
 class ReceiverConfig:
     listen_host: str
@@ -25,6 +120,18 @@ class ReceiverConfig:
     log_dir: Path
     decode_enabled: bool
     keys: KeyConfig
+    writer: WriterConfig = field(default_factory=WriterConfig)
+    pipeline: PipelineConfig = field(default_factory=PipelineConfig)
+    socket: SocketConfig = field(default_factory=SocketConfig)
+    dedup: DedupConfig = field(default_factory=DedupConfig)
+    ack: AckConfig = field(default_factory=AckConfig)
+    downlink: DownlinkConfig = field(default_factory=DownlinkConfig)
+    retention: RetentionConfig = field(default_factory=RetentionConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    profiling: ProfilingConfig = field(default_factory=ProfilingConfig)
+    reload: ReloadConfig = field(default_factory=ReloadConfig)
+    # IMEIs whose payload is parsed into the decoded stream; None means all devices.
+    decoded_imeis: Optional[FrozenSet[str]] = None
 
 
 def _parse_hex_key(hex_value: Optional[str], field: str) -> Optional[bytes]:
@@ -43,6 +150,284 @@ def _parse_hex_key(hex_value: Optional[str], field: str) -> Optional[bytes]:
     return key
 
 
+def _parse_key_store(raw: object) -> Optional[KeyStore]:
+    if raw is None:
+        return None
+    if not isinstance(raw, dict):
+        raise ValueError("keys.store must be null or an object")
+
+    path = raw.get("path")
+    store_format = raw.get("format", "binary")
+    cache_entries = raw.get("cache_entries", 65536)
+
+    if not isinstance(path, str) or not path:
+        raise ValueError("keys.store.path must be a non-empty string")
+    if store_format not in FORMATS:
+        raise ValueError(f"keys.store.format must be one of {', '.join(FORMATS)}")
+    if not isinstance(cache_entries, int) or isinstance(cache_entries, bool) or cache_entries < 1:
+        raise ValueError("keys.store.cache_entries must be a positive integer")
+
+    try:
+        return open_key_store(path, store_format, cache_entries)
+    except OSError as exc:
+        raise ValueError(f"keys.store.path cannot be opened: {exc}") from exc
+    except ValueError as exc:
+        raise ValueError(f"keys.store: {exc}") from exc
+
+
+def _parse_writer(raw: object) -> WriterConfig:
+    if not isinstance(raw, dict):
+        raise ValueError("writer must be an object")
+
+    flush_records = raw.get("flush_records", 1)
+    flush_interval_s = raw.get("flush_interval_s")
+    max_bytes = raw.get("max_bytes")
+    fsync = raw.get("fsync", False)
+    raw_format = raw.get("raw_format", "jsonl")
+    index = raw.get("index", False)
+
+    if not isinstance(flush_records, int) or isinstance(flush_records, bool) or flush_records < 1:
+        raise ValueError("writer.flush_records must be a positive integer")
+    if flush_interval_s is not None and (
+        not isinstance(flush_interval_s, (int, float)) or isinstance(flush_interval_s, bool) or flush_interval_s <= 0
+    ):
+        raise ValueError("writer.flush_interval_s must be null or a positive number")
+    if max_bytes is not None and (not isinstance(max_bytes, int) or isinstance(max_bytes, bool) or max_bytes < 1):
+        raise ValueError("writer.max_bytes must be null or a positive integer")
+    if not isinstance(fsync, bool):
+        raise ValueError("writer.fsync must be boolean")
+    if raw_format not in ("jsonl", "binary"):
+        raise ValueError("writer.raw_format must be one of jsonl, binary")
+    if not isinstance(index, bool):
+        raise ValueError("writer.index must be boolean")
+
+    return WriterConfig(
+        flush_records=flush_records,
+        flush_interval_s=float(flush_interval_s) if flush_interval_s is not None else None,
+        max_bytes=max_bytes,
+        fsync=fsync,
+        raw_format=raw_format,
+        index=index,
+    )
+
+
+def _parse_pipeline(raw: object) -> PipelineConfig:
+    if not isinstance(raw, dict):
+        raise ValueError("pipeline must be an object")
+
+    defaults = PipelineConfig()
+    queue_size = raw.get("queue_size", defaults.queue_size)
+    overflow = raw.get("overflow", defaults.overflow)
+    decode_workers = raw.get("decode_workers", defaults.decode_workers)
+    writer_queue_size = raw.get("writer_queue_size", defaults.writer_queue_size)
+
+    for name, value in (
+        ("queue_size", queue_size),
+        ("decode_workers", decode_workers),
+        ("writer_queue_size", writer_queue_size),
+    ):
+        if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+            raise ValueError(f"pipeline.{name} must be a positive integer")
+    if overflow not in ("drop_oldest", "drop_newest", "block"):
+        raise ValueError("pipeline.overflow must be one of drop_oldest, drop_newest, block")
+
+    return PipelineConfig(
+        queue_size=queue_size,
+        overflow=overflow,
+        decode_workers=decode_workers,
+        writer_queue_size=writer_queue_size,
+    )
+
+
+def _parse_socket(raw: object) -> SocketConfig:
+    if not isinstance(raw, dict):
+        raise ValueError("socket must be an object")
+
+    rcvbuf = raw.get("rcvbuf")
+    batch_size = raw.get("batch_size", 64)
+
+    if rcvbuf is not None and (not isinstance(rcvbuf, int) or isinstance(rcvbuf, bool) or rcvbuf < 1):
+        raise ValueError("socket.rcvbuf must be null or a positive integer")
+    if not isinstance(batch_size, int) or isinstance(batch_size, bool) or batch_size < 1:
+        raise ValueError("socket.batch_size must be a positive integer")
+
+    return SocketConfig(rcvbuf=rcvbuf, batch_size=batch_size)
+
+
+def _parse_dedup(raw: object) -> DedupConfig:
+    if not isinstance(raw, dict):
+        raise ValueError("dedup must be an object")
+
+    defaults = DedupConfig()
+    enabled = raw.get("enabled", defaults.enabled)
+    ttl_s = raw.get("ttl_s", defaults.ttl_s)
+    max_entries = raw.get("max_entries", defaults.max_entries)
+
+    if not isinstance(enabled, bool):
+        raise ValueError("dedup.enabled must be boolean")
+    if not isinstance(ttl_s, (int, float)) or isinstance(ttl_s, bool) or ttl_s <= 0:
+        raise ValueError("dedup.ttl_s must be a positive number")
+    if not isinstance(max_entries, int) or isinstance(max_entries, bool) or max_entries < 1:
+        raise ValueError("dedup.max_entries must be a positive integer")
+
+    return DedupConfig(enabled=enabled, ttl_s=float(ttl_s), max_entries=max_entries)
+
+
+def _parse_ack(raw: object) -> AckConfig:
+    if not isinstance(raw, dict):
+        raise ValueError("ack must be an object")
+
+    defaults = AckConfig()
+    enabled = raw.get("enabled", defaults.enabled)
+    end_session = raw.get("end_session", defaults.end_session)
+    cache_entries = raw.get("cache_entries", defaults.cache_entries)
+
+    if not isinstance(enabled, bool):
+        raise ValueError("ack.enabled must be boolean")
+    if not isinstance(end_session, bool):
+        raise ValueError("ack.end_session must be boolean")
+    if not isinstance(cache_entries, int) or isinstance(cache_entries, bool) or cache_entries < 1:
+        raise ValueError("ack.cache_entries must be a positive integer")
+
+    return AckConfig(enabled=enabled, end_session=end_session, cache_entries=cache_entries)
+
+
+def _parse_downlink(raw: object) -> DownlinkConfig:
+    if not isinstance(raw, dict):
+        raise ValueError("downlink must be an object")
+
+    defaults = DownlinkConfig()
+    enabled = raw.get("enabled", defaults.enabled)
+    db_path = raw.get("db_path", str(defaults.db_path))
+    max_payload = raw.get("max_payload", defaults.max_payload)
+    retry_after_s = raw.get("retry_after_s", defaults.retry_after_s)
+    max_attempts = raw.get("max_attempts", defaults.max_attempts)
+
+    if not isinstance(enabled, bool):
+        raise ValueError("downlink.enabled must be boolean")
+    if not isinstance(db_path, str) or not db_path:
+        raise ValueError("downlink.db_path must be a non-empty string")
+    if not isinstance(max_payload, int) or isinstance(max_payload, bool) or max_payload < 1:
+        raise ValueError("downlink.max_payload must be a positive integer")
+    if not isinstance(retry_after_s, (int, float)) or isinstance(retry_after_s, bool) or retry_after_s <= 0:
+        raise ValueError("downlink.retry_after_s must be a positive number")
+    if not isinstance(max_attempts, int) or isinstance(max_attempts, bool) or max_attempts < 1:
+        raise ValueError("downlink.max_attempts must be a positive integer")
+
+    return DownlinkConfig(
+        enabled=enabled,
+        db_path=Path(db_path),
+        max_payload=max_payload,
+        retry_after_s=float(retry_after_s),
+        max_attempts=max_attempts,
+    )
+
+
+def _parse_retention(raw: object) -> RetentionConfig:
+    if not isinstance(raw, dict):
+        raise ValueError("retention must be an object")
+
+    defaults = RetentionConfig()
+    enabled = raw.get("enabled", defaults.enabled)
+    compress = raw.get("compress", defaults.compress)
+    max_age_days = raw.get("max_age_days", defaults.max_age_days)
+    max_total_bytes = raw.get("max_total_bytes", defaults.max_total_bytes)
+    interval_s = raw.get("interval_s", defaults.interval_s)
+    min_idle_s = raw.get("min_idle_s", defaults.min_idle_s)
+
+    if not isinstance(enabled, bool):
+        raise ValueError("retention.enabled must be boolean")
+    if compress not in (None, "gzip", "lzma"):
+        raise ValueError("retention.compress must be null or one of gzip, lzma")
+    if max_age_days is not None and (
+        not isinstance(max_age_days, int) or isinstance(max_age_days, bool) or max_age_days < 1
+    ):
+        raise ValueError("retention.max_age_days must be null or a positive integer")
+    if max_total_bytes is not None and (
+        not isinstance(max_total_bytes, int) or isinstance(max_total_bytes, bool) or max_total_bytes < 1
+    ):
+        raise ValueError("retention.max_total_bytes must be null or a positive integer")
+    if not isinstance(interval_s, (int, float)) or isinstance(interval_s, bool) or interval_s <= 0:
+        raise ValueError("retention.interval_s must be a positive number")
+    if not isinstance(min_idle_s, (int, float)) or isinstance(min_idle_s, bool) or min_idle_s < 0:
+        raise ValueError("retention.min_idle_s must be a non-negative number")
+
+    return RetentionConfig(
+        enabled=enabled,
+        compress=compress,
+        max_age_days=max_age_days,
+        max_total_bytes=max_total_bytes,
+        interval_s=float(interval_s),
+        min_idle_s=float(min_idle_s),
+    )
+
+
+def _parse_metrics(raw: object) -> MetricsConfig:
+    if not isinstance(raw, dict):
+        raise ValueError("metrics must be an object")
+
+    defaults = MetricsConfig()
+    enabled = raw.get("enabled", defaults.enabled)
+    host = raw.get("host", defaults.host)
+    port = raw.get("port", defaults.port)
+
+    if not isinstance(enabled, bool):
+        raise ValueError("metrics.enabled must be boolean")
+    if not isinstance(host, str) or not host:
+        raise ValueError("metrics.host must be a non-empty string")
+    if not isinstance(port, int) or isinstance(port, bool) or not 0 <= port <= 65535:
+        raise ValueError("metrics.port must be in range 0..65535")
+
+    return MetricsConfig(enabled=enabled, host=host, port=port)
+
+
+def _parse_profiling(raw: object) -> ProfilingConfig:
+    if not isinstance(raw, dict):
+        raise ValueError("profiling must be an object")
+
+    defaults = ProfilingConfig()
+    enabled = raw.get("enabled", defaults.enabled)
+    sample_every = raw.get("sample_every", defaults.sample_every)
+    window = raw.get("window", defaults.window)
+    summary_interval_s = raw.get("summary_interval_s", defaults.summary_interval_s)
+
+    if not isinstance(enabled, bool):
+        raise ValueError("profiling.enabled must be boolean")
+    if not isinstance(sample_every, int) or isinstance(sample_every, bool) or sample_every < 1:
+        raise ValueError("profiling.sample_every must be a positive integer")
+    if not isinstance(window, int) or isinstance(window, bool) or window < 1:
+        raise ValueError("profiling.window must be a positive integer")
+    if (
+        not isinstance(summary_interval_s, (int, float))
+        or isinstance(summary_interval_s, bool)
+        or summary_interval_s <= 0
+    ):
+        raise ValueError("profiling.summary_interval_s must be a positive number")
+
+    return ProfilingConfig(
+        enabled=enabled,
+        sample_every=sample_every,
+        window=window,
+        summary_interval_s=float(summary_interval_s),
+    )
+
+
+def _parse_reload(raw: object) -> ReloadConfig:
+    if not isinstance(raw, dict):
+        raise ValueError("reload must be an object")
+
+    defaults = ReloadConfig()
+    enabled = raw.get("enabled", defaults.enabled)
+    poll_s = raw.get("poll_s", defaults.poll_s)
+
+    if not isinstance(enabled, bool):
+        raise ValueError("reload.enabled must be boolean")
+    if poll_s is not None and (not isinstance(poll_s, (int, float)) or isinstance(poll_s, bool) or poll_s <= 0):
+        raise ValueError("reload.poll_s must be null or a positive number")
+
+    return ReloadConfig(enabled=enabled, poll_s=float(poll_s) if poll_s is not None else None)
+
+
 def load_config(path: str | Path) -> ReceiverConfig:
     cfg_path = Path(path)
     if not cfg_path.exists():
@@ -84,10 +469,52 @@ def load_config(path: str | Path) -> ReceiverConfig:
         if by_imei[imei] is None:
             raise ValueError(f"keys.by_imei[{imei}] cannot be null")
 
+    store = _parse_key_store(keys.get("store"))
+
+    decoded_imeis_raw = raw.get("decoded_imeis")
+    decoded_imeis: Optional[FrozenSet[str]] = None
+    if decoded_imeis_raw is not None:
+        if not isinstance(decoded_imeis_raw, list) or not all(
+            isinstance(imei, str) and imei.isdigit() for imei in decoded_imeis_raw
+        ):
+            raise ValueError("decoded_imeis must be null or a list of IMEI strings with digits only")
+        decoded_imeis = frozenset(decoded_imeis_raw)
+
+    writer = _parse_writer(raw.get("writer", {}))
+    pipeline = _parse_pipeline(raw.get("pipeline", {}))
+    socket_cfg = _parse_socket(raw.get("socket", {}))
+    dedup = _parse_dedup(raw.get("dedup", {}))
+    ack = _parse_ack(raw.get("ack", {}))
+    downlink = _parse_downlink(raw.get("downlink", {}))
+    if downlink.enabled and not ack.enabled:
+        raise ValueError("downlink.enabled requires ack.enabled")
+    retention = _parse_retention(raw.get("retention", {}))
+    if retention.enabled and writer.flush_records > 1 and (
+        writer.flush_interval_s is None or writer.flush_interval_s > retention.min_idle_s
+    ):
+        # Otherwise a quiet stream can hold yesterday's records past the point retention compresses the file.
+        raise ValueError(
+            "retention.enabled with writer.flush_records > 1 requires writer.flush_interval_s <= retention.min_idle_s"
+        )
+    metrics = _parse_metrics(raw.get("metrics", {}))
+    profiling = _parse_profiling(raw.get("profiling", {}))
+    reload = _parse_reload(raw.get("reload", {}))
+
     return ReceiverConfig(
         listen_host=listen_host,
         listen_port=listen_port,
         log_dir=Path(log_dir),
         decode_enabled=decode_enabled,
-        keys=KeyConfig(default_key=default_key, by_imei=by_imei),
+        keys=KeyConfig(default_key=default_key, by_imei=by_imei, store=store),
+        writer=writer,
+        pipeline=pipeline,
+        socket=socket_cfg,
+        dedup=dedup,
+        ack=ack,
+        downlink=downlink,
+        retention=retention,
+        metrics=metrics,
+        profiling=profiling,
+        reload=reload,
+        decoded_imeis=decoded_imeis,
     )
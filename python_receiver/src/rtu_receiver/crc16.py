@@ -1,13 +1,54 @@
 from __future__ import annotations
 
+_POLY = 0x1021
 
-def crc16_ccitt_false(data: bytes, init: int = 0xFFFF) -> int:
-    crc = init & 0xFFFF
-    for byte in data:
-        crc ^= byte << 8
+
+def _build_table() -> tuple[int, ...]:
+    table = []
+    for index in range(256):
+        crc = index << 8
         for _ in range(8):
             if crc & 0x8000:
-                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+                crc = ((crc << 1) ^ _POLY) & 0xFFFF
             else:
                 crc = (crc << 1) & 0xFFFF
+        table.append(crc)
+    return tuple(table)
+
+
+# CRC of every possible high byte, so each input byte costs one lookup instead of 8 shifts.
+_CRC16_TABLE = _build_table()
+
+
+def crc16_ccitt_false(data: bytes, init: int = 0xFFFF) -> int:
+    crc = init & 0xFFFF
+    table = _CRC16_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFF00) ^ table[(crc >> 8) ^ byte]
     return crc
+
+
+class Crc16:
+    """Incremental CRC16-CCITT (FALSE): feed chunks with update(), read with digest()."""
+
+    __slots__ = ("_crc",)
+
+    def __init__(self, data: bytes = b"", init: int = 0xFFFF) -> None:
+        self._crc = init & 0xFFFF
+        if data:
+            self.update(data)
+
+    def update(self, data: bytes) -> None:
+        crc = self._crc
+        table = _CRC16_TABLE
+        for byte in data:
+            crc = ((crc << 8) & 0xFF00) ^ table[(crc >> 8) ^ byte]
+        self._crc = crc
+
+    def digest(self) -> int:
+        return self._crc
+
+    def copy(self) -> Crc16:
+        clone = Crc16.__new__(Crc16)
+        clone._crc = self._crc
+        return clone
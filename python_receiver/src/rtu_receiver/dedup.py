@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+from .records import Archive, JsonRecord
+
+
+def datagram_digest(datagram: bytes | memoryview) -> bytes:
+    return hashlib.blake2b(datagram, digest_size=16).digest()
+
+
+class TtlCache:
+    """Bounded map of recently seen keys, each kept for `ttl_s` after first sight.
+
+    Seeing a key again does not extend its lifetime, so insertion order is
+    also expiry order and expired keys are purged from the front. A value can
+    be attached to a live key, e.g. the replies already sent for a datagram.
+    """
+
+    def __init__(
+        self,
+        ttl_s: float,
+        max_entries: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if ttl_s <= 0:
+            raise ValueError("ttl_s must be positive")
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def seen(self, key: Hashable) -> bool:
+        """True if key was added within the TTL; otherwise add it and return False."""
+        now = self._clock()
+        with self._lock:
+            entries = self._entries
+            while entries:
+                oldest, (expires_at, _) = next(iter(entries.items()))
+                if expires_at > now:
+                    break
+                del entries[oldest]
+
+            if key in entries:
+                self.hits += 1
+                return True
+
+            self.misses += 1
+            entries[key] = (now + self.ttl_s, None)
+            if len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self.evicted += 1
+            return False
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] <= self._clock():
+            return default
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Attach value to key if it is still cached; its expiry is unchanged."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], value)
+
+    def discard(self, key: Hashable) -> None:
+        """Forget key, so the next `seen(key)` adds it again."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+        }
+
+
+class Deduplicator:
+    """Suppresses UDP retransmits.
+
+    Byte-identical datagrams are recognized by digest before any decryption;
+    the digest of one that fails to decode is discarded again (see
+    UdpReceiverServer.respond), so its retransmit is decoded once more.
+    Archive packets (ID=3) resent with different bytes are recognized after
+    decoding by IMEI + seq. Since seq is one byte and wraps, `ttl_s` should
+    stay well below the time a device needs to send 256 archive packets.
+    """
+
+    def __init__(
+        self,
+        ttl_s: float = 120.0,
+        max_entries: int = 65536,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.datagrams = TtlCache(ttl_s, max_entries, clock)
+        self.archives = TtlCache(ttl_s, max_entries, clock)
+
+    def is_duplicate_datagram(self, datagram: bytes | memoryview) -> bool:
+        return self.datagrams.seen(datagram_digest(datagram))
+
+    def fresh_records(self, imei: str, records: List[JsonRecord]) -> List[JsonRecord]:
+        """records without the archives whose IMEI + seq was already seen; records itself if none was."""
+        seen = self.archives.seen
+        duplicates = [
+            index for index, record in enumerate(records) if isinstance(record, Archive) and seen((imei, record.seq))
+        ]
+        if not duplicates:
+            return records
+        return [record for index, record in enumerate(records) if index not in duplicates]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"datagrams": self.datagrams.stats(), "archives": self.archives.stats()}
+
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from .protocol import END_OF_REQUESTS
+from .records import ConfigResponse, JsonRecord, ReadResponse
+
+CONFIG_COMMAND = 1
+READ_COMMAND = 6
+TIME_PARAM = 1
+
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS commands (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    imei TEXT NOT NULL,
+    data_id INTEGER NOT NULL,
+    param_id INTEGER NOT NULL,
+    data BLOB,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    answered_at REAL,
+    result_code INTEGER,
+    response BLOB
+);
+CREATE INDEX IF NOT EXISTS commands_open ON commands (imei, status);
+"""
+
+_OPEN_STATUSES = (STATUS_PENDING, STATUS_SENT)
+
+
+@dataclass
+class Command:
+    id: int
+    imei: str
+    data_id: int
+    param_id: int
+    # None for a time sync: the device gets the unix time at send time.
+    data: Optional[bytes]
+    attempts: int = 0
+
+    def payload(self, now: float) -> bytes:
+        data = self.data if self.data is not None else int(now).to_bytes(4, "little")
+        return bytes((self.data_id, self.param_id, len(data))) + data
+
+
+def pack_payloads(commands: Iterable[Command], now: float, max_payload: int) -> List[bytes]:
+    """Concatenate command blocks into as few payloads as fit `max_payload`.
+
+    A block larger than `max_payload` still goes out, alone in its payload.
+    The end-of-requests command (param 55) closes the last payload, so the
+    device does not keep its modem awake waiting for more.
+    """
+    payloads: List[bytes] = []
+    current = b""
+    for block in [command.payload(now) for command in commands] + [END_OF_REQUESTS]:
+        if current and len(current) + len(block) > max_payload:
+            payloads.append(current)
+            current = b""
+        current += block
+    payloads.append(current)
+    return payloads
+
+
+class CommandStore:
+    """Per-IMEI queue of configuration (ID=1) and read (ID=6) commands in SQLite.
+
+    Commands are handed out when the device reports telemetry, and a sent
+    command is matched with the first ID=2/ID=7 response for its parameter.
+    An unanswered command is sent again after `retry_after_s` and marked
+    failed after `max_attempts` sends. Other processes (e.g. the CLI below)
+    may enqueue into the same database at any time.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        retry_after_s: float = 60.0,
+        max_attempts: int = 3,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.retry_after_s = retry_after_s
+        self.max_attempts = max_attempts
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        # IMEIs with open commands, so telemetry from every other device skips the
+        # table; reloaded when another connection commits (PRAGMA data_version).
+        self._open_imeis: Set[str] = set()
+        self._data_version = -1
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def enqueue(self, imei: str, data_id: int, param_id: int, data: Optional[bytes] = b"") -> int:
+        if not imei.isdigit():
+            raise ValueError("imei must contain digits only")
+        if data_id not in (CONFIG_COMMAND, READ_COMMAND):
+            raise ValueError("data_id must be 1 (config) or 6 (read)")
+        if not 0 <= param_id <= 255:
+            raise ValueError("param_id must be in range 0..255")
+        if data is not None and len(data) > 255:
+            raise ValueError("command data must be at most 255 bytes")
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO commands (imei, data_id, param_id, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                (imei, data_id, param_id, data, self._clock()),
+            )
+            self._open_imeis.add(imei)
+            return int(cursor.lastrowid)
+
+    def enqueue_time_sync(self, imei: str) -> int:
+        return self.enqueue(imei, CONFIG_COMMAND, TIME_PARAM, None)
+
+    def take_due(self, imei: str) -> List[Command]:
+        """Commands to send to imei now, marked as sent."""
+        with self._lock:
+            self._refresh_open_imeis()
+            if imei not in self._open_imeis:
+                return []
+
+            now = self._clock()
+            rows = self._db.execute(
+                "SELECT id, data_id, param_id, data, status, attempts, sent_at FROM commands "
+                "WHERE imei = ? AND status IN (?, ?) ORDER BY id",
+                (imei, *_OPEN_STATUSES),
+            ).fetchall()
+
+            due: List[Command] = []
+            failed: List[int] = []
+            for command_id, data_id, param_id, data, status, attempts, sent_at in rows:
+                if status == STATUS_SENT and sent_at is not None and now - sent_at < self.retry_after_s:
+                    continue
+                if attempts >= self.max_attempts:
+                    failed.append(command_id)
+                    continue
+                due.append(Command(command_id, imei, data_id, param_id, data, attempts + 1))
+
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "UPDATE commands SET status = ?, attempts = ?, sent_at = ? WHERE id = ?",
+                [(STATUS_SENT, command.attempts, now, command.id) for command in due],
+            )
+            self._db.executemany("UPDATE commands SET status = ? WHERE id = ?", [(STATUS_FAILED, i) for i in failed])
+            self._db.execute("COMMIT")
+            if len(failed) == len(rows):
+                self._open_imeis.discard(imei)
+            return due
+
+    def release(self, commands: Iterable[Command]) -> None:
+        """Give back the attempt of commands from take_due whose frames could not be sent.
+
+        They are due again at the device's next telemetry. A command that was
+        sent before keeps its `sent` status, so a late response still matches.
+        """
+        rows = [
+            (STATUS_PENDING if command.attempts <= 1 else STATUS_SENT, command.attempts - 1, command.id, STATUS_SENT)
+            for command in commands
+        ]
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "UPDATE commands SET status = ?, attempts = ?, sent_at = NULL WHERE id = ? AND status = ?",
+                rows,
+            )
+            self._db.execute("COMMIT")
+            self._open_imeis.update(command.imei for command in commands)
+
+    def record_responses(self, imei: str, records: Iterable[JsonRecord]) -> int:
+        """Match ID=2/ID=7 records to the oldest sent command for their parameter; returns matches."""
+        matched = 0
+        for record in records:
+            if isinstance(record, ConfigResponse):
+                data_id, response = CONFIG_COMMAND, None
+            elif isinstance(record, ReadResponse):
+                data_id, response = READ_COMMAND, bytes(record.data)
+            else:
+                continue
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT id FROM commands WHERE imei = ? AND data_id = ? AND param_id = ? AND status = ? "
+                    "ORDER BY id LIMIT 1",
+                    (imei, data_id, record.param_id, STATUS_SENT),
+                ).fetchone()
+                if row is None:
+                    continue
+                self._db.execute(
+                    "UPDATE commands SET status = ?, answered_at = ?, result_code = ?, response = ? WHERE id = ?",
+                    (STATUS_DONE, self._clock(), record.result_code, response, row[0]),
+                )
+            matched += 1
+        return matched
+
+    def list(self, imei: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = "SELECT * FROM commands"
+        params: tuple[str, ...] = ()
+        if imei is not None:
+            query += " WHERE imei = ?"
+            params = (imei,)
+        with self._lock:
+            cursor = self._db.execute(query + " ORDER BY id", params)
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        out = []
+        for row in rows:
+            item = dict(zip(columns, row))
+            for name in ("data", "response"):
+                if item[name] is not None:
+                    item[name] = bytes(item[name]).hex()
+            out.append(item)
+        return out
+
+    def _refresh_open_imeis(self) -> None:
+        version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._data_version = version
+        rows = self._db.execute(
+            "SELECT DISTINCT imei FROM commands WHERE status IN (?, ?)",
+            _OPEN_STATUSES,
+        ).fetchall()
+        self._open_imeis = {row[0] for row in rows}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Queue commands for devices and inspect their responses")
+    parser.add_argument("--db", required=True, help="Downlink SQLite database (downlink.db_path)")
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    config_cmd = sub.add_parser("config", help="Queue a configuration command (ID=1)")
+    config_cmd.add_argument("imei")
+    config_cmd.add_argument("param_id", type=int)
+    config_cmd.add_argument("value", nargs="?", default="", help="Value bytes as hex")
+    config_cmd.add_argument("--text", action="store_true", help="Treat value as ASCII text (e.g. an APN)")
+
+    read_cmd = sub.add_parser("read", help="Queue a read command (ID=6)")
+    read_cmd.add_argument("imei")
+    read_cmd.add_argument("param_id", type=int)
+
+    time_cmd = sub.add_parser("time", help="Queue a time sync (param 1, sent with the current time)")
+    time_cmd.add_argument("imei")
+
+    list_cmd = sub.add_parser("list", help="Print queued commands as JSONL")
+    list_cmd.add_argument("--imei", default=None)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    store = CommandStore(args.db)
+    try:
+        if args.action == "list":
+            for item in store.list(args.imei):
+                sys.stdout.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n")
+            return 0
+        if args.action == "config":
+            value = args.value.encode("ascii") if args.text else bytes.fromhex(args.value)
+            command_id = store.enqueue(args.imei, CONFIG_COMMAND, args.param_id, value)
+        elif args.action == "read":
+            command_id = store.enqueue(args.imei, READ_COMMAND, args.param_id)
+        else:
+            command_id = store.enqueue_time_sync(args.imei)
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    finally:
+        store.close()
+    print(command_id)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,31 +1,303 @@
 from __future__ import annotations
 
+import heapq
 import json
+import os
+import re
+import threading
+import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+from .compression import open_log
+from .logindex import IndexWriter
+
+_SECONDS_PER_DAY = 86400
+
+
+def log_file_name(stream: str, day: str, part: int = 0, shard: Optional[str] = None, ext: str = "jsonl") -> str:
+    """`raw-20250101.jsonl`, then `raw-20250101.1.jsonl`, ... after size rotation.
+
+    Worker processes add their shard tag: `raw-20250101.w3.jsonl`. Binary
+    raw logs use `ext="bin"`.
+    """
+    shard_suffix = f".{shard}" if shard else ""
+    part_suffix = f".{part}" if part else ""
+    return f"{stream}-{day}{shard_suffix}{part_suffix}.{ext}"
+
+
+_LOG_NAME_RE = re.compile(
+    r"^(?P<stream>[a-z]+)-(?P<day>\d{8})(?:\.(?P<shard>[A-Za-z]\w*))?(?:\.(?P<part>\d+))?"
+    r"\.(?P<ext>jsonl|bin)(?:\.(?P<compression>gz|xz))?$"
+)
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    """One JSONL line exactly as the receiver writes it."""
+    return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def parse_log_name(name: str) -> Optional[Dict[str, Any]]:
+    """stream, day, shard ("" if none), part, ext and compression ("" if none) of a receiver log file name.
+
+    None if it is not one.
+    """
+    match = _LOG_NAME_RE.match(name)
+    if match is None:
+        return None
+    return {
+        "stream": match["stream"],
+        "day": match["day"],
+        "shard": match["shard"] or "",
+        "part": int(match["part"] or 0),
+        "ext": match["ext"],
+        "compression": match["compression"] or "",
+    }
+
+
+def iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    with open_log(path) as fp:
+        for line in fp:
+            if line.strip():
+                yield json.loads(line)
+
+
+def list_logs(log_dir: Path, stream: str, ext: str = "jsonl") -> List[tuple[str, str, int, Path]]:
+    """(day, shard, part, path) of the stream's files, sorted; compressed or not.
+
+    A file that exists both plain and compressed (compression was cut short)
+    is listed once, as the plain file.
+    """
+    found: Dict[tuple[str, str, int], Path] = {}
+    for path in log_dir.glob(f"{stream}-*.{ext}*"):
+        parsed = parse_log_name(path.name)
+        if parsed is None or parsed["stream"] != stream or parsed["ext"] != ext:
+            continue
+        key = (parsed["day"], parsed["shard"], parsed["part"])
+        if key not in found or not parsed["compression"]:
+            found[key] = path
+    return [(*key, path) for key, path in sorted(found.items())]
+
+
+def shard_files(log_dir: Path, stream: str, day: str) -> Dict[str, List[Path]]:
+    """Files of one stream and day grouped by shard ("" for unsharded), parts in write order."""
+    found: Dict[str, List[Path]] = {}
+    for file_day, shard, _, path in list_logs(log_dir, stream):
+        if file_day == day:
+            found.setdefault(shard, []).append(path)
+    return found
+
+
+def merge_shards(log_dir: Path, stream: str, day: str) -> Iterator[Dict[str, Any]]:
+    """All records of one stream and day across worker shards, ordered by `ts_utc`."""
+
+    def _shard_records(paths: List[Path]) -> Iterator[Dict[str, Any]]:
+        for path in paths:
+            yield from iter_jsonl(path)
+
+    shards = shard_files(log_dir, stream, day)
+    return heapq.merge(*(_shard_records(paths) for paths in shards.values()), key=lambda rec: rec.get("ts_utc", ""))
+
+
+class _OpenStream:
+    __slots__ = ("fp", "path", "part", "size", "index")
+
+    def __init__(self, fp: BinaryIO, path: Path, part: int, size: int, index: Optional[IndexWriter]) -> None:
+        self.fp = fp
+        self.path = path
+        self.part = part
+        self.size = size
+        self.index = index
+
+    def close(self) -> None:
+        self.fp.close()
+        if self.index is not None:
+            self.index.close()
 
 
 class JsonlWriter:
-    def __init__(self, log_dir: Path) -> None:
+    """Appends records to per-stream daily JSONL files.
+
+    One handle is kept open per stream and swapped at UTC midnight (and at
+    `max_bytes`, when set). The previous day's handles are closed by the
+    first write or flush after midnight, whichever stream it is for. Records are flushed to the OS every
+    `flush_records` records or `flush_interval_s` seconds, whichever comes
+    first; `fsync=True` additionally forces every flush to disk. The default
+    (`flush_records=1`) makes each record visible as soon as it is written.
+    `shard` tags file names so several processes can share one log_dir.
+    With `index=True` every JSONL file gets a sidecar `.idx` (see logindex.py)
+    for time/IMEI queries.
+    """
+
+    def __init__(
+        self,
+        log_dir: Path,
+        flush_records: int = 1,
+        flush_interval_s: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        fsync: bool = False,
+        shard: Optional[str] = None,
+        index: bool = False,
+    ) -> None:
+        if flush_records <= 0:
+            raise ValueError("flush_records must be positive")
+        if flush_interval_s is not None and flush_interval_s <= 0:
+            raise ValueError("flush_interval_s must be positive")
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+
         self.log_dir = log_dir
         self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.flush_records = flush_records
+        self.flush_interval_s = flush_interval_s
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+        self.shard = shard
+        self.index = index
+
+        self._lock = threading.Lock()
+        self._streams: Dict[str, _OpenStream] = {}
+        self._day = ""
+        self._day_end = 0.0
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._closed = False
 
     @staticmethod
     def utc_now_iso() -> str:
         return datetime.now(tz=timezone.utc).isoformat()
 
+    @property
+    def pending_records(self) -> int:
+        return self._pending
+
+    def __enter__(self) -> JsonlWriter:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
     def write_raw(self, record: Dict[str, Any]) -> None:
-        self._write("raw", record)
+        self.write("raw", record)
 
     def write_decoded(self, record: Dict[str, Any]) -> None:
-        self._write("decoded", record)
+        self.write("decoded", record)
 
     def write_error(self, record: Dict[str, Any]) -> None:
-        self._write("errors", record)
+        self.write("errors", record)
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._roll_day_if_due():
+                self._flush_locked()
+
+    def flush_if_due(self) -> None:
+        with self._lock:
+            if not self._roll_day_if_due() and self._pending and self._flush_due():
+                self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            for stream in self._streams.values():
+                stream.close()
+            self._streams.clear()
+            self._closed = True
+
+    def write(self, stream: str, record: Dict[str, Any]) -> None:
+        self._append(stream, encode_record(record), None, record)
+
+    def write_binary(self, stream: str, data: bytes, header: bytes) -> None:
+        """Append an already encoded binary record to `<stream>-YYYYMMDD.bin`.
+
+        `header` starts every new file. Files left by an earlier run are never
+        appended to, since they may end in a record cut short by a crash.
+        """
+        self._append(stream, data, header)
+
+    def _append(
+        self,
+        stream: str,
+        line: bytes,
+        header: Optional[bytes],
+        record: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        key = stream if header is None else f"{stream}.bin"
+        with self._lock:
+            if self._closed:
+                raise ValueError("write to closed JsonlWriter")
+
+            self._roll_day_if_due()
+
+            current = self._streams.get(key)
+            if current is None:
+                current = self._open(stream, part=0, header=header)
+            elif self.max_bytes is not None and current.size and current.size + len(line) > self.max_bytes:
+                current.close()
+                current = self._open(stream, part=current.part + 1, header=header)
+
+            current.fp.write(line)
+            if current.index is not None and record is not None:
+                current.index.add(current.size, current.size + len(line), record)
+            current.size += len(line)
+            self._pending += 1
+            if self._pending >= self.flush_records or self._flush_due():
+                self._flush_locked()
+            elif current.index is not None and current.index.block_due:
+                current.fp.flush()
+                current.index.write_block()
+
+    def _flush_due(self) -> bool:
+        if self.flush_interval_s is None:
+            return False
+        return time.monotonic() - self._last_flush >= self.flush_interval_s
+
+    def _flush_locked(self) -> None:
+        for stream in self._streams.values():
+            stream.fp.flush()
+            if self.fsync:
+                os.fsync(stream.fp.fileno())
+            if stream.index is not None and stream.index.block_due:
+                stream.index.write_block()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def _roll_day_if_due(self) -> bool:
+        now = time.time()
+        if now < self._day_end:
+            return False
+        self._roll_day(now)
+        return True
+
+    def _roll_day(self, now: float) -> None:
+        self._flush_locked()
+        for stream in self._streams.values():
+            stream.close()
+        self._streams.clear()
+        self._day = time.strftime("%Y%m%d", time.gmtime(now))
+        self._day_end = (int(now // _SECONDS_PER_DAY) + 1) * _SECONDS_PER_DAY
+
+    def _open(self, stream: str, part: int, header: Optional[bytes] = None) -> _OpenStream:
+        ext = "jsonl" if header is None else "bin"
+        while True:
+            path = self.log_dir / log_file_name(stream, self._day, part, self.shard, ext)
+            size = path.stat().st_size if path.exists() else 0
+            if header is not None:
+                if not size:
+                    break
+            # After a restart, continue in the first part that still has room.
+            elif self.max_bytes is None or size < self.max_bytes:
+                break
+            part += 1
 
-    def _write(self, stream: str, record: Dict[str, Any]) -> None:
-        date_suffix = datetime.now(tz=timezone.utc).strftime("%Y%m%d")
-        path = self.log_dir / f"{stream}-{date_suffix}.jsonl"
-        with path.open("a", encoding="utf-8") as fp:
-            fp.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        fp = path.open("ab")
+        index = None
+        if header is not None:
+            fp.write(header)
+            size = len(header)
+        elif self.index:
+            index = IndexWriter(path, size)
+        opened = _OpenStream(fp, path, part, size, index)
+        self._streams[stream if header is None else f"{stream}.bin"] = opened
+        return opened
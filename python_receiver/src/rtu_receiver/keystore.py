@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import abc
+import argparse
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+# Binary key file (all little-endian):
+#   header: magic "RTUK", version u16, header size u16, entry count u64
+#   entries: imei u64, key 16 bytes; sorted by imei, no duplicates
+MAGIC = b"RTUK"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHQ")
+_ENTRY = struct.Struct("<Q16s")
+_IMEI = struct.Struct("<Q")
+
+FORMATS = ("binary", "sqlite")
+
+_SQLITE_SCHEMA = "CREATE TABLE IF NOT EXISTS keys (imei INTEGER PRIMARY KEY, key BLOB NOT NULL)"
+
+_MISSING = object()
+
+
+def file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """(inode, mtime, size) of a file, None if it is missing; a rewrite changes it."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _imei_number(imei: str) -> Optional[int]:
+    if not imei.isdigit():
+        return None
+    number = int(imei)
+    return number if number < 2**63 else None
+
+
+class KeyStore(abc.ABC):
+    """Device keys held outside the config, behind a bounded LRU of recent lookups.
+
+    Opening a store only checks its header, so startup does not depend on
+    the fleet size. Misses are cached too, so a device without a key does
+    not reach the file on every datagram. Stores are picklable: worker
+    processes reopen the file instead of inheriting handles.
+    """
+
+    def __init__(self, path: str | Path, cache_entries: int = 65536) -> None:
+        if cache_entries <= 0:
+            raise ValueError("cache_entries must be positive")
+        self.path = Path(path)
+        self.cache_entries = cache_entries
+        self._cache: OrderedDict[str, Optional[bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.signature = self._signature()
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Path, int]]:
+        return type(self), (self.path, self.cache_entries)
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) is type(self) and other.__reduce__() == self.__reduce__()  # type: ignore[attr-defined]
+
+    def __hash__(self) -> int:
+        return hash((type(self), self.path))
+
+    def get(self, imei: str) -> Optional[bytes]:
+        cache = self._cache
+        with self._lock:
+            key = cache.get(imei, _MISSING)
+            if key is not _MISSING:
+                cache.move_to_end(imei)
+                self.hits += 1
+                return key  # type: ignore[return-value]
+        number = _imei_number(imei)
+        key = self._lookup(number) if number is not None else None
+        with self._lock:
+            self.misses += 1
+            cache[imei] = key
+            if len(cache) > self.cache_entries:
+                cache.popitem(last=False)
+        return key
+
+    @abc.abstractmethod
+    def _lookup(self, imei: int) -> Optional[bytes]: ...
+
+    def _signature(self) -> Tuple[Any, ...]:
+        return (file_signature(self.path),)
+
+    def changed(self) -> bool:
+        """True once the file differs from what this store opened; reopen to see it."""
+        return self._signature() != self.signature
+
+    def stats(self) -> Dict[str, Any]:
+        return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        pass
+
+
+class BinaryKeyStore(KeyStore):
+    """Sorted binary key file, memory-mapped and searched by bisection."""
+
+    def __init__(self, path: str | Path, cache_entries: int = 65536) -> None:
+        super().__init__(path, cache_entries)
+        with self.path.open("rb") as fp:
+            size = os.fstat(fp.fileno()).st_size
+            header = fp.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{self.path}: not a key file")
+            magic, version, header_size, count = _HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{self.path}: not a key file")
+            if version != VERSION:
+                raise ValueError(f"{self.path}: unsupported key file version {version}")
+            if header_size + count * _ENTRY.size != size:
+                raise ValueError(f"{self.path}: key file is truncated or has trailing data")
+            self._map: Any = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self._start = header_size
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _lookup(self, imei: int) -> Optional[bytes]:
+        buf = self._map
+        start = self._start
+        unpack = _IMEI.unpack_from
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            (current,) = unpack(buf, start + mid * _ENTRY.size)
+            if current < imei:
+                lo = mid + 1
+            elif current > imei:
+                hi = mid
+            else:
+                return _ENTRY.unpack_from(buf, start + mid * _ENTRY.size)[1]
+        return None
+
+    def close(self) -> None:
+        self._map.close()
+
+
+class SqliteKeyStore(KeyStore):
+    """Keys in an SQLite table keyed by IMEI; the file may be updated by other processes."""
+
+    def __init__(self, path: str | Path, cache_entries: int = 65536) -> None:
+        super().__init__(path, cache_entries)
+        if not self.path.is_file():
+            raise ValueError(f"{self.path}: key database not found")
+        # Opened on first lookup, in the process that uses it.
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    def _signature(self) -> Tuple[Any, ...]:
+        # Writers in WAL mode leave the main file alone until a checkpoint.
+        return file_signature(self.path), file_signature(self.path.with_name(self.path.name + "-wal"))
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            db.execute("SELECT imei, key FROM keys LIMIT 0")
+        except sqlite3.Error as exc:
+            db.close()
+            raise ValueError(f"{self.path}: not a key database ({exc})") from exc
+        return db
+
+    def _lookup(self, imei: int) -> Optional[bytes]:
+        with self._db_lock:
+            if self._db is None:
+                self._db = self._connect()
+            row = self._db.execute("SELECT key FROM keys WHERE imei = ?", (imei,)).fetchone()
+        return bytes(row[0]) if row is not None else None
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def open_key_store(path: str | Path, format: str = "binary", cache_entries: int = 65536) -> KeyStore:
+    if format == "binary":
+        return BinaryKeyStore(path, cache_entries)
+    if format == "sqlite":
+        return SqliteKeyStore(path, cache_entries)
+    raise ValueError(f"unknown key store format {format!r}")
+
+
+def _sorted_entries(entries: Iterable[Tuple[str, bytes]]) -> Iterator[Tuple[int, bytes]]:
+    numbered: Dict[int, bytes] = {}
+    for imei, key in entries:
+        number = _imei_number(imei)
+        if number is None:
+            raise ValueError(f"IMEI {imei!r} is out of range")
+        if len(key) != 16:
+            raise ValueError(f"key of {imei} is not 16 bytes")
+        if number in numbered:
+            raise ValueError(f"IMEI {imei} appears twice")
+        numbered[number] = key
+    for number in sorted(numbered):
+        yield number, numbered[number]
+
+
+def write_binary_keys(entries: Iterable[Tuple[str, bytes]], path: str | Path) -> int:
+    """Write a binary key file atomically; returns the number of keys."""
+    final = Path(path)
+    tmp = final.with_name(final.name + ".tmp")
+    rows = list(_sorted_entries(entries))
+    with tmp.open("wb") as fp:
+        fp.write(_HEADER.pack(MAGIC, VERSION, _HEADER.size, len(rows)))
+        for number, key in rows:
+            fp.write(_ENTRY.pack(number, key))
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp, final)
+    return len(rows)
+
+
+def write_sqlite_keys(entries: Iterable[Tuple[str, bytes]], path: str | Path) -> int:
+    """Write a key database atomically; returns the number of keys."""
+    final = Path(path)
+    tmp = final.with_name(final.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    rows = list(_sorted_entries(entries))
+    db = sqlite3.connect(str(tmp))
+    try:
+        with db:
+            db.execute(_SQLITE_SCHEMA)
+            db.executemany("INSERT INTO keys (imei, key) VALUES (?, ?)", rows)
+    finally:
+        db.close()
+    os.replace(tmp, final)
+    return len(rows)
+
+
+def json_key_entries(raw: Any) -> Iterator[Tuple[str, bytes]]:
+    """(imei, key) from a receiver config, its `keys` section or a bare `by_imei` object."""
+    if isinstance(raw, dict) and isinstance(raw.get("keys"), dict):
+        raw = raw["keys"]
+    if isinstance(raw, dict) and "by_imei" in raw:
+        raw = raw["by_imei"]
+    if not isinstance(raw, dict):
+        raise ValueError("keys.by_imei must be an object")
+    for imei, key_hex in raw.items():
+        if not isinstance(imei, str) or not imei.isdigit():
+            raise ValueError("keys.by_imei keys must be IMEI strings with digits only")
+        if not isinstance(key_hex, str) or len(key_hex) != 32:
+            raise ValueError(f"keys.by_imei[{imei}] must be exactly 32 hex characters")
+        try:
+            yield imei, bytes.fromhex(key_hex)
+        except ValueError as exc:
+            raise ValueError(f"keys.by_imei[{imei}] must be valid hex") from exc
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Build and inspect key stores for `keys.store`")
+    sub = parser.add_subparsers(dest="action", required=True)
+    convert = sub.add_parser("convert", help="Write the keys.by_imei of a JSON file as a key store")
+    convert.add_argument("src", help="Receiver config, its keys section or a by_imei object")
+    convert.add_argument("out")
+    convert.add_argument("--format", default="binary", choices=FORMATS)
+    get = sub.add_parser("get", help="Print the key of one IMEI")
+    get.add_argument("store")
+    get.add_argument("imei")
+    get.add_argument("--format", default="binary", choices=FORMATS)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        if args.action == "convert":
+            raw = json.loads(Path(args.src).read_text(encoding="utf-8"))
+            write = write_binary_keys if args.format == "binary" else write_sqlite_keys
+            count = write(json_key_entries(raw), args.out)
+            print(f"{count} keys written to {args.out}", file=sys.stderr)
+            return 0
+        store = open_key_store(args.store, args.format)
+        key = store.get(args.imei)
+        store.close()
+    except (OSError, ValueError, sqlite3.Error) as exc:
+        print(f"keystore error: {exc}", file=sys.stderr)
+        return 1
+    if key is None:
+        print(f"no key for {args.imei}", file=sys.stderr)
+        return 1
+    print(key.hex())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .profiling import percentile
+from .synthetic import archive_payload, build_datagram, counter_items, hourly_counter_events, telemetry_payload
+from .timeutil import iso_to_us
+
+# The generator's first IMEI; device i gets FIRST_IMEI + i.
+FIRST_IMEI = 860000000000000
+
+
+class Device(NamedTuple):
+    imei: str
+    key: bytes
+    # Offset of the first wake-up within a period.
+    phase_s: float
+    # Wakes at the top of the period with the herd instead of at phase_s.
+    herd: bool
+
+
+class Packet(NamedTuple):
+    # Send time relative to the start of the run.
+    at_s: float
+    imei: str
+    datagram: bytes
+
+
+def build_fleet(count: int, seed: int = 0, herd_fraction: float = 0.3, period_s: float = 3600.0) -> List[Device]:
+    """`count` devices with their own IMEI and key; the same arguments always give the same fleet.
+
+    Keys are derived from seed and IMEI, so the receiver config can be
+    generated independently (see `fleet_keys`).
+    """
+    rng = random.Random(seed)
+    fleet: List[Device] = []
+    for index in range(count):
+        imei = str(FIRST_IMEI + index)
+        key = hashlib.sha256(f"{seed}:{imei}".encode("ascii")).digest()[:16]
+        herd = rng.random() < herd_fraction
+        fleet.append(Device(imei, key, 0.0 if herd else rng.uniform(0.0, period_s), herd))
+    return fleet
+
+
+def fleet_keys(fleet: List[Device]) -> Dict[str, str]:
+    """`keys.by_imei` of a receiver config that decodes the fleet."""
+    return {device.imei: device.key.hex() for device in fleet}
+
+
+def build_packets(
+    fleet: List[Device],
+    duration_s: float,
+    period_s: float = 3600.0,
+    herd_jitter_s: float = 2.0,
+    archive_ratio: float = 0.1,
+    archive_events: int = 24,
+    seed: int = 0,
+) -> List[Packet]:
+    """Every datagram the fleet sends within duration_s, by send time.
+
+    Each wake-up sends a 4-counter telemetry; `archive_ratio` of them are
+    followed by an archive of `archive_events` hourly events. Herd devices
+    all wake within `herd_jitter_s` of the start of each period, which is
+    what an hourly schedule does to a receiver at the top of the hour.
+    Counters grow with every wake-up, so each datagram is unique.
+    """
+    rng = random.Random(seed + 1)
+    packets: List[Packet] = []
+    for index, device in enumerate(fleet):
+        wake = 0
+        counters = [index * 1000, index * 100, index * 10, index]
+        while True:
+            start = wake * period_s + (rng.uniform(0.0, herd_jitter_s) if device.herd else device.phase_s)
+            if start >= duration_s:
+                break
+            values = [value + wake for value in counters]
+            telemetry = telemetry_payload(counter_items(values))
+            packets.append(Packet(start, device.imei, build_datagram(device.imei, device.key, telemetry)))
+            if rng.random() < archive_ratio:
+                events = hourly_counter_events(archive_events, 1735689600 + wake * 3600, values)
+                archive = archive_payload(wake, events)
+                packets.append(Packet(start, device.imei, build_datagram(device.imei, device.key, archive)))
+            wake += 1
+    packets.sort(key=lambda packet: packet.at_s)
+    return packets
+
+
+def udp_rcvbuf_errors() -> Optional[int]:
+    """Host-wide count of UDP datagrams dropped for a full receive buffer (Linux), else None."""
+    try:
+        lines = Path("/proc/net/snmp").read_text(encoding="ascii").splitlines()
+    except OSError:
+        return None
+    udp = [line.split()[1:] for line in lines if line.startswith("Udp:")]
+    if len(udp) < 2 or "RcvbufErrors" not in udp[0]:
+        return None
+    return int(udp[1][udp[0].index("RcvbufErrors")])
+
+
+class LogTail:
+    """Follows `raw-*.jsonl` in a log directory and notes when each datagram shows up.
+
+    Polls from a thread; records of datagrams not in `pending` are ignored.
+    """
+
+    def __init__(self, log_dir: Path, poll_s: float = 0.01) -> None:
+        self.log_dir = log_dir
+        self.poll_s = poll_s
+        # datagram hex -> (seen at, receiver ts_utc as unix seconds)
+        self.seen: Dict[str, Tuple[float, float]] = {}
+        self.pending: Dict[str, float] = {}
+        self._offsets: Dict[Path, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> LogTail:
+        # Skip whatever the logs held before the run.
+        for path in self.log_dir.glob("raw-*.jsonl"):
+            self._offsets[path] = path.stat().st_size
+        self._thread = threading.Thread(target=self._loop, name="rtu-loadgen-tail", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.poll()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.poll_s):
+            self.poll()
+
+    def poll(self) -> None:
+        now = time.time()
+        for path in sorted(self.log_dir.glob("raw-*.jsonl")):
+            offset = self._offsets.get(path, 0)
+            with path.open("rb") as fp:
+                fp.seek(offset)
+                chunk = fp.read()
+            end = chunk.rfind(b"\n") + 1
+            self._offsets[path] = offset + end
+            for line in chunk[:end].splitlines():
+                try:
+                    record = json.loads(line)
+                    datagram_hex = record["datagram_hex"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if datagram_hex in self.pending and datagram_hex not in self.seen:
+                    self.seen[datagram_hex] = (now, iso_to_us(record["ts_utc"]) / 1e6)
+
+
+def _latency_ms(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "p50": round(percentile(ordered, 0.5) * 1000, 2),
+        "p90": round(percentile(ordered, 0.9) * 1000, 2),
+        "p99": round(percentile(ordered, 0.99) * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+def run_load(
+    packets: List[Packet],
+    host: str,
+    port: int,
+    log_dir: Path,
+    drain_s: float = 5.0,
+    devices: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Send packets on schedule to a running receiver and report what reached its raw log.
+
+    The receiver must write `raw-*.jsonl` (not the binary raw log) into
+    log_dir. Receive lag is the time from sending to the record's `ts_utc`;
+    log latency is the time from that `ts_utc` until the generator saw the
+    record in the log, so it includes the writer's flush policy.
+    """
+    addr = (host, port)
+    drops_before = udp_rcvbuf_errors()
+    sent_bytes = 0
+    max_send_lag_s = 0.0
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock, LogTail(log_dir) as tail:
+        pending = tail.pending
+        started = time.perf_counter()
+        first_sent = time.time()
+        for packet in packets:
+            delay = started + packet.at_s - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                max_send_lag_s = max(max_send_lag_s, -delay)
+            datagram_hex = packet.datagram.hex()
+            pending[datagram_hex] = time.time()
+            sock.sendto(packet.datagram, addr)
+            sent_bytes += len(packet.datagram)
+        send_duration_s = time.perf_counter() - started
+
+        # Wait for the receiver to catch up, giving up once it stops making progress.
+        progress, idle_since = len(tail.seen), time.monotonic()
+        while len(tail.seen) < len(pending) and time.monotonic() - idle_since < drain_s:
+            time.sleep(0.05)
+            if len(tail.seen) != progress:
+                progress, idle_since = len(tail.seen), time.monotonic()
+    drops_after = udp_rcvbuf_errors()
+
+    seen = tail.seen
+    # seen_at and ts_utc come from the same wall clock; clamped in case it steps back.
+    log_latency = [max(0.0, seen_at - received) for seen_at, received in seen.values()]
+    receive_lag = [max(0.0, received - pending[key]) for key, (_, received) in seen.items()]
+    last_seen = max((seen_at for seen_at, _ in seen.values()), default=first_sent)
+    kernel_drops = drops_after - drops_before if drops_before is not None and drops_after is not None else None
+    return {
+        "devices": devices,
+        "sent": len(pending),
+        "sent_bytes": sent_bytes,
+        "send_duration_s": round(send_duration_s, 3),
+        "send_rate": round(len(pending) / send_duration_s, 1) if send_duration_s > 0 else None,
+        "max_send_lag_ms": round(max_send_lag_s * 1000, 2),
+        "logged": len(seen),
+        "missing": len(pending) - len(seen),
+        "logged_rate": round(len(seen) / (last_seen - first_sent), 1) if last_seen > first_sent else None,
+        "kernel_rcvbuf_errors": kernel_drops,
+        "kernel_drop_rate": round(kernel_drops / len(pending), 4) if kernel_drops is not None and pending else None,
+        "receive_lag_ms": _latency_ms(receive_lag),
+        "log_latency_ms": _latency_ms(log_latency),
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = []
+    for name, value in report.items():
+        if isinstance(value, dict):
+            value = " ".join(f"{key}={item}" for key, item in value.items())
+        lines.append(f"{name:22s} {value}")
+    return "\n".join(lines)
+
+
+def _add_fleet_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--devices", type=int, default=1000, help="Simulated devices")
+    parser.add_argument("--seed", type=int, default=0, help="Same seed, same IMEIs, keys and schedule")
+    parser.add_argument("--herd", type=float, default=0.3, help="Fraction of devices waking at the top of the period")
+    parser.add_argument("--period-s", type=float, default=60.0, help="Wake-up period (3600 on real devices)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Simulate a fleet of RTU102 devices against a running receiver")
+    sub = parser.add_subparsers(dest="action", required=True)
+    keys = sub.add_parser("keys", help="Print the receiver `keys` config section for the fleet")
+    _add_fleet_args(keys)
+    run = sub.add_parser("run", help="Send the fleet's traffic and report throughput, drops and latency")
+    _add_fleet_args(run)
+    run.add_argument("--host", default="127.0.0.1")
+    run.add_argument("--port", type=int, default=5000)
+    run.add_argument("--log-dir", required=True, help="The receiver's log_dir, to find what was logged")
+    run.add_argument("--duration-s", type=float, default=60.0, help="Simulated time span")
+    run.add_argument("--herd-jitter-s", type=float, default=2.0, help="Spread of the herd's wake-ups")
+    run.add_argument("--archive-ratio", type=float, default=0.1, help="Fraction of wake-ups that send an archive")
+    run.add_argument("--archive-events", type=int, default=24, help="Events per archive")
+    run.add_argument("--drain-s", type=float, default=5.0, help="Wait this long for the logs to stop growing")
+    run.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.devices < 1 or args.period_s <= 0 or not 0 <= args.herd <= 1:
+        print("--devices and --period-s must be positive and --herd in 0..1", file=sys.stderr)
+        return 2
+    fleet = build_fleet(args.devices, args.seed, args.herd, args.period_s)
+    if args.action == "keys":
+        print(json.dumps({"default_hex": None, "by_imei": fleet_keys(fleet)}, indent=2))
+        return 0
+
+    packets = build_packets(
+        fleet,
+        args.duration_s,
+        args.period_s,
+        args.herd_jitter_s,
+        args.archive_ratio,
+        args.archive_events,
+        args.seed,
+    )
+    print(f"{len(packets)} datagrams from {len(fleet)} devices over {args.duration_s:g} s", file=sys.stderr)
+    try:
+        report = run_load(packets, args.host, args.port, Path(args.log_dir), args.drain_s, devices=len(fleet))
+    except OSError as exc:
+        print(f"loadgen error: {exc}", file=sys.stderr)
+        return 1
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .compression import is_compressed, open_log, plain_path
+from .timeutil import iso_to_us
+
+# Sidecar index of a JSONL log, `<log>.idx` (all little-endian):
+#   header: magic "RTUX", version u16, header size u16
+#   blocks: entry count u32, min ts i64, max ts i64, log offset covered u64,
+#           then entries imei u64, ts unix microseconds i64, line offset u64
+# Entries of a block are sorted by (imei, ts); blocks follow write order, so
+# their ts ranges overlap little. Log lines past the last block's covered
+# offset (records written after the last block, e.g. before a crash) are
+# not indexed and are read by scanning. A log compressed after the fact
+# keeps its index: offsets then refer to the decompressed stream.
+MAGIC = b"RTUX"
+VERSION = 1
+_HEADER = struct.Struct("<4sHH")
+_BLOCK = struct.Struct("<IqqQ")
+_ENTRY = struct.Struct("<QqQ")
+
+# (imei, ts_us, offset); imei 0 for records without one, e.g. raw records.
+Entry = Tuple[int, int, int]
+
+
+def index_path(log_path: Path) -> Path:
+    """`decoded-20250101.jsonl[.gz]` -> `decoded-20250101.jsonl.idx`."""
+    plain = plain_path(log_path)
+    return plain.with_name(plain.name + ".idx")
+
+
+def record_key(record: Dict[str, Any]) -> Tuple[int, int]:
+    """(imei, ts_us) of a logged record as the index stores them."""
+    imei = record.get("imei")
+    ts_utc = record.get("ts_utc")
+    return (
+        int(imei) if isinstance(imei, str) and imei.isdigit() else 0,
+        iso_to_us(ts_utc) if isinstance(ts_utc, str) else 0,
+    )
+
+
+def scan_lines(buf: Any, start: int, end: int) -> Iterator[Tuple[int, bytes]]:
+    """(offset, line) of the complete lines in buf[start:end]."""
+    offset = start
+    while offset < end:
+        newline = buf.find(b"\n", offset, end)
+        if newline < 0:
+            return
+        yield offset, bytes(buf[offset : newline + 1])
+        offset = newline + 1
+
+
+def stream_lines(path: Path) -> Iterator[Tuple[int, bytes]]:
+    """(offset, line) of the complete lines of a possibly compressed log, read sequentially."""
+    offset = 0
+    with open_log(path) as fp:
+        for line in fp:
+            if not line.endswith(b"\n"):
+                return
+            yield offset, line
+            offset += len(line)
+
+
+def scan_entries(buf: Any, start: int, end: int) -> Iterator[Entry]:
+    """Index entries of the records in buf[start:end]; blank and torn lines are skipped."""
+    for offset, line in scan_lines(buf, start, end):
+        entry = _entry(offset, line)
+        if entry is not None:
+            yield entry
+
+
+def _entry(offset: int, line: bytes) -> Optional[Entry]:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+    imei, ts_us = record_key(record)
+    return imei, ts_us, offset
+
+
+def _complete_end(buf: Any, end: int) -> int:
+    return buf.rfind(b"\n", 0, end) + 1
+
+
+def encode_block(entries: List[Entry], covered: int) -> bytes:
+    entries.sort()
+    timestamps = [ts_us for _, ts_us, _ in entries]
+    parts = [_BLOCK.pack(len(entries), min(timestamps), max(timestamps), covered)]
+    parts.extend(_ENTRY.pack(*entry) for entry in entries)
+    return b"".join(parts)
+
+
+class _Block:
+    __slots__ = ("start", "count", "min_ts", "max_ts", "covered")
+
+    def __init__(self, start: int, count: int, min_ts: int, max_ts: int, covered: int) -> None:
+        self.start = start
+        self.count = count
+        self.min_ts = min_ts
+        self.max_ts = max_ts
+        self.covered = covered
+
+
+def read_blocks(buf: Any, path: Path) -> Tuple[List[_Block], int]:
+    """Complete blocks of an index and the length they span; raises ValueError on a foreign header."""
+    size = len(buf)
+    if size < _HEADER.size:
+        return [], 0
+    magic, version, header_size = _HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a log index")
+    if version != VERSION:
+        raise ValueError(f"{path}: unsupported log index version {version}")
+
+    blocks: List[_Block] = []
+    offset = header_size
+    while offset + _BLOCK.size <= size:
+        count, min_ts, max_ts, covered = _BLOCK.unpack_from(buf, offset)
+        end = offset + _BLOCK.size + count * _ENTRY.size
+        if end > size:
+            break
+        blocks.append(_Block(offset + _BLOCK.size, count, min_ts, max_ts, covered))
+        offset = end
+    return blocks, offset
+
+
+def _lower_bound(buf: Any, block: _Block, key: Tuple[int, int]) -> int:
+    lo, hi = 0, block.count
+    unpack = _ENTRY.unpack_from
+    while lo < hi:
+        mid = (lo + hi) // 2
+        imei, ts_us, _ = unpack(buf, block.start + mid * _ENTRY.size)
+        if (imei, ts_us) < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _block_offsets(buf: Any, block: _Block, imei: Optional[int], since_us: int, until_us: int) -> Iterator[Entry]:
+    unpack = _ENTRY.unpack_from
+    if imei is None:
+        for i in range(block.count):
+            entry = unpack(buf, block.start + i * _ENTRY.size)
+            if since_us <= entry[1] < until_us:
+                yield entry
+        return
+    for i in range(_lower_bound(buf, block, (imei, since_us)), block.count):
+        entry = unpack(buf, block.start + i * _ENTRY.size)
+        if entry[0] != imei or entry[1] >= until_us:
+            return
+        yield entry
+
+
+class LogIndex:
+    """Read side of a sidecar index over one JSONL log, both memory-mapped."""
+
+    def __init__(self, log_path: Path) -> None:
+        self.log_path = log_path
+        self.path = index_path(log_path)
+
+    def query(
+        self,
+        imei: Optional[str] = None,
+        since_us: Optional[int] = None,
+        until_us: Optional[int] = None,
+    ) -> Iterator[Tuple[int, bytes]]:
+        """(ts_us, line) of records of imei with since <= ts < until, in log order.
+
+        Without an index file the whole log is scanned.
+        """
+        imei_key = int(imei) if imei is not None else None
+        lo = since_us if since_us is not None else -(2**63)
+        hi = until_us if until_us is not None else 2**63 - 1
+        if is_compressed(self.log_path):
+            yield from self._query_stream(imei_key, lo, hi)
+            return
+        with _map(self.log_path) as log:
+            found, covered = self._lookup(imei_key, lo, hi, len(log))
+            found.sort(key=lambda entry: entry[2])
+            for _, ts_us, offset in found:
+                yield ts_us, bytes(log[offset : log.find(b"\n", offset) + 1])
+            for entry_imei, ts_us, offset in scan_entries(log, covered, len(log)):
+                if (imei_key is None or entry_imei == imei_key) and lo <= ts_us < hi:
+                    yield ts_us, bytes(log[offset : log.find(b"\n", offset) + 1])
+
+    def _query_stream(self, imei_key: Optional[int], lo: int, hi: int) -> Iterator[Tuple[int, bytes]]:
+        # No seeking into a compressed stream; the index still saves parsing
+        # every line it covers.
+        found, covered = self._lookup(imei_key, lo, hi, None)
+        wanted = {offset: ts_us for _, ts_us, offset in found}
+        for offset, line in stream_lines(self.log_path):
+            if offset < covered:
+                ts_us = wanted.get(offset)
+                if ts_us is not None:
+                    yield ts_us, line
+                continue
+            entry = _entry(offset, line)
+            if entry is not None and (imei_key is None or entry[0] == imei_key) and lo <= entry[1] < hi:
+                yield entry[1], line
+
+    def _lookup(self, imei_key: Optional[int], lo: int, hi: int, log_size: Optional[int]) -> Tuple[List[Entry], int]:
+        """Matching index entries and the log offset the index covers (0 without an index)."""
+        if not self.path.exists():
+            return [], 0
+        found: List[Entry] = []
+        with _map(self.path) as idx:
+            blocks, _ = read_blocks(idx, self.path)
+            if not blocks:
+                return [], 0
+            if log_size is not None and blocks[-1].covered > log_size:
+                raise ValueError(f"{self.path}: index is newer than its log, rebuild it")
+            for block in blocks:
+                if block.count and block.max_ts >= lo and block.min_ts < hi:
+                    found.extend(_block_offsets(idx, block, imei_key, lo, hi))
+            return found, blocks[-1].covered
+
+
+class IndexWriter:
+    """Write side of a sidecar index, kept by JsonlWriter next to an open log.
+
+    Entries are buffered and written as one sorted block once
+    `block_entries` are pending (see `block_due`) and on close. Opening an
+    existing index drops a torn last block and indexes whatever the log
+    gained since the index's last block, so restarts and crashes leave no
+    gaps.
+    """
+
+    def __init__(self, log_path: Path, log_size: int, block_entries: int = 1024) -> None:
+        if block_entries <= 0:
+            raise ValueError("block_entries must be positive")
+        self.path = index_path(log_path)
+        self.block_entries = block_entries
+        self._entries: List[Entry] = []
+        self._covered = 0
+
+        covered, valid = 0, 0
+        if self.path.exists():
+            try:
+                with _map(self.path) as idx:
+                    blocks, valid = read_blocks(idx, self.path)
+                covered = blocks[-1].covered if blocks else 0
+            except ValueError:
+                covered, valid = 0, 0
+            if covered > log_size:
+                covered, valid = 0, 0
+
+        self._fp: BinaryIO = self.path.open("r+b" if valid else "wb")
+        if valid:
+            self._fp.truncate(valid)
+            self._fp.seek(valid)
+        else:
+            self._fp.write(_HEADER.pack(MAGIC, VERSION, _HEADER.size))
+        self._covered = covered
+
+        if log_size > covered:
+            with _map(log_path) as log:
+                self._entries.extend(scan_entries(log, covered, log_size))
+                self._covered = max(covered, _complete_end(log, log_size))
+        self.write_block()
+        self._fp.flush()
+
+    @property
+    def block_due(self) -> bool:
+        return len(self._entries) >= self.block_entries
+
+    def add(self, offset: int, end: int, record: Dict[str, Any]) -> None:
+        """Index the record written to the log at [offset, end)."""
+        imei, ts_us = record_key(record)
+        self._entries.append((imei, ts_us, offset))
+        self._covered = end
+
+    def write_block(self) -> None:
+        """Write buffered entries; the log must already be flushed up to them."""
+        if self._entries:
+            self._fp.write(encode_block(self._entries, self._covered))
+            self._fp.flush()
+            self._entries = []
+
+    def close(self) -> None:
+        self.write_block()
+        self._fp.close()
+
+
+def build_index(log_path: Path, block_entries: int = 1024) -> int:
+    """Write the log's index from scratch; returns the number of indexed records."""
+    final = index_path(log_path)
+    tmp = final.with_name(final.name + ".tmp")
+    count = 0
+    covered = 0
+    entries: List[Entry] = []
+    with tmp.open("wb") as fp:
+        fp.write(_HEADER.pack(MAGIC, VERSION, _HEADER.size))
+        for offset, line in stream_lines(log_path):
+            entry = _entry(offset, line)
+            if entry is not None:
+                if len(entries) >= block_entries:
+                    fp.write(encode_block(entries, offset))
+                    entries = []
+                entries.append(entry)
+                count += 1
+            covered = offset + len(line)
+        if entries:
+            fp.write(encode_block(entries, covered))
+    os.replace(tmp, final)
+    return count
+
+
+@contextmanager
+def _map(path: Path) -> Iterator[Any]:
+    """Read-only mmap of a file; an empty file maps to b""."""
+    with path.open("rb") as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
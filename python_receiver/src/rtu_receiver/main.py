@@ -1,17 +1,43 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
+import dataclasses
+import functools
 import sys
+from typing import Optional
 
-from .config import load_config
+from .aio_server import AsyncUdpReceiverServer
+from .config import ReceiverConfig, load_config
 from .jsonl import JsonlWriter
-from .udp_server import UdpReceiverServer
+from .metrics import MetricsServer
+from .pipeline import PipelineReceiverServer
+from .reload import ConfigReloader
+from .retention import LogMaintenance
+from .udp_server import BatchedUdpReceiverServer, UdpReceiverServer
+from .workers import WorkerPool, worker_shard
 
 
 def build_arg_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="RTU102 UDP receive-only server")
     parser.add_argument("--config", required=True, help="Path to JSON config")
     parser.add_argument("--once", action="store_true", help="Process one datagram and exit")
+    parser.add_argument(
+        "--engine",
+        default="blocking",
+        choices=("blocking", "batched", "pipeline", "asyncio"),
+        help=(
+            "blocking: decode inline; batched: drain all pending datagrams per wakeup into preallocated buffers; "
+            "pipeline: receive loop + decode workers + writer thread; "
+            "asyncio: event loop with executor-offloaded decode and I/O"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Run N processes bound to the same port with SO_REUSEPORT; logs are sharded per worker",
+    )
     parser.add_argument(
         "--log-level",
         default="info",
@@ -21,21 +47,57 @@ def build_arg_parser() -> argparse.ArgumentParser:
     return parser
 
 
-def main(argv: list[str] | None = None) -> int:
-    parser = build_arg_parser()
-    args = parser.parse_args(argv)
+def build_writer(config: ReceiverConfig, shard: Optional[str] = None) -> JsonlWriter:
+    return JsonlWriter(
+        config.log_dir,
+        flush_records=config.writer.flush_records,
+        flush_interval_s=config.writer.flush_interval_s,
+        max_bytes=config.writer.max_bytes,
+        fsync=config.writer.fsync,
+        shard=shard,
+        index=config.writer.index,
+    )
 
-    try:
-        config = load_config(args.config)
-    except ValueError as exc:
-        print(f"config error: {exc}", file=sys.stderr)
-        return 2
 
-    writer = JsonlWriter(config.log_dir)
-    server = UdpReceiverServer(config=config, writer=writer, log_level=args.log_level)
+def build_server(
+    config: ReceiverConfig,
+    writer: JsonlWriter,
+    engine: str,
+    log_level: str,
+    reuse_port: bool = False,
+) -> UdpReceiverServer:
+    if engine == "pipeline":
+        return PipelineReceiverServer(config=config, writer=writer, log_level=log_level, reuse_port=reuse_port)
+    if engine == "batched":
+        return BatchedUdpReceiverServer(config=config, writer=writer, log_level=log_level, reuse_port=reuse_port)
+    if engine == "asyncio":
+        return AsyncUdpReceiverServer(config=config, writer=writer, log_level=log_level, reuse_port=reuse_port)
+    return UdpReceiverServer(config=config, writer=writer, log_level=log_level, reuse_port=reuse_port)
+
+
+def serve(
+    config: ReceiverConfig,
+    engine: str,
+    log_level: str,
+    once: bool = False,
+    shard: Optional[str] = None,
+    reuse_port: bool = False,
+    config_path: Optional[str] = None,
+) -> int:
+    writer = build_writer(config, shard=shard)
+    server = build_server(config, writer, engine, log_level, reuse_port=reuse_port)
 
     try:
-        server.run(once=args.once)
+        reloader: contextlib.AbstractContextManager[object] = contextlib.nullcontext()
+        if config.reload.enabled and config_path is not None and not once:
+            reloader = ConfigReloader(config_path, server, config.reload.poll_s)
+            if server.metrics is not None:
+                reloader.register_metrics(server.metrics.registry)
+        metrics: contextlib.AbstractContextManager[object] = contextlib.nullcontext()
+        if server.metrics is not None and not once:
+            metrics = MetricsServer(server.metrics.registry, config.metrics.host, config.metrics.port)
+        with writer, metrics, reloader:
+            server.run(once=once)
     except TimeoutError as exc:
         print(str(exc), file=sys.stderr)
         return 1
@@ -46,3 +108,54 @@ def main(argv: list[str] | None = None) -> int:
         return 0
 
     return 0
+
+
+def serve_worker(
+    config: ReceiverConfig,
+    index: int,
+    engine: str,
+    log_level: str,
+    config_path: Optional[str] = None,
+) -> int:
+    if config.metrics.enabled:
+        metrics = dataclasses.replace(config.metrics, port=config.metrics.port + index)
+        config = dataclasses.replace(config, metrics=metrics)
+    return serve(config, engine, log_level, shard=worker_shard(index), reuse_port=True, config_path=config_path)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and args.once:
+        parser.error("--once cannot be combined with --workers")
+
+    try:
+        config = load_config(args.config)
+    except ValueError as exc:
+        print(f"config error: {exc}", file=sys.stderr)
+        return 2
+
+    # One maintenance task per log_dir, in the supervisor when there are workers.
+    maintenance: contextlib.AbstractContextManager[object] = contextlib.nullcontext()
+    if config.retention.enabled and not args.once:
+        maintenance = LogMaintenance(config.log_dir, config.retention)
+
+    with maintenance:
+        if args.workers > 1:
+            pool = WorkerPool(
+                config,
+                args.workers,
+                functools.partial(
+                    serve_worker,
+                    engine=args.engine,
+                    log_level=args.log_level,
+                    config_path=args.config,
+                ),
+                log_level=args.log_level,
+            )
+            return pool.run()
+
+        return serve(config, args.engine, args.log_level, once=args.once, config_path=args.config)
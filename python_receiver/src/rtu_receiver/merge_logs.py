@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from .jsonl import merge_shards
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Print one day of a JSONL stream merged across worker shards")
+    parser.add_argument("--log-dir", required=True, help="Receiver log directory")
+    parser.add_argument("--stream", default="decoded", choices=("raw", "decoded", "errors"))
+    parser.add_argument("--day", default=None, help="UTC day as YYYYMMDD (default: today)")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    day = args.day or time.strftime("%Y%m%d", time.gmtime())
+
+    out = sys.stdout
+    for record in merge_shards(Path(args.log_dir), args.stream, day):
+        out.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
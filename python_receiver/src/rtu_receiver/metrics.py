@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+import abc
+import math
+import sys
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from .protocol import ProtocolError
+
+# (name, labels, value) of one exposed sample
+Sample = Tuple[str, Mapping[str, str], float]
+
+# Per-datagram decode time: tens of microseconds for a telemetry packet up
+# to milliseconds for a large archive on a busy host.
+DECODE_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 0.1)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, int) or value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Mapping[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class _Metric(abc.ABC):
+    """A metric family; children hold the values of each label combination.
+
+    Updates take the family's lock, so concurrent decode threads never lose
+    an increment; uncontended, that costs well under a microsecond.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: str) -> Any:
+        """The child for these label values, created on first use."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self) -> Any: ...
+
+    def samples(self) -> Iterable[Sample]:
+        for values, child in list(self._children.items()):
+            yield from child.samples(self.name, dict(zip(self.labelnames, values)))
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self, lock: threading.Lock) -> None:
+        self._lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name: str, labels: Dict[str, str]) -> Iterable[Sample]:
+        yield name, labels, self.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild(self._lock)
+
+    def inc(self, amount: float = 1.0) -> None:
+        # Inlined rather than delegated to the child: this is the hot path.
+        with self._lock:
+            self._default.value += amount
+
+    @property
+    def value(self) -> float:
+        return self._default.value
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild(self._lock)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_bounds", "counts", "sum")
+
+    def __init__(self, lock: threading.Lock, bounds: Tuple[float, ...]) -> None:
+        self._lock = lock
+        self._bounds = bounds
+        # counts[i] observations in (bounds[i-1], bounds[i]]; the last slot is +Inf.
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self, name: str, labels: Dict[str, str]) -> Iterable[Sample]:
+        with self._lock:
+            counts = list(self.counts)
+            total_sum = self.sum
+        cumulative = 0
+        for bound, count in zip(self._bounds + (math.inf,), counts):
+            cumulative += count
+            yield f"{name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+        yield f"{name}_sum", labels, total_sum
+        yield f"{name}_count", labels, cumulative
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        buckets: Sequence[float],
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        if not buckets or list(buckets) != sorted(buckets):
+            raise ValueError("buckets must be a non-empty ascending sequence")
+        self.buckets = tuple(float(bound) for bound in buckets if not math.isinf(bound))
+        super().__init__(name, help_text, labelnames)
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self._lock, self.buckets)
+
+    def observe(self, value: float) -> None:
+        default = self._default
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            default.counts[index] += 1
+            default.sum += value
+
+
+class _Collected:
+    """A family whose samples come from a callback at scrape time."""
+
+    def __init__(self, name: str, help_text: str, kind: str, collect: Callable[[], Iterable[Sample]]) -> None:
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self) -> Iterable[Sample]:
+        return self._collect()
+
+
+class MetricsRegistry:
+    """Metric families in registration order, rendered in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._families: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, family: Any) -> Any:
+        with self._lock:
+            if family.name in self._families:
+                raise ValueError(f"metric {family.name} already registered")
+            self._families[family.name] = family
+        return family
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        buckets: Sequence[float],
+        labelnames: Sequence[str] = (),
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets, labelnames))
+
+    def collect(self, name: str, help_text: str, kind: str, collect: Callable[[], Iterable[Sample]]) -> None:
+        """Register a family read at scrape time, e.g. a queue depth owned by someone else."""
+        self._register(_Collected(name, help_text, kind, collect))
+
+    def value_of(self, name: str, help_text: str, kind: str, read: Callable[[], Optional[float]]) -> None:
+        """Register an unlabeled family whose value is read at scrape time; None hides it."""
+
+        def collect() -> Iterable[Sample]:
+            value = read()
+            if value is not None:
+                yield name, {}, value
+
+        self.collect(name, help_text, kind, collect)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            families = list(self._families.values())
+        for family in families:
+            samples = list(family.samples())
+            if not samples:
+                continue
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class ReceiverMetrics:
+    """The receiver's own metric families, bound once so updates are attribute lookups."""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None) -> None:
+        self.registry = registry if registry is not None else MetricsRegistry()
+        r = self.registry
+        self.datagrams = r.counter("rtu_datagrams_total", "Datagrams received")
+        self.datagram_bytes = r.counter("rtu_datagram_bytes_total", "Bytes of datagrams received")
+        self.decoded = r.counter("rtu_datagrams_decoded_total", "Datagrams decrypted with a valid checksum")
+        self.duplicates = r.counter(
+            "rtu_duplicates_total", "Retransmits suppressed: whole datagrams or archive records", ("kind",)
+        )
+        self.errors = r.counter(
+            "rtu_decode_errors_total", "Records written to the errors stream", ("stage", "reason")
+        )
+        self.decode_seconds = r.histogram(
+            "rtu_decode_seconds",
+            "Per-datagram decode and record building time (batched engine: batch mean)",
+            DECODE_BUCKETS,
+        )
+        self.ack_seconds = r.histogram(
+            "rtu_ack_latency_seconds",
+            "Time from the start of processing a datagram to its reply frames being sent",
+            DECODE_BUCKETS,
+        )
+        self.envelope_seconds = r.histogram(
+            "rtu_envelope_decode_seconds",
+            "Per-datagram framing, decryption and CRC check time (batched engine: batch mean)",
+            DECODE_BUCKETS,
+        )
+        self.decode_failures = r.counter(
+            "rtu_decode_failures_total", "Datagrams the decoder rejected", ("stage", "reason")
+        )
+
+    def observe_decode(self, seconds: float, error: Optional[ProtocolError]) -> None:
+        """protocol.DecodeObserver: called by the decode functions for every datagram."""
+        self.envelope_seconds.observe(seconds)
+        if error is not None:
+            self.decode_failures.labels(error.stage, error.reason).inc()
+
+
+class MetricsServer:
+    """Serves a registry at `GET /metrics` from a daemon thread."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9102) -> None:
+        self.registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - http.server naming
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        host, port = self._httpd.server_address[:2]
+        return str(host), int(port)
+
+    def __enter__(self) -> MetricsServer:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="rtu-metrics", daemon=True)
+        self._thread.start()
+        print(f"metrics on http://{self.address[0]}:{self.address[1]}/metrics", file=sys.stderr)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+        self._httpd.server_close()
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Generic, List, Optional, TypeVar
+
+from .config import PipelineConfig, ReceiverConfig
+from .jsonl import JsonlWriter
+from .metrics import MetricsRegistry
+from .udp_server import Outputs, UdpReceiverServer, iso_utc
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+T = TypeVar("T")
+
+
+class BoundedQueue(Generic[T]):
+    """Thread-safe FIFO with an explicit overflow policy and counters.
+
+    `get()` returns None once the queue is closed and drained.
+    """
+
+    def __init__(self, maxsize: int, overflow: str = "drop_oldest") -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self._items: Deque[T] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.enqueued = 0
+        self.dropped = 0
+        self.high_watermark = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item: T) -> bool:
+        """Enqueue item; returns False when it was dropped by the drop_newest policy."""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.overflow == "drop_newest":
+                    self.dropped += 1
+                    return False
+                if self.overflow == "drop_oldest":
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._cond.wait()
+            if self._closed:
+                raise ValueError("put to closed BoundedQueue")
+
+            self._items.append(item)
+            self.enqueued += 1
+            if len(self._items) > self.high_watermark:
+                self.high_watermark = len(self._items)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[T]:
+        """Dequeue the oldest item; None when closed and empty or on timeout."""
+        with self._cond:
+            if timeout is None:
+                while not self._items and not self._closed:
+                    self._cond.wait()
+            elif not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._items),
+            "maxsize": self.maxsize,
+            "overflow": self.overflow,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "high_watermark": self.high_watermark,
+        }
+
+
+class PipelineReceiverServer(UdpReceiverServer):
+    """Receiver that only pulls datagrams off the socket in the receive loop.
+
+    Datagrams go through a bounded ingress queue to `decode_workers` threads;
+    their output records go through a second queue to one writer thread, so a
+    slow disk or a burst of expensive decodes never leaves the socket unread.
+    With more than one decode worker, records of different datagrams may be
+    written out of arrival order.
+    """
+
+    def __init__(
+        self,
+        config: ReceiverConfig,
+        writer: JsonlWriter,
+        log_level: str = "info",
+        pipeline: Optional[PipelineConfig] = None,
+        reuse_port: bool = False,
+    ) -> None:
+        super().__init__(config, writer, log_level=log_level, reuse_port=reuse_port)
+        self.pipeline = pipeline if pipeline is not None else config.pipeline
+        self.ingress: BoundedQueue[tuple[bytes, str, int, float]] = BoundedQueue(
+            self.pipeline.queue_size, self.pipeline.overflow
+        )
+        self.egress: BoundedQueue[Outputs] = BoundedQueue(self.pipeline.writer_queue_size, "block")
+        # Datagrams lost to an unexpected exception, by the stage that raised it.
+        self.failures = {"decode": 0, "write": 0}
+        self._failures_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._writer_thread: Optional[threading.Thread] = None
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update(
+            {
+                "ingress": self.ingress.stats(),
+                "egress": self.egress.stats(),
+                "writer_pending": self.writer.pending_records,
+                "failures": dict(self.failures),
+            }
+        )
+        return stats
+
+    def register_metrics(self, registry: MetricsRegistry) -> None:
+        super().register_metrics(registry)
+
+        def queues() -> Dict[str, BoundedQueue[Any]]:
+            return {"ingress": self.ingress, "egress": self.egress}
+
+        registry.collect(
+            "rtu_queue_depth",
+            "Items waiting in a pipeline queue",
+            "gauge",
+            lambda: [("rtu_queue_depth", {"queue": name}, len(queue)) for name, queue in queues().items()],
+        )
+        registry.collect(
+            "rtu_queue_dropped_total",
+            "Items dropped by a full pipeline queue",
+            "counter",
+            lambda: [("rtu_queue_dropped_total", {"queue": name}, queue.dropped) for name, queue in queues().items()],
+        )
+        registry.collect(
+            "rtu_worker_failures_total",
+            "Datagrams lost to an unexpected error in a decode or writer thread",
+            "counter",
+            lambda: [("rtu_worker_failures_total", {"stage": stage}, count) for stage, count in self.failures.items()],
+        )
+
+    def run(self, once: bool = False) -> None:
+        with self.open_socket() as sock:
+            sock.settimeout(5.0 if once else 0.5)
+            self._start_threads()
+            try:
+                self._receive_loop(sock, once)
+            finally:
+                self._shutdown()
+
+    def _receive_loop(self, sock: socket.socket, once: bool) -> None:
+        ingress = self.ingress
+        while not self._stop.is_set():
+            try:
+                datagram, (src_ip, src_port) = sock.recvfrom(65535)
+            except socket.timeout:
+                if once:
+                    raise TimeoutError("timeout waiting for UDP datagram")
+                continue
+            ingress.put((datagram, src_ip, src_port, time.time()))
+            if once:
+                break
+
+    def _start_threads(self) -> None:
+        for index in range(self.pipeline.decode_workers):
+            self._threads.append(
+                threading.Thread(target=self._decode_worker, name=f"rtu-decode-{index}", daemon=True)
+            )
+        writer_thread = threading.Thread(target=self._writer_worker, name="rtu-writer", daemon=True)
+        for thread in self._threads:
+            thread.start()
+        writer_thread.start()
+        self._writer_thread = writer_thread
+
+    def _shutdown(self) -> None:
+        # Drain in stage order: everything received is decoded, then written.
+        self.ingress.close()
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+        self.egress.close()
+        if self._writer_thread is not None:
+            self._writer_thread.join()
+            self._writer_thread = None
+        self.writer.flush()
+        if self.log_level == "debug":
+            print(f"pipeline stats: {self.stats()}", file=sys.stderr)
+
+    def _decode_worker(self) -> None:
+        ingress = self.ingress
+        egress = self.egress
+        while True:
+            item = ingress.get()
+            if item is None:
+                return
+            datagram, src_ip, src_port, received_at = item
+            try:
+                outputs = self.process_datagram(datagram, src_ip, src_port, ts=iso_utc(received_at))
+            except Exception as exc:  # noqa: BLE001 - a bad datagram must not kill the worker
+                self._failed("decode", exc)
+                continue
+            egress.put(outputs)
+
+    def _writer_worker(self) -> None:
+        egress = self.egress
+        idle_timeout = self.writer.flush_interval_s or 1.0
+        while True:
+            outputs = egress.get(timeout=idle_timeout)
+            if outputs is None:
+                if egress.closed and not len(egress):
+                    return
+                self.writer.flush_if_due()
+                continue
+            try:
+                self.emit(outputs)
+            except Exception as exc:  # noqa: BLE001 - a dead writer would stall every decode worker
+                self._failed("write", exc)
+
+    def _failed(self, stage: str, exc: Exception) -> None:
+        with self._failures_lock:
+            self.failures[stage] += 1
+        print(f"{stage} worker error: {exc!r}", file=sys.stderr)
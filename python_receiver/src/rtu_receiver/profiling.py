@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+PERCENTILES = (("p50_us", 0.5), ("p90_us", 0.9), ("p99_us", 0.99))
+
+
+class StageClock:
+    """perf_counter_ns timings of one datagram's stages, in the order they completed.
+
+    Each `mark(stage)` books the time since the previous mark (or since the
+    clock was created) to that stage.
+    """
+
+    __slots__ = ("started_ns", "_last_ns", "stages")
+
+    def __init__(self) -> None:
+        self.started_ns = self._last_ns = time.perf_counter_ns()
+        self.stages: List[Tuple[str, int]] = []
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter_ns()
+        self.stages.append((stage, now - self._last_ns))
+        self._last_ns = now
+
+    @property
+    def total_ns(self) -> int:
+        return self._last_ns - self.started_ns
+
+
+class SampledOutputs(list):
+    """Outputs of a sampled datagram, carrying its clock to the writer side."""
+
+    __slots__ = ("clock",)
+
+    def __init__(self, outputs: List[Any], clock: StageClock) -> None:
+        super().__init__(outputs)
+        self.clock = clock
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of a sorted, non-empty list."""
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class StageProfiler:
+    """Samples one datagram in `sample_every` and keeps per-stage rolling percentiles.
+
+    `sample()` is the only call made for every datagram; the others run for
+    sampled ones. Percentiles cover the last `window` samples of each stage,
+    so a summary reflects recent traffic rather than the whole uptime.
+    """
+
+    def __init__(self, sample_every: int = 100, window: int = 1024, summary_interval_s: float = 60.0) -> None:
+        if sample_every < 1:
+            raise ValueError("sample_every must be positive")
+        if window < 1:
+            raise ValueError("window must be positive")
+        self.sample_every = sample_every
+        self.window = window
+        self.summary_interval_s = summary_interval_s
+        # Shared by the decode threads of the pipeline and asyncio engines.
+        self._seen = 0
+        self._seen_lock = threading.Lock()
+        self._seen_at_summary = 0
+        self._windows: Dict[str, Deque[int]] = {}
+        self._sampled = 0
+        self._lock = threading.Lock()
+        self._last_summary = time.monotonic()
+
+    def sample(self) -> Optional[StageClock]:
+        """A running clock if this datagram is sampled, else None."""
+        with self._seen_lock:
+            self._seen = seen = self._seen + 1
+        if seen % self.sample_every:
+            return None
+        return StageClock()
+
+    def record(self, clock: StageClock) -> None:
+        with self._lock:
+            windows = self._windows
+            for stage, elapsed_ns in clock.stages:
+                samples = windows.get(stage)
+                if samples is None:
+                    samples = windows[stage] = deque(maxlen=self.window)
+                samples.append(elapsed_ns)
+            total = windows.get("total")
+            if total is None:
+                total = windows["total"] = deque(maxlen=self.window)
+            total.append(clock.total_ns)
+            self._sampled += 1
+
+    def summary_due(self) -> bool:
+        return time.monotonic() - self._last_summary >= self.summary_interval_s
+
+    def summary(self, ts_utc: str) -> Dict[str, Any]:
+        """The `perf` stream record for the interval since the previous summary."""
+        now = time.monotonic()
+        with self._lock:
+            snapshot = {stage: sorted(samples) for stage, samples in self._windows.items()}
+            sampled, self._sampled = self._sampled, 0
+            interval_s, self._last_summary = now - self._last_summary, now
+            with self._seen_lock:
+                seen = self._seen
+            datagrams, self._seen_at_summary = seen - self._seen_at_summary, seen
+
+        stages: Dict[str, Dict[str, Any]] = {}
+        for stage, ordered in snapshot.items():
+            stats: Dict[str, Any] = {"count": len(ordered)}
+            for name, q in PERCENTILES:
+                stats[name] = round(percentile(ordered, q) / 1000, 1)
+            stats["max_us"] = round(ordered[-1] / 1000, 1)
+            stages[stage] = stats
+        return {
+            "ts_utc": ts_utc,
+            "interval_s": round(interval_s, 3),
+            "datagrams": datagrams,
+            "sampled": sampled,
+            "sample_every": self.sample_every,
+            "window": self.window,
+            "stages": stages,
+        }
@@ -1,10 +1,31 @@
 from __future__ import annotations
 
+import re
+import struct
+import time
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Protocol, Sequence, Union
 
 from .crc16 import crc16_ccitt_false
-from .xtea import xtea_decrypt_ecb_le
+from .records import (
+    Archive,
+    ArchiveAck,
+    Auth,
+    ConfigCommand,
+    ConfigResponse,
+    Event,
+    EventEntry,
+    ExtendedRecord,
+    JsonRecord,
+    ReadCommand,
+    ReadResponse,
+    Telemetry,
+    TelemetryItem,
+    UnknownRecord,
+    to_json_value,
+)
+from .xtea import XteaCipherCache
+from .xtea_batch import HAVE_NUMPY, MIN_VECTOR_BLOCKS, xtea_decrypt_ecb_le_batch
 
 FRAME_START = 0xC0
 FRAME_END = 0xC2
@@ -16,11 +37,8 @@ _ESC_DECODE = {
     0xC4: 0xC4,
 }
 
-_ESC_ENCODE = {
-    0xC0: bytes((0xC4, 0xC1)),
-    0xC2: bytes((0xC4, 0xC3)),
-    0xC4: bytes((0xC4, 0xC4)),
-}
+# An escape byte plus whatever follows it (nothing when it dangles at the end).
+_ESCAPE_RE = re.compile(rb"\xc4(.?)", re.DOTALL)
 
 # Documented fixed lengths of type_id in ID=3 event_data blocks.
 EVENT_TYPE_LENGTHS: Dict[int, int] = {
@@ -74,6 +92,23 @@ EVENT_TYPE_LENGTHS: Dict[int, int] = {
 }
 
 
+# Server-to-device payloads (before padding, CRC and encryption).
+TELEMETRY_ACK = bytes((9,))
+# ID=1, param 55, len 1, value 0: no more requests, the device may sleep.
+END_OF_REQUESTS = bytes((1, 55, 1, 0))
+
+# Ciphers are derived per IMEI once and reused until the resolved key changes.
+_CIPHER_CACHE = XteaCipherCache(max_entries=4096)
+
+
+# EVENT_TYPE_LENGTHS as a 256-entry tuple indexed by type_id; 0 marks an unknown type.
+_EVENT_TYPE_LENGTH_TABLE = tuple(EVENT_TYPE_LENGTHS.get(type_id, 0) for type_id in range(256))
+
+# Single-byte fields are read by indexing, which is cheaper than a struct call.
+# event_code, event_time (unix, LE), event_data_len
+_EVENT_HEADER = struct.Struct("<BIB")
+
+
 @dataclass
 class ProtocolError(Exception):
     stage: str
@@ -91,51 +126,136 @@ class DecodeResult:
     frame_ok: bool
     crc_ok: bool
     payload_hex: str
-    records: List[Dict[str, Any]]
+    records: List[JsonRecord]
     warnings: List[str]
     nonfatal_errors: List[Dict[str, Any]]
 
+    def to_json_dict(self) -> Dict[str, Any]:
+        # Built directly instead of dataclasses.asdict, which deep-copies the whole tree.
+        return {
+            "imei": self.imei,
+            "frame_ok": self.frame_ok,
+            "crc_ok": self.crc_ok,
+            "payload_hex": self.payload_hex,
+            "records": [to_json_value(record) for record in self.records],
+            "warnings": self.warnings,
+            "nonfatal_errors": self.nonfatal_errors,
+        }
+
+
+class StageHook(Protocol):
+    """Receives the end of each decode stage, e.g. a `profiling.StageClock`."""
+
+    def mark(self, stage: str) -> None: ...
+
+
+class DecodeObserver(Protocol):
+    """Told how long each decode took and the error it failed with, e.g. `metrics.ReceiverMetrics`."""
+
+    def observe_decode(self, seconds: float, error: Optional[ProtocolError]) -> None: ...
+
+
+class Envelope:
+    """Verified outer layer of a datagram: IMEI, decrypted plaintext and CRC status.
+
+    Payload records are parsed on first access of `records` (or `warnings`,
+    `nonfatal_errors`, `to_result()`) and cached, so callers that only need
+    the IMEI or the raw plaintext never pay for parsing.
+    """
+
+    __slots__ = ("imei", "plaintext", "crc_received", "crc_calculated", "_parsed")
+
+    def __init__(self, imei: str, plaintext: bytes, crc_received: int, crc_calculated: int) -> None:
+        self.imei = imei
+        self.plaintext = plaintext
+        self.crc_received = crc_received
+        self.crc_calculated = crc_calculated
+        self._parsed: Optional[Dict[str, Any]] = None
+
+    @property
+    def crc_ok(self) -> bool:
+        return self.crc_received == self.crc_calculated
+
+    @property
+    def payload(self) -> bytes:
+        """Plaintext without the trailing CRC (payload plus zero padding)."""
+        return self.plaintext[:-2]
+
+    @property
+    def parsed(self) -> Dict[str, Any]:
+        if self._parsed is None:
+            self._parsed = parse_payload(self.payload)
+        return self._parsed
+
+    @property
+    def is_parsed(self) -> bool:
+        return self._parsed is not None
+
+    @property
+    def records(self) -> List[JsonRecord]:
+        return self.parsed["records"]
+
+    @property
+    def warnings(self) -> List[str]:
+        return self.parsed["warnings"]
+
+    @property
+    def nonfatal_errors(self) -> List[Dict[str, Any]]:
+        return self.parsed["nonfatal_errors"]
+
+    def to_result(self) -> DecodeResult:
+        parsed = self.parsed
+        return DecodeResult(
+            imei=self.imei,
+            frame_ok=True,
+            crc_ok=self.crc_ok,
+            payload_hex=parsed["payload_used"].hex(),
+            records=parsed["records"],
+            warnings=parsed["warnings"],
+            nonfatal_errors=parsed["nonfatal_errors"],
+        )
+
 
 def stuff_payload(raw: bytes) -> bytes:
-    out = bytearray()
-    for byte in raw:
-        escaped = _ESC_ENCODE.get(byte)
-        if escaped is None:
-            out.append(byte)
-        else:
-            out.extend(escaped)
-    return bytes(out)
+    # 0xC4 must be doubled first so the escapes inserted for 0xC0/0xC2 are left alone.
+    return bytes(raw).replace(b"\xc4", b"\xc4\xc4").replace(b"\xc0", b"\xc4\xc1").replace(b"\xc2", b"\xc4\xc3")
 
 
-def unstuff_payload(stuffed: bytes) -> bytes:
-    out = bytearray()
-    i = 0
-    while i < len(stuffed):
-        byte = stuffed[i]
-        if byte != ESCAPE:
-            out.append(byte)
-            i += 1
-            continue
+def unstuff_payload(stuffed: bytes, start: int = 0, end: Optional[int] = None) -> bytes:
+    """Undo byte stuffing of stuffed[start:end]; error offsets are relative to start."""
+    return bytes(_unstuff_view(stuffed, start, len(stuffed) if end is None else end))
+
 
-        if i + 1 >= len(stuffed):
+def _unstuff_view(data: bytes | memoryview, start: int, end: int) -> bytes | memoryview:
+    view = memoryview(data)
+    if _ESCAPE_RE.search(data, start, end) is None:
+        return view[start:end]
+
+    out = bytearray()
+    prev = start
+    for match in _ESCAPE_RE.finditer(data, start, end):
+        pos = match.start()
+        out += view[prev:pos]
+        esc = match.group(1)
+        if not esc:
             raise ProtocolError(
                 stage="unstuff",
                 reason="dangling_escape_byte",
-                details={"offset": i},
+                details={"offset": pos - start},
             )
 
-        esc = stuffed[i + 1]
-        decoded = _ESC_DECODE.get(esc)
+        decoded = _ESC_DECODE.get(esc[0])
         if decoded is None:
             raise ProtocolError(
                 stage="unstuff",
                 reason="invalid_escape_sequence",
-                details={"offset": i, "escape_byte": esc},
+                details={"offset": pos - start, "escape_byte": esc[0]},
             )
 
         out.append(decoded)
-        i += 2
+        prev = match.end()
 
+    out += view[prev:end]
     return bytes(out)
 
 
@@ -162,7 +282,167 @@ def build_frame(imei: str, encrypted_payload: bytes) -> bytes:
     return bytes((FRAME_START,)) + stuff_payload(body) + bytes((FRAME_END,))
 
 
-def decode_datagram(datagram: bytes, key_resolver: Callable[[str], Optional[bytes]]) -> DecodeResult:
+def encode_datagram(
+    imei: str,
+    payload: bytes,
+    key: bytes,
+    cipher_cache: Optional[XteaCipherCache] = None,
+) -> bytes:
+    """Pad, checksum, encrypt and frame a server-to-device payload."""
+    cache = _CIPHER_CACHE if cipher_cache is None else cipher_cache
+    return build_frame(imei, cache.get(imei, key).encrypt(build_plain_for_encrypt(payload)))
+
+
+def decode_datagram(
+    datagram: bytes,
+    key_resolver: Callable[[str], Optional[bytes]],
+    cipher_cache: Optional[XteaCipherCache] = None,
+    hook: Optional[StageHook] = None,
+    observer: Optional[DecodeObserver] = None,
+) -> DecodeResult:
+    """Decode one datagram; with a hook, each stage is reported to `hook.mark` as it completes.
+
+    An observer is told the time and outcome of framing, decryption and CRC
+    check; payload parsing is not included.
+    """
+    if hook is None:
+        return decode_envelope(datagram, key_resolver, cipher_cache, observer=observer).to_result()
+    result = decode_envelope_staged(datagram, key_resolver, hook, cipher_cache, observer=observer).to_result()
+    hook.mark("parse")
+    return result
+
+
+def decode_envelope(
+    datagram: bytes,
+    key_resolver: Callable[[str], Optional[bytes]],
+    cipher_cache: Optional[XteaCipherCache] = None,
+    verify_crc: bool = True,
+    observer: Optional[DecodeObserver] = None,
+) -> Envelope:
+    """Check framing, decrypt and verify CRC; payload parsing is deferred to Envelope.records.
+
+    With verify_crc=False a CRC mismatch is reported through `Envelope.crc_ok`
+    instead of raising.
+    """
+    if observer is not None:
+        return _observed(observer, decode_envelope, datagram, key_resolver, cipher_cache, verify_crc)
+    imei, ciphertext, key = _frame_key(_frame_body(datagram), key_resolver)
+    cache = _CIPHER_CACHE if cipher_cache is None else cipher_cache
+    try:
+        plaintext, crc_calc = cache.get(imei, key).decrypt_with_crc(ciphertext)
+    except ValueError as exc:
+        raise _decrypt_failed(imei, exc) from exc
+    return _open_plaintext(imei, plaintext, verify_crc, crc_calc)
+
+
+def decode_envelope_staged(
+    datagram: bytes,
+    key_resolver: Callable[[str], Optional[bytes]],
+    hook: StageHook,
+    cipher_cache: Optional[XteaCipherCache] = None,
+    verify_crc: bool = True,
+    observer: Optional[DecodeObserver] = None,
+) -> Envelope:
+    """decode_envelope, calling `hook.mark` after unstuff, key_lookup, xtea and crc.
+
+    A stage that raises is not marked, so the hook sees how far decoding got.
+    The checksum is computed while decrypting, so `xtea` includes it and
+    `crc` only covers the comparison.
+    """
+    if observer is not None:
+        return _observed(observer, decode_envelope_staged, datagram, key_resolver, hook, cipher_cache, verify_crc)
+    body = _frame_body(datagram)
+    hook.mark("unstuff")
+    imei, ciphertext, key = _frame_key(body, key_resolver)
+    hook.mark("key_lookup")
+    cache = _CIPHER_CACHE if cipher_cache is None else cipher_cache
+    try:
+        plaintext, crc_calc = cache.get(imei, key).decrypt_with_crc(ciphertext)
+    except ValueError as exc:
+        raise _decrypt_failed(imei, exc) from exc
+    hook.mark("xtea")
+    envelope = _open_plaintext(imei, plaintext, verify_crc, crc_calc)
+    hook.mark("crc")
+    return envelope
+
+
+def _observed(observer: DecodeObserver, decode: Callable[..., Envelope], *args: Any) -> Envelope:
+    started = time.perf_counter()
+    try:
+        envelope = decode(*args)
+    except ProtocolError as exc:
+        observer.observe_decode(time.perf_counter() - started, exc)
+        raise
+    observer.observe_decode(time.perf_counter() - started, None)
+    return envelope
+
+
+def decode_datagrams(
+    datagrams: Sequence[bytes],
+    key_resolver: Callable[[str], Optional[bytes]],
+    cipher_cache: Optional[XteaCipherCache] = None,
+) -> List[Union[DecodeResult, ProtocolError]]:
+    """Decode a batch of datagrams; each slot holds a DecodeResult or the ProtocolError it raised."""
+    results: List[Union[DecodeResult, ProtocolError]] = []
+    for envelope in decode_envelopes(datagrams, key_resolver, cipher_cache):
+        if isinstance(envelope, ProtocolError):
+            results.append(envelope)
+        else:
+            results.append(envelope.to_result())
+    return results
+
+
+def decode_envelopes(
+    datagrams: Sequence[bytes],
+    key_resolver: Callable[[str], Optional[bytes]],
+    cipher_cache: Optional[XteaCipherCache] = None,
+    observer: Optional[DecodeObserver] = None,
+) -> List[Union[Envelope, ProtocolError]]:
+    """Batch form of decode_envelope; each slot holds an Envelope or the ProtocolError it raised.
+
+    Ciphertexts of all well-framed datagrams are decrypted together, through
+    NumPy when it is installed and the batch is large enough. An observer
+    gets every datagram with the batch's mean time.
+    """
+    started = time.perf_counter()
+    results: List[Union[Envelope, ProtocolError, None]] = [None] * len(datagrams)
+    opened: List[tuple[int, str, bytes, bytes]] = []
+    for index, datagram in enumerate(datagrams):
+        try:
+            imei, ciphertext, key = _frame_key(_frame_body(datagram), key_resolver)
+        except ProtocolError as exc:
+            results[index] = exc
+            continue
+        opened.append((index, imei, ciphertext, key))
+
+    total_blocks = sum(len(ciphertext) for _, _, ciphertext, _ in opened) // 8
+    checked: List[tuple[bytes, Optional[int]]]
+    if HAVE_NUMPY and total_blocks >= MIN_VECTOR_BLOCKS:
+        plaintexts = xtea_decrypt_ecb_le_batch(
+            [(ciphertext, key) for _, _, ciphertext, key in opened],
+            use_numpy=True,
+        )
+        # Vectorised blocks come out all at once; their CRCs are taken afterwards.
+        checked = [(plaintext, None) for plaintext in plaintexts]
+    else:
+        cache = _CIPHER_CACHE if cipher_cache is None else cipher_cache
+        checked = [cache.get(imei, key).decrypt_with_crc(ciphertext) for _, imei, ciphertext, key in opened]
+
+    for (index, imei, _, _), (plaintext, crc_calc) in zip(opened, checked):
+        try:
+            results[index] = _open_plaintext(imei, plaintext, True, crc_calc)
+        except ProtocolError as exc:
+            results[index] = exc
+
+    if observer is not None and results:
+        mean_s = (time.perf_counter() - started) / len(results)
+        for result in results:
+            observer.observe_decode(mean_s, result if isinstance(result, ProtocolError) else None)
+    return results  # type: ignore[return-value]
+
+
+def _frame_body(datagram: bytes | memoryview) -> bytes | memoryview:
+    """Check the frame boundaries and undo byte stuffing of what lies between them."""
     if len(datagram) < 2:
         raise ProtocolError(
             stage="frame",
@@ -180,9 +460,14 @@ def decode_datagram(datagram: bytes, key_resolver: Callable[[str], Optional[byte
             },
         )
 
-    stuffed_body = datagram[1:-1]
-    body = unstuff_payload(stuffed_body)
+    return _unstuff_view(datagram, 1, len(datagram) - 1)
 
+
+def _frame_key(
+    body: bytes | memoryview,
+    key_resolver: Callable[[str], Optional[bytes]],
+) -> tuple[str, bytes | memoryview, bytes]:
+    """Split an unstuffed body into IMEI and ciphertext and look up the device key."""
     if len(body) < 16:
         raise ProtocolError(
             stage="frame",
@@ -217,16 +502,20 @@ def decode_datagram(datagram: bytes, key_resolver: Callable[[str], Optional[byte
             imei=imei,
         )
 
-    try:
-        plaintext = xtea_decrypt_ecb_le(ciphertext, key)
-    except ValueError as exc:
-        raise ProtocolError(
-            stage="xtea",
-            reason="decrypt_failed",
-            details={"message": str(exc)},
-            imei=imei,
-        ) from exc
+    return imei, ciphertext, key
+
 
+def _decrypt_failed(imei: str, exc: ValueError) -> ProtocolError:
+    return ProtocolError(
+        stage="xtea",
+        reason="decrypt_failed",
+        details={"message": str(exc)},
+        imei=imei,
+    )
+
+
+def _open_plaintext(imei: str, plaintext: bytes, verify_crc: bool, crc_calc: Optional[int] = None) -> Envelope:
+    """Check the CRC a plaintext ends with; crc_calc is its checksum if already computed."""
     if len(plaintext) < 2:
         raise ProtocolError(
             stage="crc",
@@ -236,9 +525,9 @@ def decode_datagram(datagram: bytes, key_resolver: Callable[[str], Optional[byte
         )
 
     crc_recv = int.from_bytes(plaintext[-2:], "little", signed=False)
-    plain_no_crc = plaintext[:-2]
-    crc_calc = crc16_ccitt_false(plain_no_crc)
-    if crc_calc != crc_recv:
+    if crc_calc is None:
+        crc_calc = crc16_ccitt_false(plaintext[:-2])
+    if verify_crc and crc_calc != crc_recv:
         raise ProtocolError(
             stage="crc",
             reason="crc_mismatch",
@@ -249,35 +538,33 @@ def decode_datagram(datagram: bytes, key_resolver: Callable[[str], Optional[byte
             imei=imei,
         )
 
-    parsed = parse_payload(plain_no_crc)
-
-    return DecodeResult(
-        imei=imei,
-        frame_ok=True,
-        crc_ok=True,
-        payload_hex=parsed["payload_used"].hex(),
-        records=parsed["records"],
-        warnings=parsed["warnings"],
-        nonfatal_errors=parsed["nonfatal_errors"],
-    )
+    return Envelope(imei, plaintext, crc_recv, crc_calc)
 
 
 def parse_payload(payload_with_pad: bytes) -> Dict[str, Any]:
-    records: List[Dict[str, Any]] = []
+    buf = payload_with_pad if isinstance(payload_with_pad, bytes) else bytes(payload_with_pad)
+    view = memoryview(buf)
+    size = len(buf)
+    # Everything from `tail` on is zero padding; replaces a per-byte scan at every record boundary.
+    tail = len(buf.rstrip(b"\x00"))
+
+    records: List[JsonRecord] = []
     warnings: List[str] = []
     nonfatal_errors: List[Dict[str, Any]] = []
 
     offset = 0
-    while offset < len(payload_with_pad):
-        if payload_with_pad[offset] == 0 and _all_zero(payload_with_pad[offset:]):
-            break
-
-        data_id = payload_with_pad[offset]
+    while offset < tail:
+        data_id = buf[offset]
         offset += 1
+        warnings_mark = len(warnings)
+        errors_mark = len(nonfatal_errors)
 
         try:
-            record, offset, parse_warnings, parse_errors = _parse_record(data_id, payload_with_pad, offset)
+            record, offset = _parse_record(data_id, buf, view, offset, tail, warnings, nonfatal_errors)
         except ValueError as exc:
+            # Warnings of a record that fails as a whole are not reported.
+            del warnings[warnings_mark:]
+            del nonfatal_errors[errors_mark:]
             warnings.append("payload_parse_error")
             nonfatal_errors.append(
                 {
@@ -290,194 +577,98 @@ def parse_payload(payload_with_pad: bytes) -> Dict[str, Any]:
                     },
                 }
             )
-            records.append(
-                {
-                    "id": data_id,
-                    "type": "unknown",
-                    "raw_hex": payload_with_pad[offset:].hex(),
-                    "parse_error": str(exc),
-                }
-            )
-            offset = len(payload_with_pad)
+            records.append(UnknownRecord(data_id, view[offset:], parse_error=str(exc)))
+            offset = size
             break
 
         records.append(record)
-        warnings.extend(parse_warnings)
-        nonfatal_errors.extend(parse_errors)
 
     return {
-        "payload_used": payload_with_pad[:offset],
-        "padding_len": len(payload_with_pad) - offset,
+        "payload_used": view[:offset],
+        "padding_len": size - offset,
         "records": records,
         "warnings": warnings,
         "nonfatal_errors": nonfatal_errors,
     }
 
 
-def _parse_record(data_id: int, buf: bytes, offset: int) -> tuple[Dict[str, Any], int, List[str], List[Dict[str, Any]]]:
-    warnings: List[str] = []
-    nonfatal_errors: List[Dict[str, Any]] = []
+def _parse_record(
+    data_id: int,
+    buf: bytes,
+    view: memoryview,
+    offset: int,
+    tail: int,
+    warnings: List[str],
+    nonfatal_errors: List[Dict[str, Any]],
+) -> tuple[JsonRecord, int]:
+    size = len(buf)
 
-    if data_id in (1, 6):
-        param_id, value, offset = _parse_param_len_data(buf, offset)
-        return (
-            {
-                "id": data_id,
-                "type": "config_command" if data_id == 1 else "read_command",
-                "param_id": param_id,
-                "len": len(value),
-                "data_hex": value.hex(),
-            },
-            offset,
-            warnings,
-            nonfatal_errors,
-        )
+    if data_id == 9:
+        _require_len(size, offset, 1, "truncated_telemetry_count")
+        count = buf[offset]
+        offset += 1
 
-    if data_id == 2:
-        _require_len(buf, offset, 2, "truncated_response")
-        param_id = buf[offset]
-        result_code = buf[offset + 1]
-        return (
-            {
-                "id": 2,
-                "type": "config_response",
-                "param_id": param_id,
-                "result_code": result_code,
-            },
-            offset + 2,
-            warnings,
-            nonfatal_errors,
-        )
+        items: List[TelemetryItem] = []
+        for _ in range(count):
+            _require_len(size, offset, 2, "truncated_telemetry_item_header")
+            param_id = buf[offset]
+            data_len = buf[offset + 1]
+            offset += 2
+            _require_len(size, offset, data_len, "truncated_telemetry_item_data")
+            items.append(TelemetryItem(param_id, view[offset : offset + data_len]))
+            offset += data_len
+
+        return Telemetry(count, items), offset
 
     if data_id == 3:
-        _require_len(buf, offset, 1, "truncated_archive_seq")
+        _require_len(size, offset, 1, "truncated_archive_seq")
         seq = buf[offset]
         offset += 1
 
-        events: List[Dict[str, Any]] = []
-        while offset < len(buf):
-            if buf[offset] == 0 and _all_zero(buf[offset:]):
-                break
-
-            _require_len(buf, offset, 6, "truncated_event_header")
-            event_code = buf[offset]
-            event_time = int.from_bytes(buf[offset + 1 : offset + 5], "little", signed=False)
-            event_data_len = buf[offset + 5]
+        events: List[Event] = []
+        while offset < tail:
+            _require_len(size, offset, 6, "truncated_event_header")
+            event_code, event_time, event_data_len = _EVENT_HEADER.unpack_from(buf, offset)
             offset += 6
 
-            _require_len(buf, offset, event_data_len, "truncated_event_data")
-            event_data = buf[offset : offset + event_data_len]
+            _require_len(size, offset, event_data_len, "truncated_event_data")
+            entries = _parse_event_data(buf, view, offset, offset + event_data_len, warnings, nonfatal_errors)
             offset += event_data_len
+            events.append(Event(event_code, event_time, event_data_len, entries))
 
-            parsed_event = _parse_event_data(event_data)
-            warnings.extend(parsed_event["warnings"])
-            nonfatal_errors.extend(parsed_event["nonfatal_errors"])
-            events.append(
-                {
-                    "event_code": event_code,
-                    "event_time": event_time,
-                    "event_data_len": event_data_len,
-                    "event_data": parsed_event["entries"],
-                }
-            )
+        return Archive(seq, events), offset
 
-        return (
-            {
-                "id": 3,
-                "type": "archive",
-                "seq": seq,
-                "events": events,
-            },
-            offset,
-            warnings,
-            nonfatal_errors,
-        )
+    if data_id in (1, 6):
+        _require_len(size, offset, 2, "truncated_param_len_data_header")
+        param_id = buf[offset]
+        data_len = buf[offset + 1]
+        offset += 2
+        _require_len(size, offset, data_len, "truncated_param_len_data_value")
+        value = view[offset : offset + data_len]
+        record = ConfigCommand(param_id, value) if data_id == 1 else ReadCommand(param_id, value)
+        return record, offset + data_len
+
+    if data_id == 2:
+        _require_len(size, offset, 2, "truncated_response")
+        return ConfigResponse(buf[offset], buf[offset + 1]), offset + 2
 
     if data_id == 4:
-        _require_len(buf, offset, 1, "truncated_archive_ack")
-        seq = buf[offset]
-        return (
-            {
-                "id": 4,
-                "type": "archive_ack",
-                "seq": seq,
-            },
-            offset + 1,
-            warnings,
-            nonfatal_errors,
-        )
+        _require_len(size, offset, 1, "truncated_archive_ack")
+        return ArchiveAck(buf[offset]), offset + 1
 
     if data_id == 7:
-        _require_len(buf, offset, 3, "truncated_read_response_header")
+        _require_len(size, offset, 3, "truncated_read_response_header")
         param_id = buf[offset]
         result_code = buf[offset + 1]
         data_len = buf[offset + 2]
         offset += 3
-        _require_len(buf, offset, data_len, "truncated_read_response_data")
-        value = buf[offset : offset + data_len]
-        return (
-            {
-                "id": 7,
-                "type": "read_response",
-                "param_id": param_id,
-                "result_code": result_code,
-                "len": data_len,
-                "data_hex": value.hex(),
-            },
-            offset + data_len,
-            warnings,
-            nonfatal_errors,
-        )
+        _require_len(size, offset, data_len, "truncated_read_response_data")
+        return ReadResponse(param_id, result_code, view[offset : offset + data_len]), offset + data_len
 
     if data_id == 8:
-        raw = buf[offset:]
-        return (
-            {
-                "id": 8,
-                "type": "auth",
-                "raw_hex": raw.hex(),
-            },
-            len(buf),
-            warnings,
-            nonfatal_errors,
-        )
-
-    if data_id == 9:
-        _require_len(buf, offset, 1, "truncated_telemetry_count")
-        count = buf[offset]
-        offset += 1
-
-        items = []
-        for _ in range(count):
-            _require_len(buf, offset, 2, "truncated_telemetry_item_header")
-            param_id = buf[offset]
-            data_len = buf[offset + 1]
-            offset += 2
-            _require_len(buf, offset, data_len, "truncated_telemetry_item_data")
-            value = buf[offset : offset + data_len]
-            offset += data_len
-            items.append(
-                {
-                    "param_id": param_id,
-                    "len": data_len,
-                    "data_hex": value.hex(),
-                }
-            )
-
-        return (
-            {
-                "id": 9,
-                "type": "telemetry",
-                "count": count,
-                "items": items,
-            },
-            offset,
-            warnings,
-            nonfatal_errors,
-        )
+        return Auth(view[offset:]), size
 
     if data_id in (10, 11, 12, 13, 14):
-        raw = buf[offset:]
         warnings.append("rtu800_extended_id")
         nonfatal_errors.append(
             {
@@ -486,18 +677,8 @@ def _parse_record(data_id: int, buf: bytes, offset: int) -> tuple[Dict[str, Any]
                 "details": {"data_id": data_id},
             }
         )
-        return (
-            {
-                "id": data_id,
-                "type": "rtu800_extended",
-                "raw_hex": raw.hex(),
-            },
-            len(buf),
-            warnings,
-            nonfatal_errors,
-        )
+        return ExtendedRecord(data_id, view[offset:]), size
 
-    raw = buf[offset:]
     warnings.append("unknown_data_id")
     nonfatal_errors.append(
         {
@@ -506,40 +687,26 @@ def _parse_record(data_id: int, buf: bytes, offset: int) -> tuple[Dict[str, Any]
             "details": {"data_id": data_id},
         }
     )
-    return (
-        {
-            "id": data_id,
-            "type": "unknown",
-            "raw_hex": raw.hex(),
-        },
-        len(buf),
-        warnings,
-        nonfatal_errors,
-    )
-
-
-def _parse_param_len_data(buf: bytes, offset: int) -> tuple[int, bytes, int]:
-    _require_len(buf, offset, 2, "truncated_param_len_data_header")
-    param_id = buf[offset]
-    data_len = buf[offset + 1]
-    offset += 2
-    _require_len(buf, offset, data_len, "truncated_param_len_data_value")
-    value = buf[offset : offset + data_len]
-    return param_id, value, offset + data_len
-
-
-def _parse_event_data(event_data: bytes) -> Dict[str, Any]:
-    entries: List[Dict[str, Any]] = []
-    warnings: List[str] = []
-    nonfatal_errors: List[Dict[str, Any]] = []
-
-    offset = 0
-    while offset < len(event_data):
-        type_id = event_data[offset]
+    return UnknownRecord(data_id, view[offset:]), size
+
+
+def _parse_event_data(
+    buf: bytes,
+    view: memoryview,
+    offset: int,
+    end: int,
+    warnings: List[str],
+    nonfatal_errors: List[Dict[str, Any]],
+) -> List[EventEntry]:
+    entries: List[EventEntry] = []
+    lengths = _EVENT_TYPE_LENGTH_TABLE
+
+    while offset < end:
+        type_id = buf[offset]
         offset += 1
 
-        fixed_len = EVENT_TYPE_LENGTHS.get(type_id)
-        if fixed_len is None:
+        fixed_len = lengths[type_id]
+        if not fixed_len:
             warnings.append("unknown_type_id")
             nonfatal_errors.append(
                 {
@@ -548,16 +715,10 @@ def _parse_event_data(event_data: bytes) -> Dict[str, Any]:
                     "details": {"type_id": type_id},
                 }
             )
-            entries.append(
-                {
-                    "type_id": type_id,
-                    "raw_hex": event_data[offset:].hex(),
-                    "unknown": True,
-                }
-            )
+            entries.append(EventEntry(type_id, view[offset:end], unknown=True))
             break
 
-        if offset + fixed_len > len(event_data):
+        if offset + fixed_len > end:
             warnings.append("event_type_len_mismatch")
             nonfatal_errors.append(
                 {
@@ -566,43 +727,19 @@ def _parse_event_data(event_data: bytes) -> Dict[str, Any]:
                     "details": {
                         "type_id": type_id,
                         "expected_len": fixed_len,
-                        "available": len(event_data) - offset,
+                        "available": end - offset,
                     },
                 }
             )
-            entries.append(
-                {
-                    "type_id": type_id,
-                    "raw_hex": event_data[offset:].hex(),
-                    "len_mismatch": True,
-                }
-            )
+            entries.append(EventEntry(type_id, view[offset:end], len_mismatch=True))
             break
 
-        value = event_data[offset : offset + fixed_len]
+        entries.append(EventEntry(type_id, view[offset : offset + fixed_len]))
         offset += fixed_len
-        entries.append(
-            {
-                "type_id": type_id,
-                "len": fixed_len,
-                "raw_hex": value.hex(),
-            }
-        )
-
-    return {
-        "entries": entries,
-        "warnings": warnings,
-        "nonfatal_errors": nonfatal_errors,
-    }
-
 
-def _all_zero(data: bytes) -> bool:
-    for byte in data:
-        if byte != 0:
-            return False
-    return True
+    return entries
 
 
-def _require_len(buf: bytes, offset: int, needed: int, reason: str) -> None:
-    if offset + needed > len(buf):
+def _require_len(size: int, offset: int, needed: int, reason: str) -> None:
+    if offset + needed > size:
         raise ValueError(reason)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import argparse
+import heapq
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .jsonl import list_logs
+from .logindex import LogIndex, build_index, index_path
+from .timeutil import iso_to_us, us_to_iso
+
+
+def log_files(log_dir: Path, stream: str, since_us: Optional[int] = None, until_us: Optional[int] = None) -> List[Path]:
+    """JSONL files of stream whose UTC day can hold records in [since, until), by day, shard and part."""
+    first_day = us_to_iso(since_us)[:10].replace("-", "") if since_us is not None else ""
+    last_day = us_to_iso(until_us - 1)[:10].replace("-", "") if until_us is not None else "99999999"
+    return [path for day, _, _, path in list_logs(log_dir, stream) if first_day <= day <= last_day]
+
+
+def query_logs(
+    log_dir: Path,
+    stream: str = "decoded",
+    imei: Optional[str] = None,
+    since_us: Optional[int] = None,
+    until_us: Optional[int] = None,
+) -> Iterator[bytes]:
+    """Matching JSONL lines across days, parts and worker shards, ordered by `ts_utc`."""
+    paths = log_files(log_dir, stream, since_us, until_us)
+    sources = [LogIndex(path).query(imei, since_us, until_us) for path in paths]
+    for _, line in heapq.merge(*sources, key=lambda item: item[0]):
+        yield line
+
+
+def build_indexes(log_dir: Path, stream: str, force: bool = False) -> Iterator[Tuple[Path, int]]:
+    """Write missing `.idx` files (all of them with force); yields (log, records indexed)."""
+    for path in log_files(log_dir, stream):
+        if force or not index_path(path).exists():
+            yield path, build_index(path)
+
+
+def _parse_time(value: str) -> int:
+    try:
+        ts = datetime.fromisoformat(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"not an ISO 8601 time: {value!r}") from exc
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return iso_to_us(ts.isoformat())
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Print the records of one device and/or time range from JSONL logs")
+    parser.add_argument("--log-dir", required=True, help="Receiver log directory")
+    parser.add_argument("--stream", default="decoded", choices=("raw", "decoded", "errors"))
+    parser.add_argument("--imei", default=None, help="Only records of this device")
+    parser.add_argument("--since", type=_parse_time, default=None, help="ISO time, inclusive (UTC unless given)")
+    parser.add_argument("--until", type=_parse_time, default=None, help="ISO time, exclusive (UTC unless given)")
+    parser.add_argument("--build-index", action="store_true", help="Write missing .idx files instead of querying")
+    parser.add_argument("--force", action="store_true", help="With --build-index, rewrite existing indexes too")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.imei is not None and not args.imei.isdigit():
+        print("--imei must contain digits only", file=sys.stderr)
+        return 2
+
+    log_dir = Path(args.log_dir)
+    try:
+        if args.build_index:
+            for path, count in build_indexes(log_dir, args.stream, args.force):
+                print(f"{path}: {count} records", file=sys.stderr)
+            return 0
+        out = sys.stdout.buffer
+        for line in query_logs(log_dir, args.stream, args.imei, args.since, args.until):
+            out.write(line)
+    except (OSError, ValueError) as exc:
+        print(f"query error: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
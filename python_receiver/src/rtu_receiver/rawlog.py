@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import argparse
+import mmap
+import socket
+import struct
+import sys
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, NamedTuple, Optional
+
+from .jsonl import encode_record, iter_jsonl
+from .timeutil import iso_to_us, us_to_iso
+
+# File layout: header, then records back to back (all little-endian).
+#   header: magic "RTUR", version u16, header size u16
+#   record: datagram len u32, ts unix microseconds i64, address family u8 (4/6),
+#           flags u8, address 16 bytes (IPv4 in the first 4), port u16, datagram
+# A record cut short by a crash ends the file for readers.
+MAGIC = b"RTUR"
+VERSION = 1
+_HEADER = struct.Struct("<4sHH")
+_RECORD = struct.Struct("<IqBB16sH")
+RECORD_HEADER_SIZE = _RECORD.size
+
+FLAG_DUPLICATE_DATAGRAM = 0x01
+FLAG_DUPLICATE_ARCHIVE = 0x02
+_DUPLICATE_FLAGS = {"datagram": FLAG_DUPLICATE_DATAGRAM, "archive_seq": FLAG_DUPLICATE_ARCHIVE}
+_FLAG_DUPLICATES = {flag: name for name, flag in _DUPLICATE_FLAGS.items()}
+
+
+def file_header() -> bytes:
+    return _HEADER.pack(MAGIC, VERSION, _HEADER.size)
+
+
+class RawRecord(NamedTuple):
+    """One captured datagram; the binary counterpart of a `raw-*.jsonl` record."""
+
+    ts_us: int
+    src_ip: str
+    src_port: int
+    datagram: bytes
+    duplicate: Optional[str] = None
+
+    @property
+    def ts_utc(self) -> str:
+        return us_to_iso(self.ts_us)
+
+    def encode(self) -> bytes:
+        if ":" in self.src_ip:
+            family, address = 6, socket.inet_pton(socket.AF_INET6, self.src_ip)
+        else:
+            family, address = 4, socket.inet_pton(socket.AF_INET, self.src_ip)
+        flags = _DUPLICATE_FLAGS[self.duplicate] if self.duplicate else 0
+        header = _RECORD.pack(len(self.datagram), self.ts_us, family, flags, address, self.src_port)
+        return header + self.datagram
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        record: Dict[str, Any] = {
+            "ts_utc": self.ts_utc,
+            "src_ip": self.src_ip,
+            "src_port": self.src_port,
+            "len": len(self.datagram),
+            "datagram_hex": self.datagram.hex(),
+        }
+        if self.duplicate:
+            record["duplicate"] = self.duplicate
+        return record
+
+    @classmethod
+    def from_json_dict(cls, record: Dict[str, Any]) -> RawRecord:
+        return cls(
+            iso_to_us(record["ts_utc"]),
+            record["src_ip"],
+            record["src_port"],
+            bytes.fromhex(record["datagram_hex"]),
+            record.get("duplicate"),
+        )
+
+
+def iter_rawlog(path: Path, use_mmap: bool = True) -> Iterator[RawRecord]:
+    """Records of a binary raw log in file order; raises ValueError on a foreign header."""
+    with path.open("rb") as fp:
+        if use_mmap:
+            if path.stat().st_size == 0:
+                return
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield from _iter_buffer(mm, path)
+        else:
+            yield from _iter_buffer(fp.read(), path)
+
+
+def _iter_buffer(buf: Any, path: Path) -> Iterator[RawRecord]:
+    size = len(buf)
+    if size < _HEADER.size:
+        return
+    magic, version, header_size = _HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a binary raw log")
+    if version != VERSION:
+        raise ValueError(f"{path}: unsupported raw log version {version}")
+
+    unpack = _RECORD.unpack_from
+    record_size = _RECORD.size
+    offset = header_size
+    while offset + record_size <= size:
+        length, ts_us, family, flags, address, port = unpack(buf, offset)
+        start = offset + record_size
+        end = start + length
+        if end > size:
+            return
+        if family == 4:
+            src_ip = socket.inet_ntop(socket.AF_INET, address[:4])
+        else:
+            src_ip = socket.inet_ntop(socket.AF_INET6, address)
+        yield RawRecord(ts_us, src_ip, port, buf[start:end], _FLAG_DUPLICATES.get(flags))
+        offset = end
+
+
+def rawlog_to_jsonl(src: Path, dst: BinaryIO) -> int:
+    count = 0
+    for record in iter_rawlog(src):
+        dst.write(encode_record(record.to_json_dict()))
+        count += 1
+    return count
+
+
+def jsonl_to_rawlog(src: Path, dst: BinaryIO) -> int:
+    dst.write(file_header())
+    count = 0
+    for record in iter_jsonl(src):
+        dst.write(RawRecord.from_json_dict(record).encode())
+        count += 1
+    return count
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Convert between binary raw logs (.bin) and raw-*.jsonl")
+    sub = parser.add_subparsers(dest="action", required=True)
+    to_jsonl = sub.add_parser("to-jsonl", help="Print a .bin raw log as JSONL (or write it to --out)")
+    to_jsonl.add_argument("src")
+    to_jsonl.add_argument("--out", default=None)
+    from_jsonl = sub.add_parser("from-jsonl", help="Write a raw-*.jsonl file as a .bin raw log")
+    from_jsonl.add_argument("src")
+    from_jsonl.add_argument("out")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        if args.action == "to-jsonl":
+            if args.out is None:
+                count = rawlog_to_jsonl(Path(args.src), sys.stdout.buffer)
+            else:
+                with open(args.out, "xb") as dst:
+                    count = rawlog_to_jsonl(Path(args.src), dst)
+        else:
+            with open(args.out, "xb") as dst:
+                count = jsonl_to_rawlog(Path(args.src), dst)
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    print(f"{count} records", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
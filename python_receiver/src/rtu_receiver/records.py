@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import abc
+from typing import Any, Dict, Iterator, List, Optional
+
+# Values are kept as the raw bytes (or memoryview slices) of the decrypted
+# payload; hex strings are only produced when a record is serialized.
+Buffer = bytes | memoryview
+
+
+class JsonRecord(abc.ABC):
+    """Base for slotted payload records.
+
+    `to_json_dict()` builds the JSON form directly. Item access (`rec["id"]`,
+    `rec.get("type")`) goes through that same dict form and is kept for code
+    written against the earlier dict-of-hex records.
+    """
+
+    __slots__ = ()
+
+    @abc.abstractmethod
+    def to_json_dict(self) -> Dict[str, Any]: ...
+
+    def __getitem__(self, key: str) -> Any:
+        return self.to_json_dict()[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.to_json_dict().get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.to_json_dict()
+
+    def keys(self) -> Iterator[str]:
+        return iter(self.to_json_dict())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, JsonRecord):
+            return type(self) is type(other) and self.to_json_dict() == other.to_json_dict()
+        if isinstance(other, dict):
+            return self.to_json_dict() == other
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_json_dict()!r})"
+
+
+def to_json_value(record: Any) -> Any:
+    """JSON form of a record that may be a JsonRecord or a legacy plain dict."""
+    if isinstance(record, JsonRecord):
+        return record.to_json_dict()
+    return record
+
+
+class _ParamCommand(JsonRecord):
+    __slots__ = ("param_id", "data")
+    id = 0
+    type_name = ""
+
+    def __init__(self, param_id: int, data: Buffer) -> None:
+        self.param_id = param_id
+        self.data = data
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type_name,
+            "param_id": self.param_id,
+            "len": len(self.data),
+            "data_hex": self.data.hex(),
+        }
+
+
+class ConfigCommand(_ParamCommand):
+    __slots__ = ()
+    id = 1
+    type_name = "config_command"
+
+
+class ReadCommand(_ParamCommand):
+    __slots__ = ()
+    id = 6
+    type_name = "read_command"
+
+
+class ConfigResponse(JsonRecord):
+    __slots__ = ("param_id", "result_code")
+    id = 2
+
+    def __init__(self, param_id: int, result_code: int) -> None:
+        self.param_id = param_id
+        self.result_code = result_code
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            "id": 2,
+            "type": "config_response",
+            "param_id": self.param_id,
+            "result_code": self.result_code,
+        }
+
+
+class EventEntry(JsonRecord):
+    __slots__ = ("type_id", "value", "unknown", "len_mismatch")
+
+    def __init__(self, type_id: int, value: Buffer, unknown: bool = False, len_mismatch: bool = False) -> None:
+        self.type_id = type_id
+        self.value = value
+        self.unknown = unknown
+        self.len_mismatch = len_mismatch
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        if self.unknown:
+            return {"type_id": self.type_id, "raw_hex": self.value.hex(), "unknown": True}
+        if self.len_mismatch:
+            return {"type_id": self.type_id, "raw_hex": self.value.hex(), "len_mismatch": True}
+        return {"type_id": self.type_id, "len": len(self.value), "raw_hex": self.value.hex()}
+
+
+class Event(JsonRecord):
+    __slots__ = ("event_code", "event_time", "event_data_len", "entries")
+
+    def __init__(self, event_code: int, event_time: int, event_data_len: int, entries: List[EventEntry]) -> None:
+        self.event_code = event_code
+        self.event_time = event_time
+        self.event_data_len = event_data_len
+        self.entries = entries
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            "event_code": self.event_code,
+            "event_time": self.event_time,
+            "event_data_len": self.event_data_len,
+            "event_data": [entry.to_json_dict() for entry in self.entries],
+        }
+
+
+class Archive(JsonRecord):
+    __slots__ = ("seq", "events")
+    id = 3
+
+    def __init__(self, seq: int, events: List[Event]) -> None:
+        self.seq = seq
+        self.events = events
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            "id": 3,
+            "type": "archive",
+            "seq": self.seq,
+            "events": [event.to_json_dict() for event in self.events],
+        }
+
+
+class ArchiveAck(JsonRecord):
+    __slots__ = ("seq",)
+    id = 4
+
+    def __init__(self, seq: int) -> None:
+        self.seq = seq
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {"id": 4, "type": "archive_ack", "seq": self.seq}
+
+
+class ReadResponse(JsonRecord):
+    __slots__ = ("param_id", "result_code", "data")
+    id = 7
+
+    def __init__(self, param_id: int, result_code: int, data: Buffer) -> None:
+        self.param_id = param_id
+        self.result_code = result_code
+        self.data = data
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            "id": 7,
+            "type": "read_response",
+            "param_id": self.param_id,
+            "result_code": self.result_code,
+            "len": len(self.data),
+            "data_hex": self.data.hex(),
+        }
+
+
+class Auth(JsonRecord):
+    __slots__ = ("raw",)
+    id = 8
+
+    def __init__(self, raw: Buffer) -> None:
+        self.raw = raw
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {"id": 8, "type": "auth", "raw_hex": self.raw.hex()}
+
+
+class TelemetryItem(JsonRecord):
+    __slots__ = ("param_id", "data")
+
+    def __init__(self, param_id: int, data: Buffer) -> None:
+        self.param_id = param_id
+        self.data = data
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {"param_id": self.param_id, "len": len(self.data), "data_hex": self.data.hex()}
+
+
+class Telemetry(JsonRecord):
+    __slots__ = ("count", "items")
+    id = 9
+
+    def __init__(self, count: int, items: List[TelemetryItem]) -> None:
+        self.count = count
+        self.items = items
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            "id": 9,
+            "type": "telemetry",
+            "count": self.count,
+            "items": [item.to_json_dict() for item in self.items],
+        }
+
+
+class ExtendedRecord(JsonRecord):
+    """RTU800 extended IDs 10..14, kept raw."""
+
+    __slots__ = ("id", "raw")
+
+    def __init__(self, data_id: int, raw: Buffer) -> None:
+        self.id = data_id
+        self.raw = raw
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "type": "rtu800_extended", "raw_hex": self.raw.hex()}
+
+
+class UnknownRecord(JsonRecord):
+    __slots__ = ("id", "raw", "parse_error")
+
+    def __init__(self, data_id: int, raw: Buffer, parse_error: Optional[str] = None) -> None:
+        self.id = data_id
+        self.raw = raw
+        self.parse_error = parse_error
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"id": self.id, "type": "unknown", "raw_hex": self.raw.hex()}
+        if self.parse_error is not None:
+            out["parse_error"] = self.parse_error
+        return out
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import dataclasses
+import signal
+import sys
+import threading
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+from .config import ReceiverConfig, load_config
+from .keystore import file_signature
+from .metrics import MetricsRegistry
+from .udp_server import UdpReceiverServer
+
+# Fields a running receiver switches to on reload. Everything else is bound
+# to the socket, the writer or a cache sized at startup and needs a restart.
+RELOADABLE = ("keys", "decode_enabled", "decoded_imeis")
+
+
+def restart_fields(current: ReceiverConfig, new: ReceiverConfig) -> List[str]:
+    """Names of the changed fields that only take effect after a restart."""
+    return [
+        item.name
+        for item in dataclasses.fields(ReceiverConfig)
+        if item.name not in RELOADABLE and getattr(current, item.name) != getattr(new, item.name)
+    ]
+
+
+def merge_reloadable(current: ReceiverConfig, new: ReceiverConfig) -> ReceiverConfig:
+    """current with the reloadable fields of new.
+
+    An unchanged key store is carried over, LRU included, and the one new
+    opened is closed. A replaced store is left open: lookups in flight may
+    still use it, and it is closed when the last of them drops it.
+    """
+    keys = new.keys
+    store = current.keys.store
+    if store is not None and keys.store == store and not store.changed():
+        keys.store.close()  # type: ignore[union-attr]
+        keys = dataclasses.replace(keys, store=store)
+    return dataclasses.replace(
+        current,
+        keys=keys,
+        decode_enabled=new.decode_enabled,
+        decoded_imeis=new.decoded_imeis,
+    )
+
+
+class ConfigReloader:
+    """Reloads the config file into a running server on SIGHUP or when it changes on disk.
+
+    The file is parsed and validated on a background thread; an invalid
+    config is reported and the running one kept. Only RELOADABLE fields are
+    applied, by swapping in a new ReceiverConfig, so the socket and open logs
+    stay as they are. Cipher state of IMEIs whose key did not change is kept
+    by the decoder's cache, which is keyed by IMEI and checked against the key.
+
+    The file and the key store are checked every `poll_s` (None: only on
+    SIGHUP). The first check always loads the file, so a worker restarted
+    with the supervisor's startup config catches up with earlier reloads.
+    """
+
+    def __init__(self, path: str | Path, server: UdpReceiverServer, poll_s: Optional[float] = 5.0) -> None:
+        self.path = Path(path)
+        self.server = server
+        self.poll_s = poll_s
+        self.reloads = 0
+        self.failures = 0
+        # The config as last read from the file, to tell what an edit changed.
+        self.loaded: Optional[ReceiverConfig] = None
+        self._signature: Optional[Tuple[Any, ...]] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._previous_handler: Any = None
+
+    def __enter__(self) -> ConfigReloader:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def register_metrics(self, registry: MetricsRegistry) -> None:
+        registry.value_of("rtu_config_reloads_total", "Config reloads applied", "counter", lambda: self.reloads)
+        registry.value_of(
+            "rtu_config_reload_failures_total",
+            "Config reloads rejected as invalid",
+            "counter",
+            lambda: self.failures,
+        )
+
+    def start(self) -> None:
+        # Signal handlers can only be set from the main thread; elsewhere
+        # (e.g. tests) the file check is the only trigger.
+        if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGHUP, self._on_sighup)
+        self._wake.set()
+        self._thread = threading.Thread(target=self._loop, name="rtu-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._previous_handler is not None:
+            signal.signal(signal.SIGHUP, self._previous_handler)
+            self._previous_handler = None
+
+    def _on_sighup(self, signum: int, frame: object) -> None:
+        # Runs between bytecodes of the receive loop: hand off, do nothing else.
+        self._wake.set()
+
+    def signature(self) -> Tuple[Any, ...]:
+        store = self.server.config.keys.store
+        return file_signature(self.path), store is not None and store.changed()
+
+    def _loop(self) -> None:
+        while True:
+            woken = self._wake.wait(self.poll_s)
+            if self._stop.is_set():
+                return
+            self._wake.clear()
+            if woken or self.signature() != self._signature:
+                self.reload()
+
+    def reload(self) -> bool:
+        """Load the file and apply what may change at runtime; False if it was rejected."""
+        # Taken first, so a file that fails to load is reported once per edit.
+        self._signature = self.signature()
+        try:
+            new = load_config(self.path)
+        except ValueError as exc:
+            self.failures += 1
+            print(f"reload: {exc}; keeping the running config", file=sys.stderr)
+            return False
+
+        if self.loaded is not None:
+            for name in restart_fields(self.loaded, new):
+                print(f"reload: {name} changed, restart to apply", file=sys.stderr)
+        self.loaded = new
+
+        current = self.server.config
+        merged = merge_reloadable(current, new)
+        if merged != current or merged.keys.store is not current.keys.store:
+            self.server.apply_config(merged)
+            self.reloads += 1
+            print(f"reload: applied {self.path}", file=sys.stderr)
+        self._signature = self.signature()
+        return True
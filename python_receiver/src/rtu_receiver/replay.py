@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+from .compression import is_compressed, open_log
+from .config import AckConfig, DedupConfig, DownlinkConfig, ReceiverConfig, load_config
+from .jsonl import JsonlWriter, encode_record, log_file_name, parse_log_name
+from .protocol import Envelope, ProtocolError, decode_envelope
+from .rawlog import RECORD_HEADER_SIZE, RawRecord, iter_rawlog
+from .udp_server import UdpReceiverServer
+
+# Serialized JSONL lines per output stream for one chunk of raw records.
+ChunkOutput = Dict[str, bytes]
+# A raw-*.jsonl line or a record of a binary raw log.
+RawItem = Union[bytes, RawRecord]
+
+T = TypeVar("T")
+
+_server: Optional[UdpReceiverServer] = None
+
+
+def replay_config(config: ReceiverConfig) -> ReceiverConfig:
+    """The receiver config with everything that talks to devices or keeps state turned off.
+
+    Live deduplication is not redone: raw records it marked as duplicates
+    are skipped instead, which gives the same output at any parallelism.
+    """
+    return dataclasses.replace(
+        config,
+        decode_enabled=True,
+        dedup=DedupConfig(),
+        ack=AckConfig(),
+        downlink=DownlinkConfig(),
+    )
+
+
+def _init_worker(config: ReceiverConfig, out_dir: Path) -> None:
+    global _server
+    # The writer is never written to; outputs go back to the parent as bytes.
+    _server = UdpReceiverServer(config, JsonlWriter(out_dir))
+
+
+def decode_chunk(items: List[RawItem]) -> ChunkOutput:
+    """Decode raw records into decoded/errors lines, as the live server would have logged them."""
+    assert _server is not None, "worker not initialized"
+    server = _server
+    out: Dict[str, List[bytes]] = {}
+    for item in items:
+        if isinstance(item, RawRecord):
+            record = item
+        elif item.strip():
+            record = RawRecord.from_json_dict(json.loads(item))
+        else:
+            continue
+        if record.duplicate:
+            continue
+        datagram = record.datagram
+        config = server.config
+        try:
+            result: Envelope | ProtocolError = decode_envelope(datagram, config.keys.resolve_key)
+        except ProtocolError as exc:
+            result = exc
+        outputs = server.build_outputs(datagram, record.src_ip, record.src_port, record.ts_utc, result, config)
+        for stream, output in outputs[1:]:
+            out.setdefault(stream, []).append(encode_record(output))
+    return {stream: b"".join(encoded) for stream, encoded in out.items()}
+
+
+def iter_chunks(items: Iterable[T], chunk_size: int) -> Iterator[List[T]]:
+    chunk: List[T] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_raw_items(path: Path) -> Iterator[RawItem]:
+    """Lines of a raw-*.jsonl[.gz|.xz] file or records of a binary raw-*.bin file."""
+    if path.suffix == ".bin":
+        yield from iter_rawlog(path)
+        return
+    with open_log(path) as fp:
+        yield from fp
+
+
+def _item_size(item: RawItem) -> int:
+    return len(item) if isinstance(item, bytes) else RECORD_HEADER_SIZE + len(item.datagram)
+
+
+def output_name(raw_path: Path, stream: str) -> str:
+    """`raw-20250101.w1.2.jsonl` (or `.bin`) -> `decoded-20250101.w1.2.jsonl`."""
+    parsed = parse_log_name(raw_path.name)
+    if parsed is None:
+        return f"{stream}-{raw_path.name}"
+    return log_file_name(stream, parsed["day"], parsed["part"], parsed["shard"] or None)
+
+
+class _Outputs:
+    """Output files of one input, opened on first write like the live writer's."""
+
+    def __init__(self, out_dir: Path, raw_path: Path, overwrite: bool) -> None:
+        self.out_dir = out_dir
+        self.raw_path = raw_path
+        self.mode = "wb" if overwrite else "xb"
+        self.files: Dict[str, BinaryIO] = {}
+
+    def write(self, output: ChunkOutput) -> None:
+        for stream, data in output.items():
+            fp = self.files.get(stream)
+            if fp is None:
+                fp = self.files[stream] = (self.out_dir / output_name(self.raw_path, stream)).open(self.mode)
+            fp.write(data)
+
+    def close(self) -> None:
+        for fp in self.files.values():
+            fp.close()
+
+
+class _Progress:
+    def __init__(self, total_bytes: Optional[int], interval_s: float = 2.0) -> None:
+        self.total_bytes = total_bytes
+        self.interval_s = interval_s
+        self.records = 0
+        self.bytes_read = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+
+    def advance(self, records: int, nbytes: int) -> None:
+        self.records += records
+        self.bytes_read += nbytes
+        now = time.monotonic()
+        if now - self._last_report >= self.interval_s:
+            self._last_report = now
+            self.report()
+
+    def report(self, final: bool = False) -> None:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        if self.total_bytes is None:
+            percent = ""
+        else:
+            percent = f"{100.0 * self.bytes_read / self.total_bytes if self.total_bytes else 100.0:.1f}%, "
+        print(
+            f"{'done' if final else 'progress'}: {self.records} records, {percent}"
+            f"{self.records / elapsed:.0f} records/s, {self.bytes_read / elapsed / 1e6:.1f} MB/s",
+            file=sys.stderr,
+        )
+
+
+def replay_files(
+    config: ReceiverConfig,
+    raw_paths: List[Path],
+    out_dir: Path,
+    workers: Optional[int] = None,
+    chunk_size: int = 2000,
+    overwrite: bool = False,
+    progress: bool = True,
+) -> Tuple[int, float]:
+    """Re-decode raw logs into out_dir; returns (records read, elapsed seconds).
+
+    At most `2 * workers` chunks are in flight and results are written in
+    input order, so memory stays bounded by the chunk size whatever the
+    file size.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = 2 * workers
+    # Sizes of compressed inputs say nothing about how much there is to decode.
+    total_bytes = None if any(map(is_compressed, raw_paths)) else sum(path.stat().st_size for path in raw_paths)
+    tracker = _Progress(total_bytes)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(replay_config(config), out_dir),
+    ) as pool:
+        for raw_path in raw_paths:
+            outputs = _Outputs(out_dir, raw_path, overwrite)
+            pending: Deque[Tuple[Future[ChunkOutput], int, int]] = deque()
+            try:
+                for chunk in iter_chunks(iter_raw_items(raw_path), chunk_size):
+                    if len(pending) >= max_in_flight:
+                        _collect(pending, outputs, tracker, progress)
+                    pending.append((pool.submit(decode_chunk, chunk), len(chunk), sum(map(_item_size, chunk))))
+                while pending:
+                    _collect(pending, outputs, tracker, progress)
+            finally:
+                outputs.close()
+
+    if progress:
+        tracker.report(final=True)
+    return tracker.records, time.monotonic() - tracker.started
+
+
+def _collect(
+    pending: Deque[Tuple[Future[ChunkOutput], int, int]],
+    outputs: _Outputs,
+    tracker: _Progress,
+    progress: bool,
+) -> None:
+    future, records, nbytes = pending.popleft()
+    outputs.write(future.result())
+    if progress:
+        tracker.advance(records, nbytes)
+    else:
+        tracker.records += records
+        tracker.bytes_read += nbytes
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Re-decode raw-*.jsonl logs with the keys from a receiver config")
+    parser.add_argument(
+        "raw_files", nargs="+", help="raw-YYYYMMDD*.jsonl[.gz|.xz]/.bin files, processed in the given order"
+    )
+    parser.add_argument("--config", required=True, help="Receiver config (keys, decoded_imeis)")
+    parser.add_argument("--out-dir", required=True, help="Where decoded-*/errors-* files are written")
+    parser.add_argument("--workers", type=int, default=None, help="Decode processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Raw records per work item")
+    parser.add_argument("--force", action="store_true", help="Overwrite existing output files")
+    parser.add_argument("--quiet", action="store_true", help="Do not report progress")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        print("--workers must be positive", file=sys.stderr)
+        return 2
+    if args.chunk_size < 1:
+        print("--chunk-size must be positive", file=sys.stderr)
+        return 2
+
+    try:
+        config = load_config(args.config)
+    except ValueError as exc:
+        print(f"config error: {exc}", file=sys.stderr)
+        return 2
+
+    try:
+        replay_files(
+            config,
+            [Path(path) for path in args.raw_files],
+            Path(args.out_dir),
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            overwrite=args.force,
+            progress=not args.quiet,
+        )
+    except FileExistsError as exc:
+        print(f"output exists (use --force): {exc.filename}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as exc:
+        print(f"replay error: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
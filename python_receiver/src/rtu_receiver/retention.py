@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .compression import SUFFIXES, compress_file
+from .config import RetentionConfig, load_config
+from .jsonl import parse_log_name
+
+_SECONDS_PER_DAY = 86400
+
+
+def _utc_day(ts: float) -> str:
+    return time.strftime("%Y%m%d", time.gmtime(ts))
+
+
+def _log_days(log_dir: Path) -> Dict[str, List[Path]]:
+    """Receiver log files and their `.idx` indexes, by UTC day."""
+    days: Dict[str, List[Path]] = {}
+    if not log_dir.is_dir():
+        return days
+    for path in log_dir.iterdir():
+        name = path.name[: -len(".idx")] if path.name.endswith(".idx") else path.name
+        parsed = parse_log_name(name)
+        if parsed is not None and path.is_file():
+            days.setdefault(parsed["day"], []).append(path)
+    return {day: sorted(paths) for day, paths in sorted(days.items())}
+
+
+def _idle(paths: List[Path], now: float, min_idle_s: float) -> bool:
+    return all(now - path.stat().st_mtime >= min_idle_s for path in paths)
+
+
+def maintain(log_dir: Path, config: RetentionConfig, now: Optional[float] = None) -> Dict[str, List[str]]:
+    """One maintenance pass over log_dir; returns the names compressed and deleted.
+
+    Only files of UTC days that ended at least `min_idle_s` ago and were not
+    modified for `min_idle_s` are touched. A writer closes the previous day's
+    files by then, as long as it flushes at least that often (load_config
+    requires it when records are buffered), so no buffered record is written
+    after its file was compressed. JSONL files are compressed; binary raw logs are
+    already compact and only subject to retention. Retention first drops
+    days older than `max_age_days`, then the oldest days until the directory
+    fits `max_total_bytes`; today's files are never deleted.
+    """
+    now = time.time() if now is None else now
+    # Days before this one ended at least min_idle_s ago.
+    settled = _utc_day(now - config.min_idle_s)
+    report: Dict[str, List[str]] = {"compressed": [], "deleted": []}
+
+    # Leftovers of a pass that was stopped mid-compression.
+    for suffix in SUFFIXES.values():
+        for tmp in log_dir.glob(f"*.jsonl{suffix}.tmp"):
+            tmp.unlink(missing_ok=True)
+
+    days = _log_days(log_dir)
+    if config.compress is not None:
+        for day, paths in days.items():
+            if day >= settled:
+                continue
+            for path in paths:
+                parsed = parse_log_name(path.name)
+                if parsed is None or parsed["ext"] != "jsonl" or parsed["compression"]:
+                    continue
+                if not _idle([path], now, config.min_idle_s):
+                    continue
+                compress_file(path, config.compress)
+                report["compressed"].append(path.name)
+        days = _log_days(log_dir)
+
+    finished = [day for day in days if day < settled and _idle(days[day], now, config.min_idle_s)]
+    doomed: List[str] = []
+    if config.max_age_days is not None:
+        cutoff = _utc_day(now - config.max_age_days * _SECONDS_PER_DAY)
+        doomed = [day for day in finished if day < cutoff]
+    if config.max_total_bytes is not None:
+        total = sum(path.stat().st_size for day in days if day not in doomed for path in days[day])
+        for day in finished:
+            if total <= config.max_total_bytes:
+                break
+            if day not in doomed:
+                doomed.append(day)
+                total -= sum(path.stat().st_size for path in days[day])
+
+    for day in doomed:
+        for path in days[day]:
+            path.unlink(missing_ok=True)
+            report["deleted"].append(path.name)
+    return report
+
+
+def _maintenance_main(log_dir: Path, config: RetentionConfig) -> None:
+    # Compression is CPU-bound; run it at the lowest priority so it only ever
+    # gets cycles the receiver does not want.
+    if hasattr(os, "nice"):
+        os.nice(19)
+    report = maintain(log_dir, config)
+    for name in report["compressed"]:
+        print(f"retention: compressed {name}", file=sys.stderr)
+    for name in report["deleted"]:
+        print(f"retention: deleted {name}", file=sys.stderr)
+
+
+class LogMaintenance:
+    """Runs `maintain` every `interval_s` from a background thread.
+
+    Each pass runs in its own spawned process at nice 19, so neither the CPU
+    time nor the GIL of compression is taken from the receive loop. Stopping
+    terminates a pass in progress; compression writes to a temporary file
+    until verified, so an interrupted pass loses nothing.
+    """
+
+    def __init__(self, log_dir: Path, config: RetentionConfig) -> None:
+        self.log_dir = log_dir
+        self.config = config
+        self.passes = 0
+        self.failures = 0
+        self._ctx = multiprocessing.get_context("spawn")
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._proc: Optional[BaseProcess] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> LogMaintenance:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._loop, name="rtu-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._lock:
+            if self._proc is not None and self._proc.is_alive():
+                self._proc.terminate()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run_once(self) -> bool:
+        """One pass in a child process; True if it succeeded."""
+        with self._lock:
+            if self._stop.is_set():
+                return False
+            self._proc = self._ctx.Process(
+                target=_maintenance_main,
+                args=(self.log_dir, self.config),
+                name="rtu-retention-pass",
+                daemon=True,
+            )
+            self._proc.start()
+        self._proc.join()
+        self.passes += 1
+        if self._proc.exitcode != 0:
+            self.failures += 1
+            if not self._stop.is_set():
+                print(f"retention: pass failed with exit code {self._proc.exitcode}", file=sys.stderr)
+            return False
+        return True
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.config.interval_s)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Compress finished log days and apply retention once")
+    parser.add_argument("--config", required=True, help="Receiver config (log_dir, retention)")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        config = load_config(args.config)
+    except ValueError as exc:
+        print(f"config error: {exc}", file=sys.stderr)
+        return 2
+    try:
+        _maintenance_main(config.log_dir, config.retention)
+    except (OSError, ValueError) as exc:
+        print(f"retention error: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .protocol import build_frame, build_plain_for_encrypt
+from .xtea import xtea_encrypt_ecb_le
+
+# Synthetic RTU102 traffic for benchmarks and load tests, built with the
+# same helpers a device simulator would use.
+
+IMEI = "863703030668235"
+KEY = bytes.fromhex("79757975797579756f706f706f706f70")
+# An IMEI whose little-endian bytes are all frame and escape bytes.
+ESCAPE_IMEI = str(int.from_bytes(bytes((0xC0, 0xC2, 0xC4, 0xC0, 0xC2, 0xC4, 0x00, 0x00)), "little"))
+
+# Telemetry (ID=9) params of the four pulse counters, 4 bytes LE each.
+COUNTER_PARAMS = (18, 19, 20, 21)
+# Event (ID=3) type_ids of the four counters.
+COUNTER_TYPES = (0, 1, 2, 3)
+
+_EVENT_HEADER = struct.Struct("<BIB")
+
+# (param_id or type_id, value)
+Item = Tuple[int, bytes]
+# (event_code, unix time, entries)
+EventSpec = Tuple[int, int, Sequence[Item]]
+
+
+def telemetry_payload(items: Sequence[Item] = ()) -> bytes:
+    """ID=9 payload; no items is the empty keep-alive telemetry."""
+    parts = [bytes((9, len(items)))]
+    for param_id, value in items:
+        parts.append(bytes((param_id, len(value))) + value)
+    return b"".join(parts)
+
+
+def counter_items(counters: Sequence[int], params: Sequence[int] = COUNTER_PARAMS) -> List[Item]:
+    return [(param_id, (value & 0xFFFFFFFF).to_bytes(4, "little")) for param_id, value in zip(params, counters)]
+
+
+def archive_payload(seq: int, events: Sequence[EventSpec]) -> bytes:
+    """ID=3 payload: archive seq, then events of (type_id, value) entries."""
+    parts = [bytes((3, seq & 0xFF))]
+    for code, event_time, entries in events:
+        data = b"".join(bytes((type_id,)) + value for type_id, value in entries)
+        parts.append(_EVENT_HEADER.pack(code, event_time, len(data)) + data)
+    return b"".join(parts)
+
+
+def hourly_counter_events(count: int, start_time: int, counters: Sequence[int], code: int = 1) -> List[EventSpec]:
+    """`count` hourly events logging all four counters, each a little higher than the last."""
+    return [
+        (
+            code,
+            start_time + hour * 3600,
+            counter_items([value + hour for value in counters], COUNTER_TYPES),
+        )
+        for hour in range(count)
+    ]
+
+
+def build_datagram(imei: str, key: bytes, payload: bytes) -> bytes:
+    return build_frame(imei, xtea_encrypt_ecb_le(build_plain_for_encrypt(payload), key))
+
+
+def _escape_count(datagram: bytes) -> int:
+    return sum(datagram.count(byte) for byte in (b"\xc4\xc1", b"\xc4\xc3", b"\xc4\xc4"))
+
+
+def escape_heavy_datagram(key: bytes = KEY, attempts: int = 512) -> bytes:
+    """Counter telemetry from ESCAPE_IMEI whose ciphertext needs the most stuffing of `attempts` tries."""
+    best: Optional[bytes] = None
+    for attempt in range(attempts):
+        datagram = build_datagram(ESCAPE_IMEI, key, telemetry_payload(counter_items([attempt, 0, 0, 0])))
+        if best is None or _escape_count(datagram) > _escape_count(best):
+            best = datagram
+    assert best is not None
+    return best
+
+
+def benchmark_cases(
+    imei: str = IMEI,
+    key: bytes = KEY,
+    archive_events: int = 24,
+) -> Dict[str, bytes]:
+    """Named datagrams covering the common, the large and the failing paths.
+
+    Valid cases decode with `key` for `imei` and ESCAPE_IMEI; `missing_key`
+    comes from an IMEI without a key.
+    """
+    counters = [1234567, 89012, 345, 6789012]
+    wrong_key = bytes(reversed(key))
+    telemetry = build_datagram(imei, key, telemetry_payload(counter_items(counters)))
+    return {
+        "telemetry_empty": build_datagram(imei, key, telemetry_payload()),
+        "telemetry_counters": telemetry,
+        f"archive_{archive_events}_events": build_datagram(
+            imei, key, archive_payload(7, hourly_counter_events(archive_events, 1735689600, counters))
+        ),
+        "escape_heavy": escape_heavy_datagram(key),
+        "invalid_boundaries": b"\x00" + telemetry[1:],
+        "invalid_crc": build_datagram(imei, wrong_key, telemetry_payload(counter_items(counters))),
+        "missing_key": build_datagram("1" + imei[1:], key, telemetry_payload()),
+    }
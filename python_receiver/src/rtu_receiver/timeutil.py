@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def iso_to_us(ts_utc: str) -> int:
+    """Unix microseconds of a `ts_utc` value; exact, unlike going through float seconds."""
+    return (datetime.fromisoformat(ts_utc) - _EPOCH) // _MICROSECOND
+
+
+def us_to_iso(ts_us: int) -> str:
+    return (_EPOCH + timedelta(microseconds=ts_us)).isoformat()
@@ -1,74 +1,640 @@
 from __future__ import annotations
 
+import dataclasses
+import selectors
 import socket
-from dataclasses import asdict
-from typing import Optional
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple, Union
 
 from .config import ReceiverConfig
+from .dedup import Deduplicator, datagram_digest
+from .downlink import Command, CommandStore, pack_payloads
 from .jsonl import JsonlWriter
-from .protocol import DecodeResult, ProtocolError, decode_datagram
+from .metrics import Histogram, MetricsRegistry, ReceiverMetrics
+from .profiling import SampledOutputs, StageClock, StageProfiler
+from .protocol import (
+    END_OF_REQUESTS,
+    TELEMETRY_ACK,
+    DecodeResult,
+    Envelope,
+    ProtocolError,
+    decode_envelope,
+    decode_envelope_staged,
+    decode_envelopes,
+    encode_datagram,
+)
+from .rawlog import RawRecord, file_header
+from .records import Archive, Telemetry
+from .timeutil import iso_to_us
+
+RAWLOG_HEADER = file_header()
+
+# (stream, record) pairs produced for one datagram, in write order. Records are
+# JSON dicts, except the raw record when it goes to the binary raw log.
+Outputs = List[Tuple[str, Any]]
+
+
+class DatagramSender(Protocol):
+    """What replies are sent through: a UDP socket or an asyncio datagram transport."""
+
+    def sendto(self, data: bytes, addr: Tuple[str, int]) -> Any: ...
+
+
+def iso_utc(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+def archive_ack(seq: int) -> bytes:
+    return bytes((4, seq))
+
+
+class Replies(list):
+    """Reply frames for one datagram, with the downlink commands they carry.
+
+    `resend` holds the frames to answer a retransmit of the datagram with:
+    the ACKs alone when commands went along, since those are one-off (a
+    time sync carries the time it was built at).
+    """
+
+    __slots__ = ("commands", "resend")
+
+    def __init__(
+        self,
+        frames: List[bytes],
+        commands: Optional[List[Command]] = None,
+        resend: Optional[List[bytes]] = None,
+    ) -> None:
+        super().__init__(frames)
+        self.commands = commands or []
+        self.resend: List[bytes] = self if resend is None else resend
+
+
+class AckResponder:
+    """Builds the replies a device expects for a decoded packet.
+
+    Telemetry (ID=9) is answered with an ID=9 ACK, optionally followed by the
+    end-of-requests command (ID=1, param 55) so the modem can sleep early;
+    every archive packet (ID=3) gets an ID=4 ACK with its seq. Encrypted
+    frames are cached per IMEI and payload, so a repeated ACK is a dict hit.
+
+    With a downlink store, commands queued for the device follow the
+    telemetry ACK, packed into as few frames as possible and closed with the
+    end-of-requests command, and ID=2/ID=7 responses are matched back to them.
+    """
+
+    def __init__(
+        self,
+        end_session: bool = False,
+        max_entries: int = 65536,
+        downlink: Optional[CommandStore] = None,
+        max_payload: int = 256,
+        latency: Optional[Histogram] = None,
+    ) -> None:
+        self.end_session = end_session
+        self.max_entries = max_entries
+        self.downlink = downlink
+        self.max_payload = max_payload
+        # Observes the latency of every reply, e.g. ReceiverMetrics.ack_seconds.
+        self.latency = latency
+        self._frames: OrderedDict[Tuple[str, bytes], Tuple[bytes, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Replies are sent from several decode threads in the pipeline and asyncio engines.
+        self._stats_lock = threading.Lock()
+        # Frames sent, and replies (all frames answering one datagram) sent in full.
+        self.sent = 0
+        self.replies_sent = 0
+        self.send_errors = 0
+        self.latency_total_s = 0.0
+        self.latency_max_s = 0.0
+
+    def payloads(self, envelope: Envelope) -> List[bytes]:
+        payloads: List[bytes] = []
+        for record in envelope.records:
+            if isinstance(record, Telemetry):
+                payloads.append(TELEMETRY_ACK)
+                if self.end_session:
+                    payloads.append(END_OF_REQUESTS)
+            elif isinstance(record, Archive):
+                payloads.append(archive_ack(record.seq))
+        return payloads
+
+    def replies(self, envelope: Envelope, key_resolver: Callable[[str], Optional[bytes]]) -> Replies:
+        """Encrypted frames to send back for envelope, in send order.
+
+        key_resolver comes with each call, from the config the envelope was
+        decoded with, so a reload cannot pair the old key with the new config.
+        Commands are only taken from the downlink store once there is a key
+        to send them with.
+        """
+        imei = envelope.imei
+        records = envelope.records
+        if self.downlink is not None:
+            self.downlink.record_responses(imei, records)
+        # Telemetry always gets an ACK, so no payloads also means no commands.
+        payloads = self.payloads(envelope)
+        if not payloads:
+            return Replies([])
+        key = key_resolver(imei)
+        if key is None:
+            return Replies([])
+        frames = [self.frame(imei, payload, key) for payload in payloads]
+
+        due: List[Command] = []
+        if self.downlink is not None and any(isinstance(record, Telemetry) for record in records):
+            due = self.downlink.take_due(imei)
+        if not due:
+            return Replies(frames)
+        # The command frames already end with the end-of-requests command.
+        acks = [frame for payload, frame in zip(payloads, frames) if payload != END_OF_REQUESTS]
+        # Command frames are one-off, so they bypass the frame cache.
+        commands = [
+            encode_datagram(imei, payload, key) for payload in pack_payloads(due, time.time(), self.max_payload)
+        ]
+        return Replies(acks + commands, due, resend=frames)
+
+    def frame(self, imei: str, payload: bytes, key: bytes) -> bytes:
+        cache_key = (imei, payload)
+        with self._lock:
+            cached = self._frames.get(cache_key)
+            if cached is not None and cached[0] == key:
+                self._frames.move_to_end(cache_key)
+                return cached[1]
+
+        frame = encode_datagram(imei, payload, key)
+        with self._lock:
+            self._frames[cache_key] = (key, frame)
+            self._frames.move_to_end(cache_key)
+            while len(self._frames) > self.max_entries:
+                self._frames.popitem(last=False)
+        return frame
+
+    def send(self, sock: DatagramSender, frames: List[bytes], addr: Tuple[str, int], started: float) -> None:
+        """Send frames to addr; latency is measured from `started` (a perf_counter value).
+
+        If a frame cannot be sent, the downlink commands among Replies are
+        given back to the store, even those whose frame went out before.
+        """
+        sent = 0
+        for frame in frames:
+            try:
+                sock.sendto(frame, addr)
+            except OSError as exc:
+                with self._stats_lock:
+                    self.sent += sent
+                    self.send_errors += 1
+                print(f"ack send error to {addr[0]}:{addr[1]}: {exc}", file=sys.stderr)
+                if isinstance(frames, Replies) and frames.commands and self.downlink is not None:
+                    self.downlink.release(frames.commands)
+                return
+            sent += 1
+        latency = time.perf_counter() - started
+        with self._stats_lock:
+            self.sent += sent
+            self.replies_sent += 1
+            self.latency_total_s += latency
+            if latency > self.latency_max_s:
+                self.latency_max_s = latency
+        if self.latency is not None:
+            self.latency.observe(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "sent": self.sent,
+                "replies": self.replies_sent,
+                "send_errors": self.send_errors,
+                "cached_frames": len(self._frames),
+                "latency_avg_us": round(self.latency_total_s / (self.replies_sent or 1) * 1e6, 1),
+                "latency_max_us": round(self.latency_max_s * 1e6, 1),
+            }
 
 
 class UdpReceiverServer:
-    def __init__(self, config: ReceiverConfig, writer: JsonlWriter, log_level: str = "info") -> None:
+    def __init__(
+        self,
+        config: ReceiverConfig,
+        writer: JsonlWriter,
+        log_level: str = "info",
+        reuse_port: bool = False,
+    ) -> None:
         self.config = config
         self.writer = writer
         self.log_level = log_level
+        self.reuse_port = reuse_port
+        self.rcvbuf_granted: Optional[int] = None
+        self.binary_raw = config.writer.raw_format == "binary"
+        dedup = config.dedup
+        self.dedup: Optional[Deduplicator] = (
+            Deduplicator(ttl_s=dedup.ttl_s, max_entries=dedup.max_entries) if dedup.enabled else None
+        )
+        # Like the profiler, None when disabled: no metric is updated at all.
+        self.metrics: Optional[ReceiverMetrics] = ReceiverMetrics() if config.metrics.enabled else None
+        ack = config.ack
+        downlink = config.downlink
+        self.downlink: Optional[CommandStore] = (
+            CommandStore(downlink.db_path, retry_after_s=downlink.retry_after_s, max_attempts=downlink.max_attempts)
+            if downlink.enabled
+            else None
+        )
+        self.responder: Optional[AckResponder] = (
+            AckResponder(
+                end_session=ack.end_session,
+                max_entries=ack.cache_entries,
+                downlink=self.downlink,
+                max_payload=downlink.max_payload,
+                latency=self.metrics.ack_seconds if self.metrics is not None else None,
+            )
+            if ack.enabled
+            else None
+        )
+        # Set by open_socket; replies are sent from the receiving socket.
+        self.sock: Optional[socket.socket] = None
+        profiling = config.profiling
+        # None keeps the unsampled path to a single attribute check.
+        self.profiler: Optional[StageProfiler] = (
+            StageProfiler(profiling.sample_every, profiling.window, profiling.summary_interval_s)
+            if profiling.enabled
+            else None
+        )
+        if self.metrics is not None:
+            self.register_metrics(self.metrics.registry)
 
-    def run(self, once: bool = False) -> None:
-        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+    def open_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            if self.reuse_port:
+                if not hasattr(socket, "SO_REUSEPORT"):
+                    raise OSError("SO_REUSEPORT is not supported on this platform")
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            requested = self.config.socket.rcvbuf
+            if requested is not None:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, requested)
             sock.bind((self.config.listen_host, self.config.listen_port))
+        except OSError:
+            sock.close()
+            raise
+
+        self.sock = sock
+        self.rcvbuf_granted = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        if requested is not None:
+            # Linux reports double the requested size and caps it at net.core.rmem_max.
+            print(f"SO_RCVBUF requested={requested} granted={self.rcvbuf_granted}", file=sys.stderr)
+        if self.log_level == "debug":
+            print(f"listening on udp://{self.config.listen_host}:{self.config.listen_port}")
+        return sock
+
+    def apply_config(self, config: ReceiverConfig) -> None:
+        """Switch to a reloaded config; the caller has checked which fields may change (see reload.py).
+
+        Datagrams already being processed finish against the config they
+        started with. The socket, writer and caches are kept. Keys and the
+        settings they are used with live in the one config object, so a
+        single assignment switches all of them.
+        """
+        self.config = config
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "dedup": self.dedup.stats() if self.dedup is not None else None,
+            "ack": self.responder.stats() if self.responder is not None else None,
+        }
+
+    def register_metrics(self, registry: MetricsRegistry) -> None:
+        """Expose state owned by other components; read only when scraped."""
+        registry.value_of(
+            "rtu_writer_pending_records",
+            "Records written but not yet flushed",
+            "gauge",
+            lambda: self.writer.pending_records,
+        )
+        dedup = self.dedup
+        if dedup is not None:
+            registry.collect(
+                "rtu_dedup_entries",
+                "Keys held by the duplicate caches",
+                "gauge",
+                lambda: [
+                    ("rtu_dedup_entries", {"cache": "datagrams"}, len(dedup.datagrams)),
+                    ("rtu_dedup_entries", {"cache": "archives"}, len(dedup.archives)),
+                ],
+            )
+            caches = {"datagrams": dedup.datagrams, "archives": dedup.archives}
+            registry.collect(
+                "rtu_dedup_lookups_total",
+                "Duplicate cache lookups by result (hit: a retransmit)",
+                "counter",
+                lambda: [
+                    ("rtu_dedup_lookups_total", {"cache": name, "result": result}, count)
+                    for name, cache in caches.items()
+                    for result, count in (("hit", cache.hits), ("miss", cache.misses))
+                ],
+            )
+            registry.collect(
+                "rtu_dedup_evicted_total",
+                "Keys evicted from a full duplicate cache before their TTL",
+                "counter",
+                lambda: [("rtu_dedup_evicted_total", {"cache": name}, cache.evicted) for name, cache in caches.items()],
+            )
+        responder = self.responder
+        if responder is not None:
+            registry.value_of("rtu_replies_sent_total", "Reply frames sent", "counter", lambda: responder.sent)
+            registry.value_of(
+                "rtu_reply_send_errors_total",
+                "Reply frames that failed to send",
+                "counter",
+                lambda: responder.send_errors,
+            )
+
+    def run(self, once: bool = False) -> None:
+        with self.open_socket() as sock:
             if once:
                 sock.settimeout(5.0)
-            if self.log_level == "debug":
-                print(f"listening on udp://{self.config.listen_host}:{self.config.listen_port}")
-
-            while True:
-                try:
-                    datagram, (src_ip, src_port) = sock.recvfrom(65535)
-                except socket.timeout:
-                    raise TimeoutError("timeout waiting for UDP datagram")
-                self.handle_datagram(datagram, src_ip, src_port)
-                if once:
-                    break
+            elif self.writer.flush_interval_s is not None:
+                # Wake up while idle so buffered records do not sit unflushed.
+                sock.settimeout(self.writer.flush_interval_s)
 
-    def handle_datagram(self, datagram: bytes, src_ip: str, src_port: int) -> None:
-        ts = self.writer.utc_now_iso()
-        datagram_hex = datagram.hex()
+            try:
+                while True:
+                    try:
+                        datagram, (src_ip, src_port) = sock.recvfrom(65535)
+                    except socket.timeout:
+                        if once:
+                            raise TimeoutError("timeout waiting for UDP datagram")
+                        self.writer.flush()
+                        continue
+                    self.handle_datagram(datagram, src_ip, src_port)
+                    if once:
+                        break
+            finally:
+                self.print_stats()
 
-        self.writer.write_raw(
-            {
-                "ts_utc": ts,
-                "src_ip": src_ip,
-                "src_port": src_port,
-                "len": len(datagram),
-                "datagram_hex": datagram_hex,
-            }
-        )
+    def print_stats(self) -> None:
+        if self.log_level == "debug":
+            print(f"receiver stats: {self.stats()}", file=sys.stderr)
+
+    def handle_datagram(self, datagram: bytes, src_ip: str, src_port: int) -> None:
+        self.emit(self.process_datagram(datagram, src_ip, src_port))
 
-        if not self.config.decode_enabled:
+    def emit(self, outputs: Outputs) -> None:
+        if self.profiler is not None and isinstance(outputs, SampledOutputs):
+            self._emit_sampled(outputs, self.profiler)
             return
+        writer = self.writer
+        for stream, record in outputs:
+            if isinstance(record, RawRecord):
+                writer.write_binary(stream, record.encode(), RAWLOG_HEADER)
+            else:
+                writer.write(stream, record)
+
+    def _emit_sampled(self, outputs: SampledOutputs, profiler: StageProfiler) -> None:
+        clock = outputs.clock
+        # Time between record building and the writer getting them: the queue
+        # wait of the pipeline and asyncio engines, next to nothing otherwise.
+        clock.mark("queue")
+        writer = self.writer
+        for stream, record in outputs:
+            if isinstance(record, RawRecord):
+                writer.write_binary(stream, record.encode(), RAWLOG_HEADER)
+            else:
+                writer.write(stream, record)
+        clock.mark("write")
+        profiler.record(clock)
+        if profiler.summary_due():
+            summary = profiler.summary(writer.utc_now_iso())
+            if self.dedup is not None:
+                summary["dedup"] = self.dedup.stats()
+            writer.write("perf", summary)
 
+    def process_datagram(
+        self,
+        datagram: bytes,
+        src_ip: str,
+        src_port: int,
+        ts: Optional[str] = None,
+    ) -> Outputs:
+        """Decode one datagram into the records to log, without touching the writer.
+
+        With the ACK responder enabled, replies are sent from here, before
+        any record is built. Datagrams sampled by the profiler are timed
+        stage by stage and come back as SampledOutputs for `emit` to finish.
+        """
+        if self.profiler is not None:
+            clock = self.profiler.sample()
+            if clock is not None:
+                return self._process_sampled(datagram, src_ip, src_port, ts, clock)
+        started = time.perf_counter()
+        if ts is None:
+            ts = self.writer.utc_now_iso()
+        # One snapshot per datagram: a reload swaps self.config, never mutates it.
+        config = self.config
+        digest: Optional[bytes] = None
+        if self.dedup is not None:
+            digest = datagram_digest(datagram)
+            if self.dedup.datagrams.seen(digest):
+                self.resend(digest, src_ip, src_port, started)
+                return self.build_outputs(datagram, src_ip, src_port, ts, None, config, duplicate="datagram")
+        if not config.decode_enabled:
+            return self.build_outputs(datagram, src_ip, src_port, ts, None, config)
+        metrics = self.metrics
         try:
-            result = decode_datagram(datagram, self.config.keys.resolve_key)
-            self._write_decoded(ts, src_ip, src_port, result)
-            self._write_nonfatal_errors(ts, src_ip, src_port, datagram_hex, result)
+            result: Union[Envelope, ProtocolError] = decode_envelope(
+                datagram, config.keys.resolve_key, observer=metrics
+            )
         except ProtocolError as exc:
-            self.writer.write_error(
-                {
-                    "ts_utc": ts,
-                    "src_ip": src_ip,
-                    "src_port": src_port,
-                    "stage": exc.stage,
-                    "reason": exc.reason,
-                    "imei": exc.imei,
-                    "datagram_hex": datagram_hex,
-                    "details": exc.details,
-                }
+            result = exc
+        self.respond(result, config, digest, src_ip, src_port, started)
+        outputs = self.build_outputs(datagram, src_ip, src_port, ts, result, config)
+        if metrics is not None:
+            metrics.decode_seconds.observe(time.perf_counter() - started)
+        return outputs
+
+    def _process_sampled(
+        self,
+        datagram: bytes,
+        src_ip: str,
+        src_port: int,
+        ts: Optional[str],
+        clock: StageClock,
+    ) -> SampledOutputs:
+        """process_datagram with a clock mark after each stage."""
+        started = time.perf_counter()
+        if ts is None:
+            ts = self.writer.utc_now_iso()
+        config = self.config
+        digest: Optional[bytes] = None
+        if self.dedup is not None:
+            digest = datagram_digest(datagram)
+            seen = self.dedup.datagrams.seen(digest)
+            clock.mark("dedup")
+            if seen:
+                self.resend(digest, src_ip, src_port, started)
+                clock.mark("ack")
+                outputs = self.build_outputs(datagram, src_ip, src_port, ts, None, config, duplicate="datagram")
+                clock.mark("records")
+                return SampledOutputs(outputs, clock)
+        if not config.decode_enabled:
+            outputs = self.build_outputs(datagram, src_ip, src_port, ts, None, config)
+            clock.mark("records")
+            return SampledOutputs(outputs, clock)
+        metrics = self.metrics
+        try:
+            result: Union[Envelope, ProtocolError] = decode_envelope_staged(
+                datagram, config.keys.resolve_key, clock, observer=metrics
             )
+        except ProtocolError as exc:
+            result = exc
+        self.respond(result, config, digest, src_ip, src_port, started)
+        clock.mark("ack")
+        if isinstance(result, Envelope) and self.decoded_stream_enabled(result.imei, config):
+            # Parse here rather than inside build_outputs so it gets its own stage.
+            result.parsed
+            clock.mark("parse")
+        outputs = self.build_outputs(datagram, src_ip, src_port, ts, result, config)
+        clock.mark("records")
+        if metrics is not None:
+            metrics.decode_seconds.observe(time.perf_counter() - started)
+        return SampledOutputs(outputs, clock)
 
-    def _write_decoded(self, ts: str, src_ip: str, src_port: int, result: DecodeResult) -> None:
-        payload = asdict(result)
+    def resend(self, digest: bytes, src_ip: str, src_port: int, started: float) -> None:
+        """Answer a retransmitted datagram with the replies sent for the original."""
+        if self.responder is None or self.sock is None or self.dedup is None:
+            return
+        frames = self.dedup.datagrams.get(digest)
+        if frames:
+            self.send_replies(frames, (src_ip, src_port), started)
+
+    def respond(
+        self,
+        result: Union[Envelope, ProtocolError, None],
+        config: ReceiverConfig,
+        digest: Optional[bytes],
+        src_ip: str,
+        src_port: int,
+        started: float,
+    ) -> None:
+        """Send the replies to a decoded datagram and cache them under its digest.
+
+        A datagram that failed to decode is dropped from the dedup cache: its
+        retransmit may well decode, e.g. once the device's key was added.
+        """
+        if isinstance(result, ProtocolError):
+            if digest is not None and self.dedup is not None:
+                self.dedup.datagrams.discard(digest)
+            return
+        if self.responder is None or self.sock is None or not isinstance(result, Envelope):
+            return
+        frames = self.responder.replies(result, config.keys.resolve_key)
+        if digest is not None and self.dedup is not None:
+            self.dedup.datagrams.set(digest, frames.resend)
+        if frames:
+            self.send_replies(frames, (src_ip, src_port), started)
+
+    def send_replies(self, frames: List[bytes], addr: Tuple[str, int], started: float) -> None:
+        """Send reply frames from the receiving socket, on the calling thread."""
+        assert self.responder is not None and self.sock is not None
+        self.responder.send(self.sock, frames, addr, started)
+
+    @staticmethod
+    def decoded_stream_enabled(imei: str, config: ReceiverConfig) -> bool:
+        decoded_imeis = config.decoded_imeis
+        return decoded_imeis is None or imei in decoded_imeis
+
+    def build_outputs(
+        self,
+        datagram: bytes | memoryview,
+        src_ip: str,
+        src_port: int,
+        ts: str,
+        result: Union[Envelope, DecodeResult, ProtocolError, None],
+        config: ReceiverConfig,
+        duplicate: Optional[str] = None,
+    ) -> Outputs:
+        """Records to log for one datagram given its decode outcome (None when decoding is off).
+
+        config is the snapshot the datagram was decoded with.
+
+        An Envelope's payload is only parsed when the decoded stream is
+        enabled for its IMEI. Archive records already seen are left out of
+        the decoded record; a datagram with nothing else, like any duplicate,
+        only gets its raw record, marked with `duplicate` ("datagram" or
+        "archive_seq"). With `writer.raw_format="binary"` the raw record is
+        a RawRecord.
+        """
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.datagrams.inc()
+            metrics.datagram_bytes.inc(len(datagram))
+        outputs: Outputs = []
+        datagram_hex: Optional[str] = None
+        if isinstance(result, ProtocolError):
+            if metrics is not None:
+                metrics.errors.labels(result.stage, result.reason).inc()
+            datagram_hex = datagram.hex()
+            outputs.append(
+                (
+                    "errors",
+                    {
+                        "ts_utc": ts,
+                        "src_ip": src_ip,
+                        "src_port": src_port,
+                        "stage": result.stage,
+                        "reason": result.reason,
+                        "imei": result.imei,
+                        "datagram_hex": datagram_hex,
+                        "details": result.details,
+                    },
+                )
+            )
+        elif result is not None:
+            if metrics is not None:
+                metrics.decoded.inc()
+            if self.decoded_stream_enabled(result.imei, config):
+                records = result.records
+                fresh = records if self.dedup is None else self.dedup.fresh_records(result.imei, records)
+                if fresh is not records and metrics is not None:
+                    metrics.duplicates.labels("archive_seq").inc(len(records) - len(fresh))
+                if records and not fresh:
+                    duplicate = "archive_seq"
+                else:
+                    if isinstance(result, Envelope):
+                        result = result.to_result()
+                    if fresh is not records:
+                        # Telemetry sent along with a resent archive is still new.
+                        result = dataclasses.replace(result, records=fresh)
+                    outputs.append(self._decoded_record(ts, src_ip, src_port, result))
+                    if result.nonfatal_errors:
+                        datagram_hex = datagram.hex()
+                        errors = self._nonfatal_error_records(ts, src_ip, src_port, datagram_hex, result)
+                        if metrics is not None:
+                            for _, error in errors:
+                                metrics.errors.labels(error["stage"], error["reason"]).inc()
+                        outputs.extend(errors)
+
+        if duplicate == "datagram" and metrics is not None:
+            metrics.duplicates.labels(duplicate).inc()
+
+        if self.binary_raw:
+            outputs.insert(0, ("raw", RawRecord(iso_to_us(ts), src_ip, src_port, bytes(datagram), duplicate)))
+            return outputs
+
+        raw: Dict[str, Any] = {
+            "ts_utc": ts,
+            "src_ip": src_ip,
+            "src_port": src_port,
+            "len": len(datagram),
+            "datagram_hex": datagram_hex if datagram_hex is not None else datagram.hex(),
+        }
+        if duplicate is not None:
+            raw["duplicate"] = duplicate
+        outputs.insert(0, ("raw", raw))
+        return outputs
+
+    def _decoded_record(self, ts: str, src_ip: str, src_port: int, result: DecodeResult) -> Tuple[str, Dict[str, Any]]:
+        payload = result.to_json_dict()
         payload.update(
             {
                 "ts_utc": ts,
@@ -76,18 +642,19 @@ class UdpReceiverServer:
                 "src_port": src_port,
             }
         )
-        self.writer.write_decoded(payload)
+        return "decoded", payload
 
-    def _write_nonfatal_errors(
+    def _nonfatal_error_records(
         self,
         ts: str,
         src_ip: str,
         src_port: int,
         datagram_hex: str,
         result: DecodeResult,
-    ) -> None:
-        for err in result.nonfatal_errors:
-            self.writer.write_error(
+    ) -> Outputs:
+        return [
+            (
+                "errors",
                 {
                     "ts_utc": ts,
                     "src_ip": src_ip,
@@ -97,5 +664,105 @@ class UdpReceiverServer:
                     "imei": result.imei,
                     "datagram_hex": datagram_hex,
                     "details": err.get("details", {}),
-                }
+                },
+            )
+            for err in result.nonfatal_errors
+        ]
+
+
+class BatchedUdpReceiverServer(UdpReceiverServer):
+    """Receiver that drains every pending datagram per wakeup into preallocated buffers.
+
+    Datagrams are read with `recvfrom_into` into a fixed pool of
+    `socket.batch_size` buffers and decoded together through
+    `decode_datagrams` as memoryviews of that pool. Datagrams sampled by the
+    profiler are taken out of the batch and decoded on their own, stage by
+    stage, in their place in the batch.
+    """
+
+    def run(self, once: bool = False) -> None:
+        views = [memoryview(bytearray(65535)) for _ in range(self.config.socket.batch_size)]
+        with self.open_socket() as sock, selectors.DefaultSelector() as selector:
+            sock.setblocking(False)
+            selector.register(sock, selectors.EVENT_READ)
+            timeout = 5.0 if once else self.writer.flush_interval_s
+
+            try:
+                while True:
+                    if not selector.select(timeout):
+                        if once:
+                            raise TimeoutError("timeout waiting for UDP datagram")
+                        self.writer.flush()
+                        continue
+                    batch = self._drain(sock, views)
+                    if batch:
+                        self.handle_batch(batch)
+                        if once:
+                            break
+            finally:
+                self.print_stats()
+
+    @staticmethod
+    def _drain(sock: socket.socket, views: List[memoryview]) -> List[Tuple[memoryview, str, int]]:
+        batch = []
+        for view in views:
+            try:
+                nbytes, (src_ip, src_port) = sock.recvfrom_into(view)
+            except BlockingIOError:
+                break
+            batch.append((view[:nbytes], src_ip, src_port))
+        return batch
+
+    def handle_batch(self, batch: List[Tuple[memoryview, str, int]]) -> None:
+        """Decode and write a drained batch; views must not be used after this returns."""
+        profiler = self.profiler
+        if profiler is not None:
+            start = 0
+            for index, (view, src_ip, src_port) in enumerate(batch):
+                clock = profiler.sample()
+                if clock is None:
+                    continue
+                # Whatever came before goes first, so records stay in arrival order.
+                if start < index:
+                    self._handle_run(batch[start:index])
+                self.emit(self._process_sampled(bytes(view), src_ip, src_port, None, clock))
+                start = index + 1
+            batch = batch[start:]
+        if batch:
+            self._handle_run(batch)
+
+    def _handle_run(self, batch: List[Tuple[memoryview, str, int]]) -> None:
+        started = time.perf_counter()
+        ts = self.writer.utc_now_iso()
+        digests: List[Optional[bytes]] = [None] * len(batch)
+        duplicates = [False] * len(batch)
+        if self.dedup is not None:
+            for index, (view, _, _) in enumerate(batch):
+                digest = digests[index] = datagram_digest(view)
+                duplicates[index] = self.dedup.datagrams.seen(digest)
+
+        results: List[Union[Envelope, ProtocolError, None]] = [None] * len(batch)
+        config = self.config
+        if config.decode_enabled:
+            fresh = [index for index, duplicate in enumerate(duplicates) if not duplicate]
+            decoded = decode_envelopes(
+                [batch[index][0] for index in fresh], config.keys.resolve_key, observer=self.metrics
             )
+            for index, result in zip(fresh, decoded):
+                results[index] = result
+                self.respond(result, config, digests[index], batch[index][1], batch[index][2], started)
+        # After respond(), so a retransmit of a datagram earlier in this batch finds its replies.
+        for index, duplicate in enumerate(duplicates):
+            if duplicate:
+                self.resend(digests[index], batch[index][1], batch[index][2], started)  # type: ignore[arg-type]
+
+        outputs = [
+            self.build_outputs(view, src_ip, src_port, ts, result, config, duplicate="datagram" if duplicate else None)
+            for (view, src_ip, src_port), result, duplicate in zip(batch, results, duplicates)
+        ]
+        if self.metrics is not None:
+            mean_s = (time.perf_counter() - started) / len(batch)
+            for _ in outputs:
+                self.metrics.decode_seconds.observe(mean_s)
+        for item_outputs in outputs:
+            self.emit(item_outputs)
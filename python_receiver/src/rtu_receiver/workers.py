@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from multiprocessing.connection import wait
+from multiprocessing.process import BaseProcess
+from typing import Callable, Dict, List
+
+from .config import ReceiverConfig
+
+# Called in each worker process with (config, worker_index); returns an exit code.
+WorkerTarget = Callable[[ReceiverConfig, int], int]
+
+
+def worker_shard(index: int) -> str:
+    return f"w{index}"
+
+
+def _worker_main(target: WorkerTarget, config: ReceiverConfig, index: int) -> None:
+    # The supervisor stops workers with SIGTERM; turn it into a normal exit so
+    # buffered JSONL records are flushed by the writer's context manager.
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # SIGHUP is forwarded by the supervisor to reload the config; it must not
+    # kill a worker that has not installed its reload handler (yet).
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    try:
+        code = target(config, index)
+    except KeyboardInterrupt:
+        code = 0
+    sys.exit(code)
+
+
+def _exit_on_signal(signum: int, frame: object) -> None:
+    raise SystemExit(0)
+
+
+class WorkerPool:
+    """Supervises N receiver processes sharing one UDP port via SO_REUSEPORT.
+
+    A worker that exits unexpectedly is restarted; a worker that keeps dying
+    right after start is restarted with exponential backoff. With
+    `reload.enabled`, SIGHUP is passed on to every worker.
+
+    Workers are spawned, not forked: the supervisor runs threads (log
+    maintenance) and a fork would copy their locks into the worker in
+    whatever state they were. The config is pickled across; key stores
+    reopen their file in the worker.
+    """
+
+    def __init__(
+        self,
+        config: ReceiverConfig,
+        workers: int,
+        target: WorkerTarget,
+        log_level: str = "info",
+        restart_delay_s: float = 1.0,
+        max_restart_delay_s: float = 30.0,
+        stable_after_s: float = 10.0,
+    ) -> None:
+        if workers <= 0:
+            raise ValueError("workers must be positive")
+        self.config = config
+        self.workers = workers
+        self.target = target
+        self.log_level = log_level
+        self.restart_delay_s = restart_delay_s
+        self.max_restart_delay_s = max_restart_delay_s
+        self.stable_after_s = stable_after_s
+        self.restarts = 0
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._procs: Dict[int, BaseProcess] = {}
+        self._started_at: Dict[int, float] = {}
+        self._delays: Dict[int, float] = {}
+        self._stopping = False
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    def run(self) -> int:
+        previous = {sig: signal.signal(sig, self._on_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+        if self.config.reload.enabled and hasattr(signal, "SIGHUP"):
+            previous[signal.SIGHUP] = signal.signal(signal.SIGHUP, self._forward_signal)
+        try:
+            for index in range(self.workers):
+                self._spawn(index)
+            while not self._stopping:
+                self._reap(wait([proc.sentinel for proc in self._procs.values()], timeout=1.0))
+        finally:
+            self._terminate_all()
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        return 0
+
+    def _on_signal(self, signum: int, frame: object) -> None:
+        self._stopping = True
+
+    def _forward_signal(self, signum: int, frame: object) -> None:
+        for proc in self._procs.values():
+            if proc.pid is not None and proc.is_alive():
+                os.kill(proc.pid, signum)
+
+    def _spawn(self, index: int) -> None:
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(self.target, self.config, index),
+            name=f"rtu-worker-{index}",
+            daemon=False,
+        )
+        proc.start()
+        self._procs[index] = proc
+        self._started_at[index] = time.monotonic()
+        if self.log_level == "debug":
+            print(f"worker {index} started pid={proc.pid}")
+
+    def _reap(self, ready: List[object]) -> None:
+        if not ready or self._stopping:
+            return
+        for index, proc in list(self._procs.items()):
+            if proc.sentinel not in ready:
+                continue
+            proc.join()
+            print(f"worker {index} pid={proc.pid} exited with code {proc.exitcode}, restarting", file=sys.stderr)
+
+            lived = time.monotonic() - self._started_at[index]
+            if lived >= self.stable_after_s:
+                delay = self.restart_delay_s
+            else:
+                delay = min(self._delays.get(index, self.restart_delay_s / 2) * 2, self.max_restart_delay_s)
+            self._delays[index] = delay
+            time.sleep(delay)
+            if self._stopping:
+                return
+            self.restarts += 1
+            self._spawn(index)
+
+    def _terminate_all(self) -> None:
+        for proc in self._procs.values():
+            if proc.is_alive():
+                proc.terminate()
+        for proc in self._procs.values():
+            proc.join(timeout=10)
+            if proc.is_alive():
+                proc.kill()
+                proc.join()
+        self._procs.clear()
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
 import struct
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .crc16 import Crc16
 
 _DELTA = 0x9E3779B9
 _MASK32 = 0xFFFFFFFF
 
+_BLOCK = struct.Struct("<2I")
+
 
 def _key_to_words_le(key: bytes) -> tuple[int, int, int, int]:
     if len(key) != 16:
@@ -12,59 +19,170 @@ def _key_to_words_le(key: bytes) -> tuple[int, int, int, int]:
     return struct.unpack("<4I", key)
 
 
+class XteaCipher:
+    """XTEA-ECB (LE words) bound to one 16-byte key.
+
+    The per-round `sum + key[idx]` constants are computed once here, so
+    decrypting a datagram only runs the Feistel arithmetic.
+    """
+
+    __slots__ = ("key", "rounds", "_enc_schedule", "_dec_schedule")
+
+    def __init__(self, key16: bytes, rounds: int = 32) -> None:
+        if rounds <= 0:
+            raise ValueError("rounds must be positive")
+        key_words = _key_to_words_le(key16)
+        self.key = bytes(key16)
+        self.rounds = rounds
+
+        enc_schedule = []
+        summation = 0
+        for _ in range(rounds):
+            first = (summation + key_words[summation & 3]) & _MASK32
+            summation = (summation + _DELTA) & _MASK32
+            second = (summation + key_words[(summation >> 11) & 3]) & _MASK32
+            enc_schedule.append((first, second))
+        self._enc_schedule = tuple(enc_schedule)
+
+        dec_schedule = []
+        summation = (_DELTA * rounds) & _MASK32
+        for _ in range(rounds):
+            first = (summation + key_words[(summation >> 11) & 3]) & _MASK32
+            summation = (summation - _DELTA) & _MASK32
+            second = (summation + key_words[summation & 3]) & _MASK32
+            dec_schedule.append((first, second))
+        self._dec_schedule = tuple(dec_schedule)
+
+    def decrypt(self, ciphertext: bytes) -> bytes:
+        if not ciphertext or len(ciphertext) % 8 != 0:
+            raise ValueError("ciphertext length must be positive and divisible by 8")
+
+        schedule = self._dec_schedule
+        pack_into = _BLOCK.pack_into
+        out = bytearray(len(ciphertext))
+        offset = 0
+        for v0, v1 in _BLOCK.iter_unpack(ciphertext):
+            for first, second in schedule:
+                v1 = (v1 - ((((v0 << 4) ^ (v0 >> 5)) + v0) ^ first)) & _MASK32
+                v0 = (v0 - ((((v1 << 4) ^ (v1 >> 5)) + v1) ^ second)) & _MASK32
+            pack_into(out, offset, v0, v1)
+            offset += 8
+        return bytes(out)
+
+    def decrypt_with_crc(self, ciphertext: bytes) -> Tuple[bytes, int]:
+        """decrypt, plus the CRC16-CCITT-FALSE of the plaintext without its last two bytes.
+
+        Each block is fed to the checksum as it is decrypted, so the plaintext
+        is not walked a second time to verify the CRC it ends with.
+        """
+        if not ciphertext or len(ciphertext) % 8 != 0:
+            raise ValueError("ciphertext length must be positive and divisible by 8")
+
+        schedule = self._dec_schedule
+        pack_into = _BLOCK.pack_into
+        out = bytearray(len(ciphertext))
+        view = memoryview(out)
+        crc = Crc16()
+        update = crc.update
+        last = len(ciphertext) - 8
+        offset = 0
+        for v0, v1 in _BLOCK.iter_unpack(ciphertext):
+            for first, second in schedule:
+                v1 = (v1 - ((((v0 << 4) ^ (v0 >> 5)) + v0) ^ first)) & _MASK32
+                v0 = (v0 - ((((v1 << 4) ^ (v1 >> 5)) + v1) ^ second)) & _MASK32
+            pack_into(out, offset, v0, v1)
+            update(view[offset : offset + (8 if offset < last else 6)])
+            offset += 8
+        view.release()
+        return bytes(out), crc.digest()
+
+    def encrypt(self, plaintext: bytes) -> bytes:
+        if not plaintext or len(plaintext) % 8 != 0:
+            raise ValueError("plaintext length must be positive and divisible by 8")
+
+        schedule = self._enc_schedule
+        pack_into = _BLOCK.pack_into
+        out = bytearray(len(plaintext))
+        offset = 0
+        for v0, v1 in _BLOCK.iter_unpack(plaintext):
+            for first, second in schedule:
+                v0 = (v0 + ((((v1 << 4) ^ (v1 >> 5)) + v1) ^ first)) & _MASK32
+                v1 = (v1 + ((((v0 << 4) ^ (v0 >> 5)) + v0) ^ second)) & _MASK32
+            pack_into(out, offset, v0, v1)
+            offset += 8
+        return bytes(out)
+
+    def decrypt_block(self, block8: bytes) -> bytes:
+        if len(block8) != 8:
+            raise ValueError("XTEA block must be 8 bytes")
+        return self.decrypt(block8)
+
+    def encrypt_block(self, block8: bytes) -> bytes:
+        if len(block8) != 8:
+            raise ValueError("XTEA block must be 8 bytes")
+        return self.encrypt(block8)
+
+
+class XteaCipherCache:
+    """Bounded LRU of XteaCipher objects keyed by IMEI.
+
+    An entry is rebuilt when the key resolved for the IMEI no longer matches,
+    so key rotation never decrypts with a stale schedule.
+    """
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, XteaCipher] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, imei: str, key16: bytes) -> XteaCipher:
+        with self._lock:
+            cipher = self._entries.get(imei)
+            if cipher is not None and cipher.key == key16:
+                self._entries.move_to_end(imei)
+                return cipher
+
+        cipher = XteaCipher(key16)
+        with self._lock:
+            self._entries[imei] = cipher
+            self._entries.move_to_end(imei)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cipher
+
+    def discard(self, imei: str) -> Optional[XteaCipher]:
+        with self._lock:
+            return self._entries.pop(imei, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
 def xtea_decrypt_block_le(block8: bytes, key16: bytes, rounds: int = 32) -> bytes:
     if len(block8) != 8:
         raise ValueError("XTEA block must be 8 bytes")
-    if rounds <= 0:
-        raise ValueError("rounds must be positive")
-
-    v0, v1 = struct.unpack("<2I", block8)
-    k0, k1, k2, k3 = _key_to_words_le(key16)
-    key_words = (k0, k1, k2, k3)
-
-    summation = (_DELTA * rounds) & _MASK32
-    for _ in range(rounds):
-        v1 = (v1 - ((((v0 << 4) ^ (v0 >> 5)) + v0) ^ (summation + key_words[(summation >> 11) & 3]))) & _MASK32
-        summation = (summation - _DELTA) & _MASK32
-        v0 = (v0 - ((((v1 << 4) ^ (v1 >> 5)) + v1) ^ (summation + key_words[summation & 3]))) & _MASK32
-
-    return struct.pack("<2I", v0, v1)
+    return XteaCipher(key16, rounds=rounds).decrypt(block8)
 
 
 def xtea_encrypt_block_le(block8: bytes, key16: bytes, rounds: int = 32) -> bytes:
     if len(block8) != 8:
         raise ValueError("XTEA block must be 8 bytes")
-    if rounds <= 0:
-        raise ValueError("rounds must be positive")
-
-    v0, v1 = struct.unpack("<2I", block8)
-    k0, k1, k2, k3 = _key_to_words_le(key16)
-    key_words = (k0, k1, k2, k3)
-
-    summation = 0
-    for _ in range(rounds):
-        v0 = (v0 + ((((v1 << 4) ^ (v1 >> 5)) + v1) ^ (summation + key_words[summation & 3]))) & _MASK32
-        summation = (summation + _DELTA) & _MASK32
-        v1 = (v1 + ((((v0 << 4) ^ (v0 >> 5)) + v0) ^ (summation + key_words[(summation >> 11) & 3]))) & _MASK32
-
-    return struct.pack("<2I", v0, v1)
+    return XteaCipher(key16, rounds=rounds).encrypt(block8)
 
 
 def xtea_decrypt_ecb_le(ciphertext: bytes, key16: bytes, rounds: int = 32) -> bytes:
     if not ciphertext or len(ciphertext) % 8 != 0:
         raise ValueError("ciphertext length must be positive and divisible by 8")
-
-    out = bytearray()
-    for i in range(0, len(ciphertext), 8):
-        out.extend(xtea_decrypt_block_le(ciphertext[i : i + 8], key16, rounds=rounds))
-    return bytes(out)
+    return XteaCipher(key16, rounds=rounds).decrypt(ciphertext)
 
 
 def xtea_encrypt_ecb_le(plaintext: bytes, key16: bytes, rounds: int = 32) -> bytes:
     if not plaintext or len(plaintext) % 8 != 0:
         raise ValueError("plaintext length must be positive and divisible by 8")
-
-    out = bytearray()
-    for i in range(0, len(plaintext), 8):
-        out.extend(xtea_encrypt_block_le(plaintext[i : i + 8], key16, rounds=rounds))
-    return bytes(out)
+    return XteaCipher(key16, rounds=rounds).encrypt(plaintext)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .xtea import _DELTA, _MASK32, XteaCipher, _key_to_words_le
+
+try:  # NumPy is optional; without it batches go through XteaCipher one by one.
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None  # type: ignore[assignment]
+
+HAVE_NUMPY = np is not None
+
+# Below this many blocks the array setup costs more than it saves.
+MIN_VECTOR_BLOCKS = 32
+
+
+def xtea_decrypt_ecb_le_batch(
+    items: Sequence[Tuple[bytes, bytes]],
+    rounds: int = 32,
+    use_numpy: Optional[bool] = None,
+) -> List[bytes]:
+    """Decrypt many (ciphertext, key16) pairs; results match xtea_decrypt_ecb_le."""
+    if rounds <= 0:
+        raise ValueError("rounds must be positive")
+    for ciphertext, key16 in items:
+        if not ciphertext or len(ciphertext) % 8 != 0:
+            raise ValueError("ciphertext length must be positive and divisible by 8")
+        if len(key16) != 16:
+            raise ValueError("XTEA key must be 16 bytes")
+
+    if use_numpy is None:
+        use_numpy = HAVE_NUMPY and sum(len(ct) for ct, _ in items) // 8 >= MIN_VECTOR_BLOCKS
+    if use_numpy and not HAVE_NUMPY:
+        raise RuntimeError("numpy is not installed")
+
+    if not use_numpy:
+        return _decrypt_scalar(items, rounds)
+    return _decrypt_numpy(items, rounds)
+
+
+def _decrypt_scalar(items: Sequence[Tuple[bytes, bytes]], rounds: int) -> List[bytes]:
+    ciphers: Dict[bytes, XteaCipher] = {}
+    out = []
+    for ciphertext, key16 in items:
+        key16 = bytes(key16)
+        cipher = ciphers.get(key16)
+        if cipher is None:
+            cipher = ciphers[key16] = XteaCipher(key16, rounds=rounds)
+        out.append(cipher.decrypt(ciphertext))
+    return out
+
+
+def _decrypt_numpy(items: Sequence[Tuple[bytes, bytes]], rounds: int) -> List[bytes]:
+    if not items:
+        return []
+
+    lengths = [len(ciphertext) for ciphertext, _ in items]
+    words = np.frombuffer(b"".join(bytes(ct) for ct, _ in items), dtype="<u4").astype(np.uint32)
+    blocks = words.reshape(-1, 2)
+    v0 = blocks[:, 0].copy()
+    v1 = blocks[:, 1].copy()
+
+    keys = np.array([_key_to_words_le(bytes(key16)) for _, key16 in items], dtype=np.uint32)
+    block_keys = np.repeat(keys, [length // 8 for length in lengths], axis=0)
+    key_columns = [np.ascontiguousarray(block_keys[:, idx]) for idx in range(4)]
+
+    # sum is shared by every block, so each round only selects a key column.
+    summation = (_DELTA * rounds) & _MASK32
+    for _ in range(rounds):
+        first = key_columns[(summation >> 11) & 3] + np.uint32(summation)
+        v1 -= (((v0 << np.uint32(4)) ^ (v0 >> np.uint32(5))) + v0) ^ first
+        summation = (summation - _DELTA) & _MASK32
+        second = key_columns[summation & 3] + np.uint32(summation)
+        v0 -= (((v1 << np.uint32(4)) ^ (v1 >> np.uint32(5))) + v1) ^ second
+
+    blocks = np.empty((len(v0), 2), dtype="<u4")
+    blocks[:, 0] = v0
+    blocks[:, 1] = v1
+    plain = blocks.tobytes()
+
+    out = []
+    offset = 0
+    for length in lengths:
+        out.append(plain[offset : offset + length])
+        offset += length
+    return out
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import time
+from pathlib import Path
+
+from rtu_receiver.config import load_config
+from rtu_receiver.dedup import Deduplicator, TtlCache
+from rtu_receiver.jsonl import JsonlWriter, iter_jsonl
+from rtu_receiver.records import Archive, Telemetry
+from rtu_receiver.synthetic import build_datagram, telemetry_payload
+from rtu_receiver.udp_server import UdpReceiverServer
+
+IMEI = "863703030668235"
+KEY_HEX = "79757975797579756f706f706f706f70"
+
+
+def test_ttl_cache_expires_and_bounds_entries() -> None:
+    now = [0.0]
+    cache = TtlCache(ttl_s=10.0, max_entries=2, clock=lambda: now[0])
+
+    assert not cache.seen("a")
+    assert cache.seen("a")
+    now[0] = 10.0
+    assert not cache.seen("a")
+
+    cache.seen("b")
+    cache.seen("c")
+    assert len(cache) == 2
+    assert cache.stats() == {"size": 2, "hits": 1, "misses": 4, "evicted": 1}
+
+
+def test_ttl_cache_expires_in_insertion_order() -> None:
+    now = [0.0]
+    cache = TtlCache(ttl_s=10.0, max_entries=10, clock=lambda: now[0])
+    cache.seen("a")
+    now[0] = 5.0
+    cache.seen("b")
+    # A hit does not extend the lifetime.
+    assert cache.seen("a")
+
+    now[0] = 10.0
+    assert not cache.seen("c")
+    assert len(cache) == 2 and cache.get("a") is None
+    now[0] = 15.0
+    assert not cache.seen("b")
+    assert cache.seen("c")
+
+
+def test_ttl_cache_evicts_oldest_over_max_entries() -> None:
+    cache = TtlCache(ttl_s=60.0, max_entries=3, clock=lambda: 0.0)
+    for key in "abcd":
+        cache.seen(key)
+    cache.set("d", b"frames")
+
+    assert cache.stats()["evicted"] == 1
+    assert not cache.seen("a")  # evicted, so new again; evicts b
+    assert [cache.seen(key) for key in "cd"] == [True, True]
+    assert cache.get("d") == b"frames"
+    cache.discard("d")
+    assert not cache.seen("d")
+
+
+def test_fresh_records_drops_only_seen_archive_seqs() -> None:
+    dedup = Deduplicator(ttl_s=60.0, clock=lambda: 0.0)
+    first = [Archive(5, []), Archive(6, [])]
+    assert dedup.fresh_records(IMEI, first) is first
+
+    telemetry = Telemetry(0, [])
+    records = [telemetry, Archive(6, []), Archive(7, [])]
+    fresh = dedup.fresh_records(IMEI, records)
+    assert [getattr(record, "seq", None) for record in fresh] == [None, 7]
+    assert fresh[0] is telemetry
+    # The seq is per IMEI.
+    other = [Archive(5, [])]
+    assert dedup.fresh_records("863703030668236", other) is other
+
+
+def test_retransmit_of_failed_datagram_is_decoded_again(tmp_path: Path) -> None:
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(
+        json.dumps({"log_dir": str(tmp_path / "logs"), "keys": {}, "dedup": {"enabled": True}}),
+        encoding="utf-8",
+    )
+    datagram = build_datagram(IMEI, bytes.fromhex(KEY_HEX), telemetry_payload([]))
+
+    with JsonlWriter(tmp_path / "logs") as writer:
+        server = UdpReceiverServer(load_config(cfg_path), writer)
+        server.handle_datagram(datagram, "127.0.0.1", 40000)
+        # The device's key is added by a reload; the device resends the same bytes.
+        keys = dataclasses.replace(server.config.keys, by_imei={IMEI: bytes.fromhex(KEY_HEX)})
+        server.apply_config(dataclasses.replace(server.config, keys=keys))
+        server.handle_datagram(datagram, "127.0.0.1", 40000)
+        server.handle_datagram(datagram, "127.0.0.1", 40000)
+
+    day = time.strftime("%Y%m%d", time.gmtime())
+    raw = list(iter_jsonl(tmp_path / "logs" / f"raw-{day}.jsonl"))
+    assert [record.get("duplicate") for record in raw] == [None, None, "datagram"]
+    [error] = iter_jsonl(tmp_path / "logs" / f"errors-{day}.jsonl")
+    assert error["reason"] == "missing_key_for_imei"
+    assert len(list(iter_jsonl(tmp_path / "logs" / f"decoded-{day}.jsonl"))) == 1
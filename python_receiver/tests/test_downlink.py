@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Tuple
+
+from rtu_receiver.downlink import CommandStore, pack_payloads
+from rtu_receiver.protocol import build_frame, build_plain_for_encrypt, decode_envelope, parse_payload
+from rtu_receiver.records import ConfigResponse, ReadResponse
+from rtu_receiver.udp_server import AckResponder
+from rtu_receiver.xtea import xtea_encrypt_ecb_le
+
+IMEI = "863703030668235"
+KEY = bytes.fromhex("79757975797579756f706f706f706f70")
+
+
+def _key(_imei: str) -> bytes:
+    return KEY
+
+
+def _datagram(payload: bytes) -> bytes:
+    return build_frame(IMEI, xtea_encrypt_ecb_le(build_plain_for_encrypt(payload), KEY))
+
+
+def test_commands_follow_telemetry_ack_and_match_responses(tmp_path: Path) -> None:
+    store = CommandStore(tmp_path / "downlink.sqlite3")
+    apn = store.enqueue(IMEI, 1, 4, b"internet")
+    firmware = store.enqueue(IMEI, 6, 13)
+    store.enqueue_time_sync(IMEI)
+    responder = AckResponder(downlink=store)
+
+    frames = responder.replies(decode_envelope(_datagram(bytes([9, 0])), _key), _key)
+
+    plains = [decode_envelope(frame, lambda _imei: KEY).payload for frame in frames]
+    assert plains[0].rstrip(b"\0") == bytes([9])
+    records = parse_payload(plains[1])["records"]
+    assert [(r["id"], r["param_id"]) for r in records] == [(1, 4), (6, 13), (1, 1), (1, 55)]
+    assert responder.replies(decode_envelope(_datagram(bytes([9, 0])), _key), _key) == frames[:1]
+
+    store.record_responses(IMEI, [ConfigResponse(4, 0), ReadResponse(13, 0, b"1.2")])
+    by_id = {item["id"]: item for item in store.list(IMEI)}
+    assert by_id[apn]["status"] == "done"
+    assert by_id[firmware]["response"] == b"1.2".hex()
+    assert by_id[firmware + 1]["status"] == "sent"
+    store.close()
+
+
+def test_unanswered_command_is_retried_then_failed(tmp_path: Path) -> None:
+    now = [1000.0]
+    store = CommandStore(tmp_path / "downlink.sqlite3", retry_after_s=60, max_attempts=2, clock=lambda: now[0])
+    store.enqueue(IMEI, 6, 126)
+
+    assert len(store.take_due(IMEI)) == 1
+    assert store.take_due(IMEI) == []
+    now[0] += 60
+    assert store.take_due(IMEI)[0].attempts == 2
+    now[0] += 60
+    assert store.take_due(IMEI) == []
+    assert store.list(IMEI)[0]["status"] == "failed"
+    store.close()
+
+
+def test_pack_payloads_splits_at_max_payload(tmp_path: Path) -> None:
+    store = CommandStore(tmp_path / "downlink.sqlite3")
+    for param_id in range(5):
+        store.enqueue(IMEI, 1, param_id, bytes(10))
+    payloads = pack_payloads(store.take_due(IMEI), 0, max_payload=30)
+
+    assert [len(payload) for payload in payloads] == [26, 26, 17]
+    assert payloads[-1].endswith(bytes([1, 55, 1, 0]))
+    store.close()
+
+
+class _Socket:
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.sent: List[bytes] = []
+
+    def sendto(self, data: bytes, addr: Tuple[str, int]) -> int:
+        if self.fail:
+            raise OSError("no buffer space")
+        self.sent.append(data)
+        return len(data)
+
+
+def test_failed_send_gives_the_attempt_back(tmp_path: Path) -> None:
+    store = CommandStore(tmp_path / "downlink.sqlite3", max_attempts=1)
+    store.enqueue(IMEI, 6, 126)
+    responder = AckResponder(downlink=store)
+
+    frames = responder.replies(decode_envelope(_datagram(bytes([9, 0])), _key), _key)
+    assert len(frames.commands) == 1
+    responder.send(_Socket(fail=True), frames, ("127.0.0.1", 40000), 0.0)  # type: ignore[arg-type]
+    assert responder.stats()["send_errors"] == 1
+    [command] = store.list(IMEI)
+    assert (command["status"], command["attempts"], command["sent_at"]) == ("pending", 0, None)
+
+    # Still due, with its one attempt.
+    sock = _Socket()
+    frames = responder.replies(decode_envelope(_datagram(bytes([9, 0])), _key), _key)
+    responder.send(sock, frames, ("127.0.0.1", 40000), 0.0)  # type: ignore[arg-type]
+    assert len(sock.sent) == 2
+    assert store.list(IMEI)[0]["status"] == "sent"
+    store.close()
+
+
+def test_retransmit_reply_leaves_out_commands(tmp_path: Path) -> None:
+    store = CommandStore(tmp_path / "downlink.sqlite3")
+    store.enqueue_time_sync(IMEI)
+    responder = AckResponder(end_session=True, downlink=store)
+
+    frames = responder.replies(decode_envelope(_datagram(bytes([9, 0])), _key), _key)
+    assert len(frames) == 2 and len(frames.commands) == 1
+    plains = [decode_envelope(frame, _key).payload for frame in frames.resend]
+    assert [plain[:4] for plain in plains] == [bytes([9, 0, 0, 0]), bytes([1, 55, 1, 0])]
+
+    # Without commands the reply is resent as is.
+    frames = responder.replies(decode_envelope(_datagram(bytes([9, 0])), _key), _key)
+    assert frames.commands == [] and frames.resend is frames
+    store.close()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+from rtu_receiver.jsonl import JsonlWriter, log_file_name, merge_shards
+
+
+def _day() -> str:
+    return time.strftime("%Y%m%d", time.gmtime())
+
+
+def test_batched_writer_flushes_on_record_count(tmp_path: Path) -> None:
+    writer = JsonlWriter(tmp_path, flush_records=3)
+    path = tmp_path / log_file_name("raw", _day())
+
+    writer.write_raw({"n": 1})
+    writer.write_raw({"n": 2})
+    assert path.read_bytes() == b""
+    assert writer.pending_records == 2
+
+    writer.write_raw({"n": 3})
+    assert [json.loads(line)["n"] for line in path.read_text().splitlines()] == [1, 2, 3]
+    writer.close()
+
+
+def test_writer_context_manager_flushes_on_close(tmp_path: Path) -> None:
+    with JsonlWriter(tmp_path, flush_records=100) as writer:
+        writer.write_decoded({"a": 1})
+        writer.write_error({"b": 2})
+
+    assert (tmp_path / log_file_name("decoded", _day())).read_text() == '{"a":1}\n'
+    assert (tmp_path / log_file_name("errors", _day())).read_text() == '{"b":2}\n'
+
+
+def test_writer_rotates_by_size(tmp_path: Path) -> None:
+    with JsonlWriter(tmp_path, max_bytes=20) as writer:
+        for n in range(4):
+            writer.write_raw({"n": n, "pad": "xx"})
+
+    day = _day()
+    assert {p.name for p in tmp_path.iterdir()} == {log_file_name("raw", day, part) for part in range(4)}
+
+
+def test_merge_shards_orders_by_timestamp(tmp_path: Path) -> None:
+    day = _day()
+    with JsonlWriter(tmp_path, shard="w0") as w0, JsonlWriter(tmp_path, shard="w1", max_bytes=40) as w1:
+        w0.write_raw({"ts_utc": "2025-01-01T00:00:01+00:00", "n": 1})
+        w1.write_raw({"ts_utc": "2025-01-01T00:00:00+00:00", "n": 0})
+        w1.write_raw({"ts_utc": "2025-01-01T00:00:02+00:00", "n": 2})
+        w0.write_raw({"ts_utc": "2025-01-01T00:00:03+00:00", "n": 3})
+
+    assert (tmp_path / log_file_name("raw", day, shard="w1")).exists()
+    assert (tmp_path / log_file_name("raw", day, part=1, shard="w1")).exists()
+    assert [rec["n"] for rec in merge_shards(tmp_path, "raw", day)] == [0, 1, 2, 3]
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+import pickle
+from pathlib import Path
+
+import pytest
+
+from rtu_receiver import keystore
+from rtu_receiver.config import load_config
+from rtu_receiver.keystore import BinaryKeyStore, write_binary_keys
+
+KEYS = {str(860000000000000 + i * 7): bytes([i % 256]) * 16 for i in range(500)}
+
+
+@pytest.mark.parametrize("store_format", ["binary", "sqlite"])
+def test_converted_store_resolves_keys(tmp_path: Path, store_format: str) -> None:
+    src = tmp_path / "old.json"
+    src.write_text(json.dumps({"keys": {"by_imei": {imei: key.hex() for imei, key in KEYS.items()}}}), "utf-8")
+    store_path = tmp_path / f"keys.{store_format}"
+    assert keystore.main(["convert", str(src), str(store_path), "--format", store_format]) == 0
+
+    override = "860000000000007"
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(
+        json.dumps(
+            {
+                "keys": {
+                    "default_hex": "00" * 16,
+                    "by_imei": {override: "ff" * 16},
+                    "store": {"path": str(store_path), "format": store_format, "cache_entries": 8},
+                }
+            }
+        ),
+        encoding="utf-8",
+    )
+    keys = load_config(cfg_path).keys
+    assert keys.by_imei == {override: b"\xff" * 16}
+
+    for imei, key in list(KEYS.items())[::37]:
+        if imei != override:
+            assert keys.resolve_key(imei) == key
+    assert keys.resolve_key(override) == b"\xff" * 16
+    assert keys.resolve_key("860000000000001") == b"\x00" * 16
+    assert keys.resolve_key("99999999999999999999") == b"\x00" * 16
+
+    store = keys.store
+    assert store is not None
+    assert store.stats()["cached"] == 8
+    copy = pickle.loads(pickle.dumps(store))
+    assert copy == store and copy.get("860000000000014") == KEYS["860000000000014"]
+
+
+def test_binary_store_rejects_bad_files(tmp_path: Path) -> None:
+    path = tmp_path / "keys.bin"
+    write_binary_keys(KEYS.items(), path)
+    assert len(BinaryKeyStore(path)) == len(KEYS)
+
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError, match="truncated"):
+        BinaryKeyStore(path)
+    with pytest.raises(ValueError, match="appears twice"):
+        write_binary_keys([("1", b"a" * 16), ("01", b"b" * 16)], path)
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+import socket
+import threading
+from pathlib import Path
+
+from rtu_receiver.config import load_config
+from rtu_receiver.jsonl import JsonlWriter
+from rtu_receiver.loadgen import build_fleet, build_packets, fleet_keys, run_load
+from rtu_receiver.protocol import decode_datagram
+from rtu_receiver.udp_server import UdpReceiverServer
+
+
+def test_fleet_schedule_is_deterministic_with_top_of_period_herd() -> None:
+    fleet = build_fleet(50, seed=7, herd_fraction=0.5, period_s=10.0)
+    assert fleet == build_fleet(50, seed=7, herd_fraction=0.5, period_s=10.0)
+    assert len({device.key for device in fleet}) == 50
+    herd = {device.imei for device in fleet if device.herd}
+    assert 0 < len(herd) < 50
+
+    packets = build_packets(fleet, duration_s=20.0, period_s=10.0, herd_jitter_s=1.0, archive_ratio=0.5, seed=7)
+    assert [packet.at_s for packet in packets] == sorted(packet.at_s for packet in packets)
+    assert len({packet.datagram for packet in packets}) == len(packets)
+    for packet in packets:
+        if packet.imei in herd:
+            assert packet.at_s % 10.0 < 1.0
+
+    keys = {imei: bytes.fromhex(key) for imei, key in fleet_keys(fleet).items()}
+    types = {decode_datagram(packet.datagram, keys.get).records[0].id for packet in packets}
+    assert types == {9, 3}
+
+
+def test_run_load_reports_logged_datagrams(tmp_path: Path) -> None:
+    fleet = build_fleet(20, period_s=0.5)
+    packets = build_packets(fleet, duration_s=0.5, period_s=0.5, herd_jitter_s=0.1)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(
+        json.dumps(
+            {"listen_port": port, "log_dir": str(tmp_path / "logs"), "keys": {"by_imei": fleet_keys(fleet)}}
+        ),
+        encoding="utf-8",
+    )
+    config = load_config(cfg_path)
+
+    with JsonlWriter(config.log_dir) as writer:
+        server = UdpReceiverServer(config, writer)
+        sock = server.open_socket()
+        sock.settimeout(0.05)
+        stop = threading.Event()
+
+        def serve() -> None:
+            with sock:
+                while not stop.is_set():
+                    try:
+                        datagram, (src_ip, src_port) = sock.recvfrom(65535)
+                    except socket.timeout:
+                        continue
+                    server.handle_datagram(datagram, src_ip, src_port)
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        try:
+            report = run_load(packets, "127.0.0.1", port, config.log_dir, drain_s=2.0, devices=len(fleet))
+        finally:
+            stop.set()
+            thread.join(timeout=2)
+
+    assert report["sent"] == len(packets) == report["logged"]
+    assert report["missing"] == 0
+    assert report["log_latency_ms"]["p50"] >= 0
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import json
+import urllib.request
+from pathlib import Path
+
+from rtu_receiver.config import load_config
+from rtu_receiver.jsonl import JsonlWriter
+from rtu_receiver.metrics import MetricsRegistry, MetricsServer
+from rtu_receiver.protocol import build_frame, build_plain_for_encrypt
+from rtu_receiver.udp_server import UdpReceiverServer
+from rtu_receiver.xtea import xtea_encrypt_ecb_le
+
+
+def test_registry_renders_prometheus_text() -> None:
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs done").inc(3)
+    errors = registry.counter("errors_total", "Errors", ("stage",))
+    errors.labels('say "hi"').inc()
+    latency = registry.histogram("latency_seconds", "Latency", (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 7.0):
+        latency.observe(value)
+    registry.value_of("depth", "Queue depth", "gauge", lambda: 4)
+    registry.value_of("hidden", "Not available", "gauge", lambda: None)
+
+    assert registry.render() == (
+        "# HELP jobs_total Jobs done\n"
+        "# TYPE jobs_total counter\n"
+        "jobs_total 3\n"
+        "# HELP errors_total Errors\n"
+        "# TYPE errors_total counter\n"
+        'errors_total{stage="say \\"hi\\""} 1\n'
+        "# HELP latency_seconds Latency\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{le="0.1"} 2\n'
+        'latency_seconds_bucket{le="1"} 3\n'
+        'latency_seconds_bucket{le="+Inf"} 4\n'
+        "latency_seconds_sum 7.65\n"
+        "latency_seconds_count 4\n"
+        "# HELP depth Queue depth\n"
+        "# TYPE depth gauge\n"
+        "depth 4\n"
+    )
+
+
+def test_receiver_metrics_served_over_http(tmp_path: Path) -> None:
+    imei = "863703030668235"
+    key_hex = "79757975797579756f706f706f706f70"
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(
+        json.dumps(
+            {
+                "log_dir": str(tmp_path / "logs"),
+                "keys": {"by_imei": {imei: key_hex}},
+                "dedup": {"enabled": True},
+                "metrics": {"enabled": True, "port": 0},
+            }
+        ),
+        encoding="utf-8",
+    )
+    datagram = build_frame(imei, xtea_encrypt_ecb_le(build_plain_for_encrypt(bytes([9, 0])), bytes.fromhex(key_hex)))
+
+    with JsonlWriter(tmp_path / "logs") as writer:
+        server = UdpReceiverServer(load_config(cfg_path), writer)
+        server.handle_datagram(datagram, "127.0.0.1", 40000)
+        server.handle_datagram(datagram, "127.0.0.1", 40000)
+        server.handle_datagram(b"\x00\x01", "127.0.0.1", 40001)
+
+        with MetricsServer(server.metrics.registry, port=0) as metrics:
+            host, port = metrics.address
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+                assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                lines = response.read().decode().splitlines()
+
+    assert "rtu_datagrams_total 3" in lines
+    assert f"rtu_datagram_bytes_total {2 * len(datagram) + 2}" in lines
+    assert "rtu_datagrams_decoded_total 1" in lines
+    assert 'rtu_duplicates_total{kind="datagram"} 1' in lines
+    assert 'rtu_decode_errors_total{stage="frame",reason="invalid_boundaries"} 1' in lines
+    assert "rtu_decode_seconds_count 2" in lines
+    assert "rtu_envelope_decode_seconds_count 2" in lines
+    assert 'rtu_decode_failures_total{stage="frame",reason="invalid_boundaries"} 1' in lines
+    # The datagram that failed to decode is not kept.
+    assert 'rtu_dedup_entries{cache="datagrams"} 1' in lines
+    assert 'rtu_dedup_lookups_total{cache="datagrams",result="hit"} 1' in lines
+    assert 'rtu_dedup_lookups_total{cache="datagrams",result="miss"} 2' in lines
+    assert "rtu_writer_pending_records 0" in lines
+
+
+def test_no_metrics_when_disabled(tmp_path: Path) -> None:
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(json.dumps({"log_dir": str(tmp_path / "logs")}), encoding="utf-8")
+    with JsonlWriter(tmp_path / "logs") as writer:
+        server = UdpReceiverServer(load_config(cfg_path), writer)
+        assert server.metrics is None
+        server.handle_datagram(b"\x00\x01", "127.0.0.1", 40001)
+    assert list((tmp_path / "logs").glob("errors-*.jsonl"))
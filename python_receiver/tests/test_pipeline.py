@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import json
+import socket
+import threading
+import time
+from pathlib import Path
+
+from rtu_receiver.config import load_config
+from rtu_receiver.jsonl import JsonlWriter
+from rtu_receiver.pipeline import BoundedQueue, PipelineReceiverServer
+from rtu_receiver.protocol import build_frame, build_plain_for_encrypt
+from rtu_receiver.xtea import xtea_encrypt_ecb_le
+
+IMEI = "863703030668235"
+KEY_HEX = "79757975797579756f706f706f706f70"
+
+
+def test_bounded_queue_drop_oldest() -> None:
+    queue: BoundedQueue[int] = BoundedQueue(2, "drop_oldest")
+    for item in (1, 2, 3):
+        assert queue.put(item)
+    assert queue.stats()["dropped"] == 1
+    assert [queue.get(), queue.get()] == [2, 3]
+
+
+def test_bounded_queue_drop_newest() -> None:
+    queue: BoundedQueue[int] = BoundedQueue(2, "drop_newest")
+    assert queue.put(1) and queue.put(2)
+    assert queue.put(3) is False
+    queue.close()
+    assert [queue.get(), queue.get(), queue.get()] == [1, 2, None]
+    assert queue.stats()["high_watermark"] == 2
+
+
+def test_pipeline_server_decodes_and_writes(tmp_path: Path) -> None:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = int(probe.getsockname()[1])
+
+    log_dir = tmp_path / "logs"
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(
+        json.dumps(
+            {
+                "listen_host": "127.0.0.1",
+                "listen_port": port,
+                "log_dir": str(log_dir),
+                "keys": {"by_imei": {IMEI: KEY_HEX}},
+                "pipeline": {"decode_workers": 1, "queue_size": 16},
+            }
+        ),
+        encoding="utf-8",
+    )
+    cfg = load_config(cfg_path)
+    writer = JsonlWriter(cfg.log_dir, flush_records=100)
+    server = PipelineReceiverServer(cfg, writer)
+
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    time.sleep(0.1)
+
+    datagram = build_frame(IMEI, xtea_encrypt_ecb_le(build_plain_for_encrypt(bytes([9, 0])), bytes.fromhex(KEY_HEX)))
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        for _ in range(5):
+            sender.sendto(datagram, ("127.0.0.1", port))
+
+    deadline = time.time() + 3
+    while server.ingress.stats()["enqueued"] < 5 and time.time() < deadline:
+        time.sleep(0.02)
+    server.stop()
+    thread.join(timeout=3)
+    writer.close()
+
+    day = time.strftime("%Y%m%d", time.gmtime())
+    decoded = (log_dir / f"decoded-{day}.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(decoded) == 5
+    assert json.loads(decoded[0])["imei"] == IMEI
+    assert server.stats()["ingress"]["dropped"] == 0
+
+
+def test_writer_thread_survives_a_failing_record(tmp_path: Path) -> None:
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(json.dumps({"log_dir": str(tmp_path / "logs")}), encoding="utf-8")
+    with JsonlWriter(tmp_path / "logs") as writer:
+        server = PipelineReceiverServer(load_config(cfg_path), writer)
+        server.egress.put([("raw", {"unserializable": object()})])
+        server.egress.put([("raw", {"ok": True})])
+        server.egress.close()
+        thread = threading.Thread(target=server._writer_worker, daemon=True)
+        thread.start()
+        thread.join(timeout=3)
+        assert not thread.is_alive()
+
+    [raw] = (tmp_path / "logs").glob("raw-*.jsonl")
+    assert [json.loads(line) for line in raw.read_text(encoding="utf-8").splitlines()] == [{"ok": True}]
+    assert server.stats()["failures"] == {"decode": 0, "write": 1}
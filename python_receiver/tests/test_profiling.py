@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from rtu_receiver.config import load_config
+from rtu_receiver.jsonl import JsonlWriter, iter_jsonl
+from rtu_receiver.profiling import StageClock
+from rtu_receiver.protocol import build_frame, build_plain_for_encrypt, decode_datagram
+from rtu_receiver.udp_server import BatchedUdpReceiverServer, UdpReceiverServer
+from rtu_receiver.xtea import xtea_encrypt_ecb_le
+
+IMEI = "863703030668235"
+KEY_HEX = "79757975797579756f706f706f706f70"
+
+
+def _datagram() -> bytes:
+    return build_frame(IMEI, xtea_encrypt_ecb_le(build_plain_for_encrypt(bytes([9, 0])), bytes.fromhex(KEY_HEX)))
+
+
+def test_decode_datagram_hook_marks_each_stage() -> None:
+    clock = StageClock()
+    result = decode_datagram(_datagram(), lambda _imei: bytes.fromhex(KEY_HEX), hook=clock)
+
+    assert result.imei == IMEI
+    assert [stage for stage, _ in clock.stages] == ["unstuff", "key_lookup", "xtea", "crc", "parse"]
+    assert all(elapsed >= 0 for _, elapsed in clock.stages)
+    assert clock.total_ns == sum(elapsed for _, elapsed in clock.stages)
+
+
+def test_sampled_datagrams_summarised_to_perf_stream(tmp_path: Path) -> None:
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(
+        json.dumps(
+            {
+                "log_dir": str(tmp_path / "logs"),
+                "keys": {"by_imei": {IMEI: KEY_HEX}},
+                "profiling": {"enabled": True, "sample_every": 2, "summary_interval_s": 3600},
+            }
+        ),
+        encoding="utf-8",
+    )
+    datagram = _datagram()
+
+    with JsonlWriter(tmp_path / "logs") as writer:
+        server = UdpReceiverServer(load_config(cfg_path), writer)
+        profiler = server.profiler
+        assert profiler is not None
+        for _ in range(5):
+            server.handle_datagram(datagram, "127.0.0.1", 40000)
+        assert not list((tmp_path / "logs").glob("perf-*.jsonl"))
+
+        profiler.summary_interval_s = 0.0
+        server.handle_datagram(datagram, "127.0.0.1", 40000)
+
+    [perf_path] = (tmp_path / "logs").glob("perf-*.jsonl")
+    [summary] = list(iter_jsonl(perf_path))
+    assert summary["datagrams"] == 6
+    assert summary["sampled"] == 3
+    assert summary["sample_every"] == 2
+    assert list(summary["stages"]) == [
+        "unstuff", "key_lookup", "xtea", "crc", "ack", "parse", "records", "queue", "write", "total"
+    ]
+    for stats in summary["stages"].values():
+        assert stats["count"] == 3
+        assert 0 <= stats["p50_us"] <= stats["p90_us"] <= stats["p99_us"] <= stats["max_us"]
+    assert len(list(iter_jsonl(next((tmp_path / "logs").glob("decoded-*.jsonl"))))) == 6
+
+
+def test_batched_engine_samples_datagrams_in_order(tmp_path: Path) -> None:
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(
+        json.dumps(
+            {
+                "log_dir": str(tmp_path / "logs"),
+                "keys": {"by_imei": {IMEI: KEY_HEX}},
+                "profiling": {"enabled": True, "sample_every": 2, "summary_interval_s": 3600},
+            }
+        ),
+        encoding="utf-8",
+    )
+    datagram = _datagram()
+
+    with JsonlWriter(tmp_path / "logs") as writer:
+        server = BatchedUdpReceiverServer(load_config(cfg_path), writer)
+        profiler = server.profiler
+        assert profiler is not None
+        server.handle_batch([(memoryview(datagram), "127.0.0.1", 40000 + port) for port in range(5)])
+        profiler.summary_interval_s = 0.0
+        server.handle_batch([(memoryview(datagram), "127.0.0.1", 40005)])
+
+    [perf_path] = (tmp_path / "logs").glob("perf-*.jsonl")
+    [summary] = list(iter_jsonl(perf_path))
+    assert (summary["datagrams"], summary["sampled"]) == (6, 3)
+    assert summary["stages"]["xtea"]["count"] == 3
+    decoded = list(iter_jsonl(next((tmp_path / "logs").glob("decoded-*.jsonl"))))
+    assert [record["src_port"] for record in decoded] == list(range(40000, 40006))
+
+
+def test_profiling_disabled_by_default(tmp_path: Path) -> None:
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(json.dumps({"log_dir": str(tmp_path / "logs"), "keys": {}}), encoding="utf-8")
+    with JsonlWriter(tmp_path / "logs") as writer:
+        assert UdpReceiverServer(load_config(cfg_path), writer).profiler is None
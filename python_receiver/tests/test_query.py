@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from rtu_receiver.jsonl import JsonlWriter, encode_record
+from rtu_receiver.logindex import build_index, index_path
+from rtu_receiver.query import build_indexes, main, query_logs
+from rtu_receiver.timeutil import iso_to_us, us_to_iso
+
+IMEIS = ["863703030668235", "863703030668236", "863703030668237"]
+
+
+def _records(start_us: int, count: int) -> List[Dict[str, Any]]:
+    return [
+        {"ts_utc": us_to_iso(start_us + i * 1_000_000), "imei": IMEIS[i % 3], "n": i}
+        for i in range(count)
+    ]
+
+
+def _expected(records: List[Dict[str, Any]], imei: str, since_us: int, until_us: int) -> List[bytes]:
+    return [
+        encode_record(r)
+        for r in records
+        if r["imei"] == imei and since_us <= iso_to_us(r["ts_utc"]) < until_us
+    ]
+
+
+def test_query_uses_index_and_unindexed_tail(tmp_path: Path) -> None:
+    day_start = int(time.time()) // 86400 * 86400 * 1_000_000
+    records = _records(day_start, 50)
+    with JsonlWriter(tmp_path, index=True) as writer:
+        for record in records[:40]:
+            writer.write_decoded(record)
+    day = time.strftime("%Y%m%d", time.gmtime())
+    log = tmp_path / f"decoded-{day}.jsonl"
+    assert index_path(log).exists()
+    # Records appended behind the index's back are found by scanning.
+    with log.open("ab") as fp:
+        fp.write(b"".join(encode_record(r) for r in records[40:]))
+
+    since, until = day_start + 5_000_000, day_start + 47_000_000
+    expected = _expected(records, IMEIS[1], since, until)
+    assert list(query_logs(tmp_path, "decoded", IMEIS[1], since, until)) == expected
+
+    # Small blocks, and no index at all, give the same answer.
+    assert build_index(log, block_entries=4) == 50
+    assert list(query_logs(tmp_path, "decoded", IMEIS[1], since, until)) == expected
+    index_path(log).unlink()
+    assert list(query_logs(tmp_path, "decoded", IMEIS[1], since, until)) == expected
+    assert list(query_logs(tmp_path, "decoded")) == [encode_record(r) for r in records]
+
+    assert [(p.name, n) for p, n in build_indexes(tmp_path, "decoded")] == [(log.name, 50)]
+    assert list(build_indexes(tmp_path, "decoded")) == []
+
+
+def test_writer_repairs_torn_index_on_restart(tmp_path: Path, capsys: Any) -> None:
+    day_start = int(time.time()) // 86400 * 86400 * 1_000_000
+    records = _records(day_start, 30)
+    with JsonlWriter(tmp_path, index=True) as writer:
+        for record in records[:20]:
+            writer.write_decoded(record)
+    day = time.strftime("%Y%m%d", time.gmtime())
+    idx = index_path(tmp_path / f"decoded-{day}.jsonl")
+    idx.write_bytes(idx.read_bytes()[:-5])
+
+    with JsonlWriter(tmp_path, index=True) as writer:
+        for record in records[20:]:
+            writer.write_decoded(record)
+    assert list(query_logs(tmp_path, "decoded", IMEIS[0])) == _expected(records, IMEIS[0], 0, 2**62)
+
+    assert main(["--log-dir", str(tmp_path), "--imei", IMEIS[2], "--since", us_to_iso(day_start + 10_000_000)]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["n"] for line in lines] == [11, 14, 17, 20, 23, 26, 29]
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import io
+import json
+import time
+from pathlib import Path
+
+from rtu_receiver.config import load_config
+from rtu_receiver.jsonl import JsonlWriter
+from rtu_receiver.protocol import build_frame, build_plain_for_encrypt
+from rtu_receiver.rawlog import RawRecord, iter_rawlog, jsonl_to_rawlog, rawlog_to_jsonl
+from rtu_receiver.replay import replay_files
+from rtu_receiver.udp_server import UdpReceiverServer
+from rtu_receiver.xtea import xtea_encrypt_ecb_le
+
+
+def test_binary_raw_log_roundtrips_through_jsonl(tmp_path: Path) -> None:
+    records = [
+        RawRecord(1735689600123456, "10.1.2.3", 5000, bytes([0xC0, 1, 2, 0xC2])),
+        RawRecord(1735689601000000, "2001:db8::1", 65535, b"", "datagram"),
+    ]
+    jsonl_path = tmp_path / "raw-20250101.jsonl"
+    jsonl_path.write_bytes(b"".join(json.dumps(r.to_json_dict()).encode() + b"\n" for r in records))
+
+    bin_path = tmp_path / "raw-20250101.bin"
+    with bin_path.open("wb") as dst:
+        assert jsonl_to_rawlog(jsonl_path, dst) == 2
+    # A record cut short by a crash is ignored.
+    with bin_path.open("ab") as dst:
+        dst.write(records[0].encode()[:-1])
+
+    assert list(iter_rawlog(bin_path)) == records
+    assert list(iter_rawlog(bin_path, use_mmap=False)) == records
+    out = io.BytesIO()
+    rawlog_to_jsonl(bin_path, out)
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == [r.to_json_dict() for r in records]
+    assert records[0].ts_utc == "2025-01-01T00:00:00.123456+00:00"
+
+
+def test_receiver_writes_binary_raw_log_that_replays(tmp_path: Path) -> None:
+    imei = "863703030668235"
+    key_hex = "79757975797579756f706f706f706f70"
+    log_dir = tmp_path / "logs"
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(
+        json.dumps(
+            {"log_dir": str(log_dir), "keys": {"by_imei": {imei: key_hex}}, "writer": {"raw_format": "binary"}}
+        ),
+        encoding="utf-8",
+    )
+    cfg = load_config(cfg_path)
+    datagram = build_frame(imei, xtea_encrypt_ecb_le(build_plain_for_encrypt(bytes([9, 0])), bytes.fromhex(key_hex)))
+
+    with JsonlWriter(cfg.log_dir) as writer:
+        server = UdpReceiverServer(cfg, writer)
+        server.handle_datagram(datagram, "127.0.0.1", 33333)
+        server.handle_datagram(b"\x00\x01", "127.0.0.1", 33334)
+    with JsonlWriter(cfg.log_dir) as writer:
+        # A restart starts a new part instead of appending to a possibly torn file.
+        UdpReceiverServer(cfg, writer).handle_datagram(datagram, "127.0.0.1", 33335)
+
+    day = time.strftime("%Y%m%d", time.gmtime())
+    assert not (log_dir / f"raw-{day}.jsonl").exists()
+    captured = list(iter_rawlog(log_dir / f"raw-{day}.bin"))
+    assert [(r.src_port, r.datagram) for r in captured] == [(33333, datagram), (33334, b"\x00\x01")]
+    assert [r.src_port for r in iter_rawlog(log_dir / f"raw-{day}.1.bin")] == [33335]
+
+    out_dir = tmp_path / "replayed"
+    replay_files(cfg, [log_dir / f"raw-{day}.bin"], out_dir, workers=1, progress=False)
+    decoded = [json.loads(line) for line in (log_dir / f"decoded-{day}.jsonl").read_text().splitlines()]
+    assert (out_dir / f"decoded-{day}.jsonl").read_text().splitlines()[0] == json.dumps(
+        decoded[0], ensure_ascii=False, separators=(",", ":")
+    )
+    assert (out_dir / f"errors-{day}.jsonl").read_bytes() == (log_dir / f"errors-{day}.jsonl").read_bytes()
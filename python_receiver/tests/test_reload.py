@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import os
+import signal
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from rtu_receiver import protocol
+from rtu_receiver.config import load_config
+from rtu_receiver.jsonl import JsonlWriter, iter_jsonl
+from rtu_receiver.keystore import write_binary_keys
+from rtu_receiver.reload import ConfigReloader
+from rtu_receiver.synthetic import build_datagram, telemetry_payload
+from rtu_receiver.udp_server import UdpReceiverServer
+
+IMEI_A = "863703030668235"
+IMEI_B = "863703030668236"
+KEY_A = bytes.fromhex("79757975797579756f706f706f706f70")
+KEY_B = bytes.fromhex("4f9c2d0ab3e17c55a8d2f0b19c6e4a73")
+KEY_B2 = bytes.fromhex("00112233445566778899aabbccddeeff")
+
+
+def _write(path: Path, config: Dict[str, Any]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(config), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _wait_for(condition: Any, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_reload_swaps_keys_and_keeps_the_rest(tmp_path: Path) -> None:
+    cfg_path = tmp_path / "cfg.json"
+    config: Dict[str, Any] = {
+        "log_dir": str(tmp_path / "logs"),
+        "keys": {"by_imei": {IMEI_A: KEY_A.hex(), IMEI_B: KEY_B.hex()}},
+        "ack": {"enabled": True},
+        "reload": {"enabled": True, "poll_s": None},
+    }
+    _write(cfg_path, config)
+    payload = telemetry_payload([])
+
+    with JsonlWriter(tmp_path / "logs") as writer:
+        server = UdpReceiverServer(load_config(cfg_path), writer)
+        reloader = ConfigReloader(cfg_path, server, poll_s=None)
+        assert reloader.reload() and reloader.reloads == 0
+
+        server.handle_datagram(build_datagram(IMEI_A, KEY_A, payload), "127.0.0.1", 40000)
+        cipher_a = protocol._CIPHER_CACHE.get(IMEI_A, KEY_A)
+        started_with = server.config
+
+        # Rotate B's key; a listen_port change is only reported.
+        config["keys"]["by_imei"][IMEI_B] = KEY_B2.hex()
+        config["listen_port"] = 5001
+        _write(cfg_path, config)
+        assert reloader.reload() and reloader.reloads == 1
+        assert server.config is not started_with and started_with.keys.resolve_key(IMEI_B) == KEY_B
+        assert server.config.listen_port == 5000
+
+        server.handle_datagram(build_datagram(IMEI_B, KEY_B2, payload), "127.0.0.1", 40000)
+        server.handle_datagram(build_datagram(IMEI_A, KEY_A, payload), "127.0.0.1", 40000)
+        assert protocol._CIPHER_CACHE.get(IMEI_A, KEY_A) is cipher_a
+
+        # An invalid edit is rejected and the running keys stay.
+        cfg_path.write_text("{", encoding="utf-8")
+        assert not reloader.reload() and reloader.failures == 1
+        assert server.config.keys.resolve_key(IMEI_B) == KEY_B2
+
+    [decoded_path] = (tmp_path / "logs").glob("decoded-*.jsonl")
+    assert [record["imei"] for record in iter_jsonl(decoded_path)] == [IMEI_A, IMEI_B, IMEI_A]
+    assert not list((tmp_path / "logs").glob("errors-*.jsonl"))
+
+
+def test_key_store_rewrite_and_sighup_trigger_reload(tmp_path: Path) -> None:
+    store_path = tmp_path / "keys.bin"
+    write_binary_keys([(IMEI_A, KEY_A)], store_path)
+    cfg_path = tmp_path / "cfg.json"
+    config: Dict[str, Any] = {
+        "log_dir": str(tmp_path / "logs"),
+        "decode_enabled": True,
+        "keys": {"store": {"path": str(store_path)}},
+    }
+    _write(cfg_path, config)
+
+    with JsonlWriter(tmp_path / "logs") as writer:
+        server = UdpReceiverServer(load_config(cfg_path), writer)
+        store = server.config.keys.store
+        assert store is not None and store.get(IMEI_A) == KEY_A
+
+        with ConfigReloader(cfg_path, server, poll_s=0.02) as reloader:
+            # The first check finds nothing new and keeps the open store and its LRU.
+            _wait_for(lambda: reloader.loaded is not None)
+            assert reloader.reloads == 0 and server.config.keys.store is store
+
+            write_binary_keys([(IMEI_A, KEY_A), (IMEI_B, KEY_B)], store_path)
+            _wait_for(lambda: server.config.keys.resolve_key(IMEI_B) == KEY_B)
+            assert server.config.keys.store is not store
+
+            # SIGHUP alone, with polling as good as off.
+            reloader.poll_s = 3600.0
+            time.sleep(0.05)
+            config["decode_enabled"] = False
+            _write(cfg_path, config)
+            os.kill(os.getpid(), signal.SIGHUP)
+            _wait_for(lambda: not server.config.decode_enabled)
+
+    assert signal.getsignal(signal.SIGHUP) is signal.SIG_DFL
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+from rtu_receiver.config import load_config
+from rtu_receiver.jsonl import JsonlWriter
+from rtu_receiver.protocol import build_frame, build_plain_for_encrypt
+from rtu_receiver.replay import replay_files
+from rtu_receiver.udp_server import UdpReceiverServer
+from rtu_receiver.xtea import xtea_encrypt_ecb_le
+
+
+def test_replay_matches_live_output(tmp_path: Path) -> None:
+    imei = "863703030668235"
+    key_hex = "79757975797579756f706f706f706f70"
+    key = bytes.fromhex(key_hex)
+    log_dir = tmp_path / "logs"
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(
+        json.dumps({"log_dir": str(log_dir), "keys": {"by_imei": {imei: key_hex}}, "dedup": {"enabled": True}}),
+        encoding="utf-8",
+    )
+    cfg = load_config(cfg_path)
+
+    datagrams = [
+        build_frame(imei, xtea_encrypt_ecb_le(build_plain_for_encrypt(bytes([9, 1, 1, 1, seq])), key))
+        for seq in range(7)
+    ]
+    datagrams[3:3] = [b"\x00\x01", datagrams[2], build_frame(imei, xtea_encrypt_ecb_le(bytes([0x55] * 8), key))]
+    with JsonlWriter(cfg.log_dir) as writer:
+        server = UdpReceiverServer(cfg, writer)
+        for port, datagram in enumerate(datagrams, start=40000):
+            server.handle_datagram(datagram, "127.0.0.1", port)
+
+    day = time.strftime("%Y%m%d", time.gmtime())
+    out_dir = tmp_path / "replayed"
+    records, _ = replay_files(cfg, [log_dir / f"raw-{day}.jsonl"], out_dir, workers=2, chunk_size=2, progress=False)
+
+    assert records == len(datagrams)
+    for stream in ("decoded", "errors"):
+        assert (out_dir / f"{stream}-{day}.jsonl").read_bytes() == (log_dir / f"{stream}-{day}.jsonl").read_bytes()
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from rtu_receiver import jsonl
+from rtu_receiver.config import RetentionConfig, load_config
+from rtu_receiver.jsonl import JsonlWriter, encode_record, iter_jsonl, merge_shards
+from rtu_receiver.logindex import build_index, index_path
+from rtu_receiver.query import query_logs
+from rtu_receiver.retention import maintain
+from rtu_receiver.timeutil import us_to_iso
+
+DAY_S = 86400
+
+
+def _day(ts: float) -> str:
+    return time.strftime("%Y%m%d", time.gmtime(ts))
+
+
+def _write_day(log_dir: Path, ts: float) -> List[Dict[str, Any]]:
+    records = [
+        {"ts_utc": us_to_iso(int(ts + i) * 1_000_000), "imei": "86370303066823" + str(i % 2), "n": i}
+        for i in range(200)
+    ]
+    for stream in ("decoded", "errors"):
+        (log_dir / f"{stream}-{_day(ts)}.jsonl").write_bytes(b"".join(map(encode_record, records)))
+    (log_dir / f"raw-{_day(ts)}.bin").write_bytes(b"RTUR\x01\x00\x08\x00")
+    for path in log_dir.iterdir():
+        os.utime(path, (time.time() - 60, time.time() - 60))
+    return records
+
+
+def test_maintain_compresses_finished_days_and_applies_age(tmp_path: Path) -> None:
+    now = time.time()
+    _write_day(tmp_path, now - 10 * DAY_S)
+    records = _write_day(tmp_path, now - 2 * DAY_S)
+    today_records = _write_day(tmp_path, now)
+    old, recent, today = _day(now - 10 * DAY_S), _day(now - 2 * DAY_S), _day(now)
+    build_index(tmp_path / f"decoded-{recent}.jsonl", block_entries=16)
+    expected = [encode_record(r) for r in records + today_records if r["imei"] == "863703030668231"]
+
+    report = maintain(tmp_path, RetentionConfig(compress="gzip", max_age_days=5, min_idle_s=0), now=now)
+
+    assert sorted(report["compressed"]) == [f"decoded-{d}.jsonl" for d in (old, recent)] + [
+        f"errors-{d}.jsonl" for d in (old, recent)
+    ]
+    assert sorted(report["deleted"]) == [f"decoded-{old}.jsonl.gz", f"errors-{old}.jsonl.gz", f"raw-{old}.bin"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        [
+            f"decoded-{recent}.jsonl.gz",
+            f"decoded-{recent}.jsonl.idx",
+            f"errors-{recent}.jsonl.gz",
+            f"raw-{recent}.bin",
+            f"decoded-{today}.jsonl",
+            f"errors-{today}.jsonl",
+            f"raw-{today}.bin",
+        ]
+    )
+
+    # Readers see through the compression, with and without the index.
+    assert list(query_logs(tmp_path, "decoded", "863703030668231")) == expected
+    index_path(tmp_path / f"decoded-{recent}.jsonl.gz").unlink()
+    assert list(query_logs(tmp_path, "decoded", "863703030668231")) == expected
+    assert list(iter_jsonl(tmp_path / f"errors-{recent}.jsonl.gz")) == records
+    assert list(merge_shards(tmp_path, "errors", recent)) == records
+
+
+def test_maintain_deletes_oldest_days_over_size_budget(tmp_path: Path) -> None:
+    now = time.time()
+    for age in (4, 3, 2, 1, 0):
+        _write_day(tmp_path, now - age * DAY_S)
+    day_bytes = sum(p.stat().st_size for p in tmp_path.glob(f"*-{_day(now)}.*"))
+
+    report = maintain(tmp_path, RetentionConfig(compress=None, max_total_bytes=3 * day_bytes, min_idle_s=0), now=now)
+
+    assert {name.split("-")[1][:8] for name in report["deleted"]} == {_day(now - 4 * DAY_S), _day(now - 3 * DAY_S)}
+    assert sum(p.stat().st_size for p in tmp_path.iterdir()) <= 3 * day_bytes
+    # A day still being written to is left alone.
+    report = maintain(tmp_path, RetentionConfig(compress="lzma", max_total_bytes=1, min_idle_s=600), now=now)
+    assert report == {"compressed": [], "deleted": []}
+
+
+def test_buffered_records_are_flushed_before_their_day_is_compressed(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    midnight = (int(time.time()) // DAY_S - 1) * DAY_S
+    clock = [midnight - 5.0]
+    fake_time = SimpleNamespace(
+        time=lambda: clock[0], monotonic=time.monotonic, strftime=time.strftime, gmtime=time.gmtime
+    )
+    monkeypatch.setattr(jsonl, "time", fake_time)
+    config = RetentionConfig(compress="gzip", min_idle_s=600)
+    day = _day(midnight - 1)
+    path = tmp_path / f"errors-{day}.jsonl"
+
+    with JsonlWriter(tmp_path, flush_records=10, flush_interval_s=600) as writer:
+        writer.write("errors", {"n": 0})
+        # Nothing flushed yet, so the file looks long idle.
+        os.utime(path, (midnight - DAY_S, midnight - DAY_S))
+        clock[0] = midnight + 1
+        assert maintain(tmp_path, config, now=midnight + 1) == {"compressed": [], "deleted": []}
+
+        # The receive loop's idle wakeup after midnight closes the day.
+        writer.flush_if_due()
+        report = maintain(tmp_path, config, now=time.time() + 600)
+        assert report["compressed"] == [path.name]
+        writer.write("errors", {"n": 1})
+
+    assert list(iter_jsonl(tmp_path / f"errors-{day}.jsonl.gz")) == [{"n": 0}]
+    assert list(iter_jsonl(tmp_path / f"errors-{_day(midnight)}.jsonl")) == [{"n": 1}]
+
+
+def test_retention_requires_buffered_writer_to_flush_while_idle(tmp_path: Path) -> None:
+    cfg_path = tmp_path / "cfg.json"
+    config: Dict[str, Any] = {
+        "log_dir": str(tmp_path / "logs"),
+        "keys": {},
+        "writer": {"flush_records": 500},
+        "retention": {"enabled": True, "min_idle_s": 600},
+    }
+    cfg_path.write_text(json.dumps(config), encoding="utf-8")
+    with pytest.raises(ValueError, match="flush_interval_s"):
+        load_config(cfg_path)
+
+    config["writer"]["flush_interval_s"] = 1.0
+    cfg_path.write_text(json.dumps(config), encoding="utf-8")
+    assert load_config(cfg_path).retention.enabled
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import pytest
+
+from rtu_receiver.counter_viewer import extract_counter_values
+from rtu_receiver.protocol import ProtocolError, decode_datagram
+from rtu_receiver.synthetic import ESCAPE_IMEI, IMEI, KEY, benchmark_cases
+
+KEYS = {IMEI: KEY, ESCAPE_IMEI: KEY}
+
+
+def test_benchmark_cases_decode_as_named() -> None:
+    cases = benchmark_cases(archive_events=3)
+
+    assert decode_datagram(cases["telemetry_empty"], KEYS.get).records[0].count == 0
+    telemetry = decode_datagram(cases["telemetry_counters"], KEYS.get)
+    assert extract_counter_values(telemetry) == (IMEI, [1234567, 89012, 345, 6789012], "telemetry")
+    archive = decode_datagram(cases["archive_3_events"], KEYS.get)
+    events = archive.records[0].events
+    assert len(events) == 3
+    assert [int.from_bytes(entry.value, "little") for entry in events[-1].entries] == [1234569, 89014, 347, 6789014]
+
+    escaped = cases["escape_heavy"]
+    assert decode_datagram(escaped, KEYS.get).imei == ESCAPE_IMEI
+    assert escaped.count(b"\xc4") >= 6
+
+    for name, reason in (
+        ("invalid_boundaries", "invalid_boundaries"),
+        ("invalid_crc", "crc_mismatch"),
+        ("missing_key", "missing_key_for_imei"),
+    ):
+        with pytest.raises(ProtocolError) as exc:
+            decode_datagram(cases[name], KEYS.get)
+        assert exc.value.reason == reason
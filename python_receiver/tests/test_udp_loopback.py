@@ -6,11 +6,12 @@ import threading
 import time
 from pathlib import Path
 
+from rtu_receiver.aio_server import AsyncUdpReceiverServer
 from rtu_receiver.config import load_config
 from rtu_receiver.crc16 import crc16_ccitt_false
 from rtu_receiver.jsonl import JsonlWriter
-from rtu_receiver.protocol import build_frame, build_plain_for_encrypt
-from rtu_receiver.udp_server import UdpReceiverServer
+from rtu_receiver.protocol import build_frame, build_plain_for_encrypt, decode_envelope
+from rtu_receiver.udp_server import BatchedUdpReceiverServer, UdpReceiverServer
 from rtu_receiver.xtea import xtea_encrypt_ecb_le
 
 
@@ -158,3 +159,232 @@ def test_decode_errors_written(tmp_path: Path) -> None:
     reasons = {(e["stage"], e["reason"]) for e in errors}
     assert ("frame", "invalid_boundaries") in reasons
     assert ("crc", "crc_mismatch") in reasons
+
+
+def test_asyncio_engine_once(tmp_path: Path) -> None:
+    imei = "863703030668235"
+    key_hex = "79757975797579756f706f706f706f70"
+    port = _pick_port()
+    log_dir = tmp_path / "logs"
+    config_path = tmp_path / "receiver.json"
+    config_path.write_text(
+        json.dumps(
+            {
+                "listen_host": "127.0.0.1",
+                "listen_port": port,
+                "log_dir": str(log_dir),
+                "keys": {"by_imei": {imei: key_hex}},
+            }
+        ),
+        encoding="utf-8",
+    )
+    cfg = load_config(config_path)
+    sink_outputs: list = []
+
+    async def _sink(outputs) -> None:
+        sink_outputs.append(outputs)
+
+    server = AsyncUdpReceiverServer(cfg, JsonlWriter(cfg.log_dir), sinks=[_sink])
+    thread = threading.Thread(target=server.run, kwargs={"once": True}, daemon=True)
+    thread.start()
+    time.sleep(0.2)
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        sender.sendto(_build_valid_datagram(imei, key_hex), ("127.0.0.1", port))
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+    date_suffix = time.strftime("%Y%m%d", time.gmtime())
+    decoded = _read_jsonl(log_dir / f"decoded-{date_suffix}.jsonl")
+    assert decoded[0]["imei"] == imei
+    assert [stream for stream, _ in sink_outputs[0]] == ["raw", "decoded"]
+
+
+def test_asyncio_engine_sends_acks_through_transport(tmp_path: Path) -> None:
+    imei = "863703030668235"
+    key_hex = "79757975797579756f706f706f706f70"
+    port = _pick_port()
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(
+        json.dumps(
+            {
+                "listen_port": port,
+                "log_dir": str(tmp_path / "logs"),
+                "keys": {"by_imei": {imei: key_hex}},
+                "ack": {"enabled": True},
+            }
+        ),
+        encoding="utf-8",
+    )
+    cfg = load_config(cfg_path)
+    server = AsyncUdpReceiverServer(cfg, JsonlWriter(cfg.log_dir))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    time.sleep(0.2)
+
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as device:
+            device.settimeout(2.0)
+            device.sendto(_build_valid_datagram(imei, key_hex), ("127.0.0.1", port))
+            reply = device.recvfrom(65535)[0]
+    finally:
+        server.stop()
+        thread.join(timeout=5)
+
+    assert decode_envelope(reply, cfg.keys.resolve_key).plaintext == build_plain_for_encrypt(bytes([9]))
+    assert server.stats()["ack"]["sent"] == 1 and server.stats()["ack"]["send_errors"] == 0
+
+
+def test_batched_engine_drains_pending_datagrams(tmp_path: Path) -> None:
+    imei = "863703030668235"
+    key_hex = "79757975797579756f706f706f706f70"
+    port = _pick_port()
+    log_dir = tmp_path / "logs"
+    config_path = tmp_path / "receiver.json"
+    config_path.write_text(
+        json.dumps(
+            {
+                "listen_host": "127.0.0.1",
+                "listen_port": port,
+                "log_dir": str(log_dir),
+                "keys": {"by_imei": {imei: key_hex}},
+                "socket": {"rcvbuf": 262144, "batch_size": 8},
+            }
+        ),
+        encoding="utf-8",
+    )
+    cfg = load_config(config_path)
+    server = BatchedUdpReceiverServer(cfg, JsonlWriter(cfg.log_dir))
+    sock = server.open_socket()
+    assert server.rcvbuf_granted is not None
+
+    datagram = _build_valid_datagram(imei, key_hex)
+    with sock, socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        for _ in range(3):
+            sender.sendto(datagram, ("127.0.0.1", port))
+        sender.sendto(b"\x00\x01", ("127.0.0.1", port))
+        time.sleep(0.1)
+        sock.setblocking(False)
+        views = [memoryview(bytearray(65535)) for _ in range(8)]
+        batch = server._drain(sock, views)
+        assert len(batch) == 4
+        server.handle_batch(batch)
+
+    date_suffix = time.strftime("%Y%m%d", time.gmtime())
+    raw = _read_jsonl(log_dir / f"raw-{date_suffix}.jsonl")
+    decoded = _read_jsonl(log_dir / f"decoded-{date_suffix}.jsonl")
+    errors = _read_jsonl(log_dir / f"errors-{date_suffix}.jsonl")
+    assert [r["datagram_hex"] for r in raw[:3]] == [datagram.hex()] * 3
+    assert len(decoded) == 3 and decoded[0]["imei"] == imei
+    assert errors[0]["reason"] == "invalid_boundaries"
+
+
+def test_decoded_stream_filtered_by_imei(tmp_path: Path) -> None:
+    imei = "863703030668235"
+    key_hex = "79757975797579756f706f706f706f70"
+    log_dir = tmp_path / "logs"
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(
+        json.dumps(
+            {
+                "log_dir": str(log_dir),
+                "keys": {"by_imei": {imei: key_hex}},
+                "decoded_imeis": ["111111111111111"],
+            }
+        ),
+        encoding="utf-8",
+    )
+    cfg = load_config(cfg_path)
+    server = UdpReceiverServer(cfg, JsonlWriter(cfg.log_dir))
+
+    server.handle_datagram(_build_valid_datagram(imei, key_hex), "127.0.0.1", 33333)
+
+    date_suffix = time.strftime("%Y%m%d", time.gmtime())
+    assert len(_read_jsonl(log_dir / f"raw-{date_suffix}.jsonl")) == 1
+    assert not (log_dir / f"decoded-{date_suffix}.jsonl").exists()
+
+
+def test_duplicates_suppressed_from_decoded_stream(tmp_path: Path) -> None:
+    imei = "863703030668235"
+    key_hex = "79757975797579756f706f706f706f70"
+    key = bytes.fromhex(key_hex)
+    log_dir = tmp_path / "logs"
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(
+        json.dumps(
+            {
+                "log_dir": str(log_dir),
+                "keys": {"by_imei": {imei: key_hex}},
+                "dedup": {"enabled": True},
+            }
+        ),
+        encoding="utf-8",
+    )
+    cfg = load_config(cfg_path)
+    server = UdpReceiverServer(cfg, JsonlWriter(cfg.log_dir))
+
+    archive = build_frame(imei, xtea_encrypt_ecb_le(build_plain_for_encrypt(bytes([3, 5])), key))
+    # Same seq resent with an extra (empty-payload) event: different bytes, same archive.
+    resent = build_frame(
+        imei, xtea_encrypt_ecb_le(build_plain_for_encrypt(bytes([3, 5, 1, 1, 2, 3, 4, 0])), key)
+    )
+    # Fresh telemetry followed by the same archive again: only the archive is dropped.
+    with_telemetry = build_frame(imei, xtea_encrypt_ecb_le(build_plain_for_encrypt(bytes([9, 0, 3, 5])), key))
+    for datagram in (archive, archive, resent, with_telemetry):
+        server.handle_datagram(datagram, "127.0.0.1", 33333)
+
+    date_suffix = time.strftime("%Y%m%d", time.gmtime())
+    raw = _read_jsonl(log_dir / f"raw-{date_suffix}.jsonl")
+    assert [rec.get("duplicate") for rec in raw] == [None, "datagram", "archive_seq", None]
+    decoded = _read_jsonl(log_dir / f"decoded-{date_suffix}.jsonl")
+    assert [[rec["type"] for rec in line["records"]] for line in decoded] == [["archive"], ["telemetry"]]
+    assert server.stats()["dedup"]["datagrams"]["hits"] == 1
+    assert server.stats()["dedup"]["archives"]["hits"] == 2
+
+
+def test_ack_responder_replies_to_source(tmp_path: Path) -> None:
+    imei = "863703030668235"
+    key_hex = "79757975797579756f706f706f706f70"
+    key = bytes.fromhex(key_hex)
+    port = _pick_port()
+    cfg_path = tmp_path / "cfg.json"
+    cfg_path.write_text(
+        json.dumps(
+            {
+                "listen_port": port,
+                "log_dir": str(tmp_path / "logs"),
+                "keys": {"by_imei": {imei: key_hex}},
+                "dedup": {"enabled": True},
+                "ack": {"enabled": True, "end_session": True},
+            }
+        ),
+        encoding="utf-8",
+    )
+    cfg = load_config(cfg_path)
+    server = BatchedUdpReceiverServer(cfg, JsonlWriter(cfg.log_dir))
+    sock = server.open_socket()
+    archive = build_frame(imei, xtea_encrypt_ecb_le(build_plain_for_encrypt(bytes([3, 5])), key))
+
+    with sock, socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as device:
+        device.settimeout(2.0)
+        # The last datagram is a retransmit, answered from the dedup cache without decrypting.
+        for datagram in (_build_valid_datagram(imei, key_hex), archive, archive):
+            device.sendto(datagram, ("127.0.0.1", port))
+        time.sleep(0.1)
+        sock.setblocking(False)
+        server.handle_batch(server._drain(sock, [memoryview(bytearray(65535)) for _ in range(8)]))
+        replies = [device.recvfrom(65535)[0] for _ in range(4)]
+
+    plains = [decode_envelope(reply, cfg.keys.resolve_key).plaintext for reply in replies]
+    assert plains == [
+        build_plain_for_encrypt(bytes([9])),
+        build_plain_for_encrypt(bytes([1, 55, 1, 0])),
+        build_plain_for_encrypt(bytes([4, 5])),
+        build_plain_for_encrypt(bytes([4, 5])),
+    ]
+    stats = server.stats()
+    assert stats["ack"]["sent"] == 4
+    # Telemetry ACK and end-of-requests are one reply.
+    assert stats["ack"]["replies"] == 3
+    assert stats["ack"]["cached_frames"] == 3
+    assert stats["dedup"]["datagrams"]["hits"] == 1
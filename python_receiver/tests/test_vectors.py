@@ -1,15 +1,27 @@
 from __future__ import annotations
 
-from rtu_receiver.crc16 import crc16_ccitt_false
+import os
+
+import pytest
+
+from rtu_receiver.crc16 import Crc16, crc16_ccitt_false
 from rtu_receiver.protocol import (
+    END_OF_REQUESTS,
+    TELEMETRY_ACK,
+    ProtocolError,
     build_frame,
     build_plain_for_encrypt,
+    decode_datagram,
+    decode_datagrams,
+    decode_envelope,
     parse_imei,
     parse_payload,
     stuff_payload,
     unstuff_payload,
 )
-from rtu_receiver.xtea import xtea_decrypt_ecb_le, xtea_encrypt_ecb_le
+from rtu_receiver.records import Telemetry
+from rtu_receiver.xtea import XteaCipher, XteaCipherCache, xtea_decrypt_ecb_le, xtea_encrypt_ecb_le
+from rtu_receiver.xtea_batch import HAVE_NUMPY, xtea_decrypt_ecb_le_batch
 
 
 def test_byte_stuffing_roundtrip() -> None:
@@ -18,6 +30,22 @@ def test_byte_stuffing_roundtrip() -> None:
     assert unstuff_payload(stuffed) == raw
 
 
+def test_unstuff_error_offsets() -> None:
+    with pytest.raises(ProtocolError) as dangling:
+        unstuff_payload(bytes([0x01, 0xC4, 0xC1, 0x02, 0xC4]))
+    assert (dangling.value.reason, dangling.value.details) == ("dangling_escape_byte", {"offset": 4})
+
+    with pytest.raises(ProtocolError) as invalid:
+        unstuff_payload(bytes([0xC0, 0x01, 0xC4, 0x05, 0xC2]), 1, 4)
+    assert invalid.value.reason == "invalid_escape_sequence"
+    assert invalid.value.details == {"offset": 1, "escape_byte": 0x05}
+
+
+def test_unstuff_accepts_memoryview() -> None:
+    raw = bytes([0xC0, 0x00, 0xC4, 0xC4, 0xC4, 0xC3, 0x07, 0xC2])
+    assert unstuff_payload(memoryview(raw), 1, len(raw) - 1) == bytes([0x00, 0xC4, 0xC2, 0x07])
+
+
 def test_imei_parse_vector() -> None:
     imei_bytes = bytes.fromhex("cb9b558888110300")
     assert parse_imei(imei_bytes) == "863703030668235"
@@ -27,6 +55,15 @@ def test_crc16_reference_vector() -> None:
     assert crc16_ccitt_false(b"123456789") == 0x29B1
 
 
+def test_crc16_streaming_matches_one_shot() -> None:
+    data = bytes(range(256)) * 3
+    crc = Crc16()
+    for i in range(0, len(data), 8):
+        crc.update(data[i : i + 8])
+    assert crc.digest() == crc16_ccitt_false(data)
+    assert Crc16(b"123456789").digest() == 0x29B1
+
+
 def test_xtea_decrypt_document_vector() -> None:
     key = bytes.fromhex("79757975797579756f706f706f706f70")
     ciphertext = bytes.fromhex(
@@ -45,6 +82,7 @@ def test_xtea_decrypt_document_vector() -> None:
     plain = xtea_decrypt_ecb_le(ciphertext, key)
     assert plain.startswith(bytes.fromhex("09300004100e00000104f4779559"))
     assert int.from_bytes(plain[-2:], "little") == crc16_ccitt_false(plain[:-2])
+    assert XteaCipher(key).decrypt_with_crc(ciphertext) == (plain, crc16_ccitt_false(plain[:-2]))
 
 
 def test_encrypt_decrypt_roundtrip() -> None:
@@ -56,6 +94,77 @@ def test_encrypt_decrypt_roundtrip() -> None:
     assert dec == plain
 
 
+def test_xtea_cipher_matches_module_functions() -> None:
+    key = bytes.fromhex("79757975797579756f706f706f706f70")
+    plain = build_plain_for_encrypt(bytes.fromhex("09020101aa0202bbcc"))
+    cipher = XteaCipher(key)
+    assert cipher.encrypt(plain) == xtea_encrypt_ecb_le(plain, key)
+    assert cipher.decrypt(cipher.encrypt(plain)) == plain
+
+
+def test_xtea_cipher_cache_rebuilds_on_key_change() -> None:
+    cache = XteaCipherCache(max_entries=2)
+    key_a = bytes(range(16))
+    key_b = bytes(range(1, 17))
+    first = cache.get("1", key_a)
+    assert cache.get("1", key_a) is first
+    assert cache.get("1", key_b) is not first
+    cache.get("2", key_a)
+    cache.get("3", key_a)
+    assert len(cache) == 2
+
+
+@pytest.mark.parametrize(
+    "use_numpy",
+    [False, pytest.param(True, marks=pytest.mark.skipif(not HAVE_NUMPY, reason="numpy not installed"))],
+)
+def test_xtea_batch_matches_scalar(use_numpy: bool) -> None:
+    items = [(os.urandom(8 * (1 + i % 7)), os.urandom(16)) for i in range(40)]
+    batch = xtea_decrypt_ecb_le_batch(items, use_numpy=use_numpy)
+    assert batch == [xtea_decrypt_ecb_le(ciphertext, key) for ciphertext, key in items]
+
+
+def test_decode_datagrams_batch_keeps_order_and_errors() -> None:
+    imei = "863703030668235"
+    key = bytes.fromhex("79757975797579756f706f706f706f70")
+    good = build_frame(imei, xtea_encrypt_ecb_le(build_plain_for_encrypt(bytes.fromhex("09020101aa0202bbcc")), key))
+    datagrams = [good, b"\x00\x01", good] * 20
+
+    results = decode_datagrams(datagrams, lambda _imei: key)
+
+    assert len(results) == len(datagrams)
+    assert isinstance(results[1], ProtocolError)
+    assert results[1].reason == "invalid_boundaries"
+    assert results[0] == decode_datagram(good, lambda _imei: key)
+    assert results[-1] == results[0]
+
+
+def test_decode_envelope_parses_lazily() -> None:
+    imei = "863703030668235"
+    key = bytes.fromhex("79757975797579756f706f706f706f70")
+    plain = build_plain_for_encrypt(bytes.fromhex("0407"))
+    envelope = decode_envelope(build_frame(imei, xtea_encrypt_ecb_le(plain, key)), lambda _imei: key)
+
+    assert envelope.imei == imei
+    assert envelope.crc_ok
+    assert envelope.plaintext == plain
+    assert not envelope.is_parsed
+    assert envelope.records[0].seq == 7
+    assert envelope.is_parsed
+    assert envelope.records is envelope.records
+
+
+def test_decode_envelope_reports_crc_without_raising() -> None:
+    key = bytes.fromhex("79757975797579756f706f706f706f70")
+    plain = bytearray(build_plain_for_encrypt(bytes.fromhex("0407")))
+    plain[-1] ^= 0xFF
+    datagram = build_frame("863703030668235", xtea_encrypt_ecb_le(bytes(plain), key))
+
+    with pytest.raises(ProtocolError):
+        decode_envelope(datagram, lambda _imei: key)
+    assert decode_envelope(datagram, lambda _imei: key, verify_crc=False).crc_ok is False
+
+
 def test_parse_payload_ids() -> None:
     payload = bytes.fromhex(
         "01010478563412"  # ID=1 param=1 len=4
@@ -71,6 +180,46 @@ def test_parse_payload_ids() -> None:
     assert [r["id"] for r in parsed["records"]] == [1, 2, 4, 6, 7, 9]
 
 
+def test_records_are_slotted_with_json_form() -> None:
+    parsed = parse_payload(bytes.fromhex("09020101aa0202bbcc"))
+    telemetry = parsed["records"][0]
+
+    assert isinstance(telemetry, Telemetry)
+    assert not hasattr(telemetry, "__dict__")
+    assert bytes(telemetry.items[1].data) == bytes.fromhex("bbcc")
+    assert telemetry.to_json_dict() == {
+        "id": 9,
+        "type": "telemetry",
+        "count": 2,
+        "items": [
+            {"param_id": 1, "len": 1, "data_hex": "aa"},
+            {"param_id": 2, "len": 2, "data_hex": "bbcc"},
+        ],
+    }
+    assert telemetry["items"][1]["data_hex"] == "bbcc"
+    assert telemetry.get("type") == "telemetry"
+
+
+def test_parse_payload_slices_without_copying() -> None:
+    payload = bytes.fromhex("09020101aa0202bbcc") + bytes(3)
+    parsed = parse_payload(payload)
+
+    item = parsed["records"][0].items[1]
+    assert isinstance(item.data, memoryview)
+    assert item.data.obj is payload
+    assert bytes(parsed["payload_used"]) == payload[:-3]
+    assert parsed["padding_len"] == 3
+
+
+def test_parse_payload_drops_warnings_of_failed_record() -> None:
+    # First event holds an unknown type_id; the second event is truncated.
+    payload = bytes([3, 1, 1]) + bytes(4) + bytes([2, 0xEE, 1]) + bytes([1]) + bytes(4) + bytes([9, 1])
+    parsed = parse_payload(payload)
+
+    assert parsed["warnings"] == ["payload_parse_error"]
+    assert parsed["records"][0]["parse_error"] == "truncated_event_data"
+
+
 def test_parse_id3_synthetic_event() -> None:
     event_time = (1700000000).to_bytes(4, "little")
     # type 0 (4 bytes) + type 20 (1 byte)
@@ -89,3 +238,8 @@ def test_build_frame_boundaries() -> None:
     frame = build_frame(imei, bytes.fromhex("0011223344556677"))
     assert frame[0] == 0xC0
     assert frame[-1] == 0xC2
+
+
+def test_ack_payloads_match_document_vectors() -> None:
+    assert build_plain_for_encrypt(TELEMETRY_ACK) == bytes.fromhex("090000000000f246")
+    assert build_plain_for_encrypt(END_OF_REQUESTS) == bytes.fromhex("0137010000003e56")